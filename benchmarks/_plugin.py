@@ -0,0 +1,42 @@
+"""
+Load ``calibre_plugin/`` as ``calibre_plugins.opds_client`` outside the
+Calibre GUI, the same way Calibre's zip plugin loader does.
+
+Benchmarks must run under calibre-debug so that calibre, PyQt5 and lxml
+are importable::
+
+    calibre-debug -e benchmarks/bench_parser.py
+"""
+import builtins
+import importlib.util
+import os
+import sys
+import types
+
+PLUGIN_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'calibre_plugin')
+PACKAGE = 'calibre_plugins.opds_client'
+
+
+def load():
+    """Import the plugin package and return it."""
+    if PACKAGE in sys.modules:
+        return sys.modules[PACKAGE]
+
+    # Calibre injects these into every module loaded from a plugin zip
+    builtins.__dict__.setdefault('_', lambda s: s)
+    builtins.__dict__.setdefault('load_translations', lambda: None)
+    builtins.__dict__.setdefault('get_icons', lambda *a, **k: None)
+
+    if 'calibre_plugins' not in sys.modules:
+        ns = types.ModuleType('calibre_plugins')
+        ns.__path__ = []
+        sys.modules['calibre_plugins'] = ns
+
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE, os.path.join(PLUGIN_DIR, '__init__.py'),
+        submodule_search_locations=[PLUGIN_DIR])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,87 @@
+"""
+Import-time benchmark: what registering the plugin's InterfaceAction costs
+at every Calibre launch, and what opening the OPDS dialog for the first
+time costs.
+
+    calibre-debug -e benchmarks/bench_import.py
+    calibre-debug -e benchmarks/bench_import.py -- --json
+
+Must run in a fresh process (bench_suite.py starts it as a subprocess):
+the numbers only mean something while sys.modules is cold. Qt and
+calibre.gui2.actions are imported first because Calibre has them loaded
+before any plugin. Exits with 1 when the action module pulls in one of
+the modules that main.py defers to show_dialog().
+"""
+import importlib
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import _plugin   # noqa: E402
+
+# main.py가 show_dialog()까지 미루는 모듈 — 액션 등록 때 읽히면 회귀
+DEFERRED = ('dialog', 'network', 'opds_parser', 'model', 'server_dialog',
+            'http_pool', 'download_queue', 'covers', 'catalog_index', 'diagnostics')
+
+
+def _timed_import(name):
+    before = set(sys.modules)
+    start = time.perf_counter()
+    importlib.import_module(name)
+    elapsed = time.perf_counter() - start
+    return elapsed, sorted(set(sys.modules) - before)
+
+
+def measure() -> dict:
+    # Calibre GUI가 플러그인보다 먼저 읽어 두는 것들
+    import PyQt5.QtCore       # noqa: F401
+    import PyQt5.QtGui        # noqa: F401
+    import PyQt5.QtWidgets    # noqa: F401
+    import calibre.gui2.actions   # noqa: F401
+
+    package = _plugin.PACKAGE
+    start = time.perf_counter()
+    _plugin.load()
+    package_seconds = time.perf_counter() - start
+
+    results = {}
+    for key, module in (('import/action', package + '.main'),
+                        ('import/dialog', package + '.dialog')):
+        elapsed, loaded = _timed_import(module)
+        plugin = [m for m in loaded if m.startswith(package + '.')]
+        results[key] = {
+            'seconds': elapsed + (package_seconds if key == 'import/action' else 0.0),
+            'modules': len(loaded),
+            'plugin_modules': len(plugin),
+            'loaded': plugin,
+        }
+    return results
+
+
+def deferred_leaks(results) -> list:
+    loaded = results['import/action']['loaded']
+    return [m for m in loaded if m.rsplit('.', 1)[-1] in DEFERRED]
+
+
+def main(argv):
+    results = measure()
+    leaks = deferred_leaks(results)
+    if '--json' in argv:
+        results['import/action']['deferred'] = leaks
+        json.dump(results, sys.stdout)
+    else:
+        print('%-16s  %10s  %8s  %8s' % ('', 'time (ms)', 'modules', 'plugin'))
+        for key, r in results.items():
+            print('%-16s  %10.1f  %8d  %8d' % (
+                key, r['seconds'] * 1000, r['modules'], r['plugin_modules']))
+        if leaks:
+            print('imported at action registration but should wait for show_dialog(): %s'
+                  % ', '.join(leaks))
+    return 1 if leaks else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,99 @@
+"""
+Memory benchmark: retained size of parsed acquisition feeds with the
+compact BookEntry (__slots__, Format tuples, interned MIME strings,
+packed summaries) vs. the previous dataclass + per-format dict
+representation.
+
+    calibre-debug -e benchmarks/bench_memory.py
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import _plugin   # noqa: E402
+import feedgen   # noqa: E402
+
+_plugin.load()
+from calibre_plugins.opds_client import opds_parser   # noqa: E402
+
+SIZES = (10000, 100000)
+SUMMARY_CHARS = 600
+
+
+@dataclass
+class LegacyBookEntry:
+    # 이전 구현 그대로: 일반 dataclass + 형식마다 dict
+    title: str
+    authors: List[str] = field(default_factory=list)
+    formats: List[dict] = field(default_factory=list)
+    summary: str = ''
+    cover_url: str = ''
+    publisher: str = ''
+    identifiers: dict = field(default_factory=dict)
+    series: str = ''
+    series_index: float = 0.0
+    tags: List[str] = field(default_factory=list)
+    languages: List[str] = field(default_factory=list)
+    pubdate: str = ''
+
+
+def _copy(s):
+    # 이전 파서는 짧은 문자열(MIME, 확장자, 저자, 태그 …)을 intern하지 않았으므로
+    # 책마다 새 객체를 만든다
+    return s.encode('utf-8').decode('utf-8')
+
+
+def to_legacy(entry):
+    return LegacyBookEntry(
+        title=entry.title,
+        authors=[_copy(a) for a in entry.authors],
+        formats=[{'type': _copy(f.type), 'mime': _copy(f.mime), 'url': f.url, 'size': f.size}
+                 for f in entry.formats],
+        summary=entry.summary,
+        cover_url=entry.cover_url,
+        publisher=_copy(entry.publisher),
+        identifiers=dict(entry.identifiers),
+        series=_copy(entry.series),
+        series_index=entry.series_index,
+        tags=[_copy(t) for t in entry.tags],
+        languages=[_copy(l) for l in entry.languages],
+        pubdate=_copy(entry.pubdate),
+    )
+
+
+def retained(build):
+    """build()가 반환한 객체가 붙잡고 있는 메모리(바이트)와 걸린 시간."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return size, elapsed
+
+
+def main():
+    print('%8s  %10s  %12s  %12s  %8s  %12s' % (
+        'entries', 'xml (MB)', 'legacy (MB)', 'compact (MB)', 'saving', 'bytes/entry'))
+    for n in SIZES:
+        data = feedgen.acquisition_feed(n, summary_chars=SUMMARY_CHARS)
+        legacy, _t = retained(
+            lambda: [to_legacy(e) for e in opds_parser.parse_feed(data).entries])
+        compact, _t = retained(lambda: opds_parser.parse_feed(data).entries)
+        print('%8d  %10.1f  %12.1f  %12.1f  %7.0f%%  %12d' % (
+            n, len(data) / 1e6, legacy / 1e6, compact / 1e6,
+            100.0 * (1 - compact / legacy), compact // n))
+
+
+if __name__ == '__main__':
+    main()
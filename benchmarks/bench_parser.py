@@ -0,0 +1,51 @@
+"""
+Parser benchmark: single-pass streaming parse_feed vs. the previous
+feedparser + ElementTree double parse.
+
+    calibre-debug -e benchmarks/bench_parser.py
+"""
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import _plugin   # noqa: E402
+import feedgen   # noqa: E402
+
+_plugin.load()
+from calibre_plugins.opds_client import opds_parser   # noqa: E402
+
+SIZES = (1000, 10000)
+REPEAT = 3
+
+
+def legacy_parse(xml_bytes):
+    # 이전 구현: feedparser로 전체를 파싱한 뒤 <publisher><name>을 위해 ET로 한 번 더
+    feed = opds_parser._parse_feedparser(xml_bytes)
+    ET.fromstring(xml_bytes)
+    return feed
+
+
+def best_of(func, data, repeat=REPEAT):
+    best = None
+    for _i in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    print('%8s  %12s  %12s  %8s' % ('entries', 'legacy (s)', 'stream (s)', 'speedup'))
+    for n in SIZES:
+        data = feedgen.acquisition_feed(n)
+        old = best_of(legacy_parse, data)
+        new = best_of(opds_parser.parse_feed, data)
+        print('%8d  %12.3f  %12.3f  %7.1fx' % (n, old, new, old / new))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,517 @@
+"""
+Benchmark suite: parser, fetch-to-render latency and download throughput
+against the local stand-in server (opds_server.py), with JSON output so a
+run can be compared against a saved baseline.
+
+    calibre-debug -e benchmarks/bench_suite.py -- --json before.json
+    calibre-debug -e benchmarks/bench_suite.py -- --baseline before.json
+
+Sections (``--only parse,fetch,download,import,sync``):
+
+parse      parse_feed() on navigation, acquisition (2 and 4 formats) and
+           malformed feeds of 10 to 10k entries (``--full`` adds 100k).
+           Time is the best of ``--repeat`` runs; peak memory is the
+           tracemalloc peak of a separate run (Python allocations only).
+fetch      FetchThread + BookTableModel against the stand-in server:
+           seconds until the first rows are in the model and until the
+           whole feed is, median of ``--repeat`` runs. Scenarios vary
+           latency, bandwidth, compression and injected 503s.
+download   _download() of several books on a thread pool: MB/s with and
+           without throttling and with connections cut halfway through
+           (exercises the Range resume path).
+
+import     bench_import.py in a fresh process (``--repeat`` times, best run):
+           time and modules loaded when Calibre registers the action and
+           when the dialog opens for the first time, plus the slowest
+           plugin modules from ``-X importtime`` (PYTHONPROFILEIMPORTTIME).
+           Fails when the action module imports a module that main.py
+           defers to show_dialog().
+sync       CatalogIndex.sync() of a 50k-book catalog, with and without
+           ETags and with a static root feed: the first sync, a re-sync of
+           the unchanged catalog, a re-sync after one category changed, one
+           after a book was added to the last page, one after a category
+           was added while the server answers it with 503, and one after it
+           recovers. Fails when the unchanged re-sync reports changes (or,
+           when navigation entries carry <updated>, takes more than a
+           handful of requests), when the added book is not found, when the
+           sync with the failing new category is reported as complete, or
+           when the next one does not add its books.
+
+With ``--baseline`` every metric is compared with the baseline run and the
+exit status is 1 when any of them got worse by more than ``--threshold``.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import _plugin   # noqa: E402
+import feedgen   # noqa: E402
+from opds_server import BenchServer, ServerConfig   # noqa: E402
+
+_plugin.load()
+from calibre_plugins.opds_client import catalog_index, feed_cache, network, opds_parser   # noqa: E402
+from calibre_plugins.opds_client.model import BookTableModel   # noqa: E402
+
+from PyQt5.QtCore import QCoreApplication, QEventLoop   # noqa: E402
+
+SIZES = (10, 100, 1000, 10000)
+FULL_SIZES = SIZES + (100000,)
+MALFORMED_SIZE = 1000
+FETCH_ENTRIES = 1000
+FETCH_SUMMARY_CHARS = 300
+DOWNLOAD_BOOKS = 8
+DOWNLOAD_BOOK_SIZE = 2 * 1024 * 1024
+# 50 카테고리 × 10 페이지 × 100권 = 5만 권
+SYNC_CATALOG = {'categories': 50, 'pages': 10, 'page_size': 100}
+SYNC_TOUCHED_CATEGORY = 7
+SYNC_NEW_CATEGORY_BOOKS = SYNC_CATALOG['pages'] * SYNC_CATALOG['page_size']
+# 바뀌지 않은 카탈로그를 다시 동기화할 때 허용하는 요청 수
+SYNC_UNCHANGED_MAX_REQUESTS = 5
+
+SYNC_CASES = (
+    # (이름 접미사, 서버 설정, 바뀌지 않은 재동기화의 요청 수 상한)
+    ('', {'etags': True}, SYNC_UNCHANGED_MAX_REQUESTS),
+    ('-no-etag', {}, SYNC_UNCHANGED_MAX_REQUESTS),
+    # 루트 navigation entry에 <updated>가 없으면 페이지마다 조건부 요청 (304)
+    ('-static-root', {'etags': True, 'dated_navigation': False}, None),
+)
+
+FETCH_CASES = (
+    ('local', ServerConfig()),
+    ('latency-50ms', ServerConfig(latency=0.05)),
+    ('2MBps-identity', ServerConfig(bandwidth=2 * 1024 * 1024)),
+    ('2MBps-gzip', ServerConfig(bandwidth=2 * 1024 * 1024, compression='gzip')),
+    ('errors-20pct', ServerConfig(error_rate=0.2)),
+)
+
+DOWNLOAD_CASES = (
+    # (이름, 서버 설정, 동시 내려받기 수)
+    ('local-1', ServerConfig(book_size=DOWNLOAD_BOOK_SIZE), 1),
+    ('local-2', ServerConfig(book_size=DOWNLOAD_BOOK_SIZE), 2),
+    ('8MBps-2', ServerConfig(book_size=DOWNLOAD_BOOK_SIZE, bandwidth=8 * 1024 * 1024), 2),
+    ('resets-20pct-2', ServerConfig(book_size=DOWNLOAD_BOOK_SIZE, reset_rate=0.2), 2),
+)
+
+# 비교할 때 방향: 나머지 지표는 작을수록 좋다
+_HIGHER_IS_BETTER = frozenset(('mb_per_s',))
+# 결과에는 남기지만 비교하지 않는 값 (entries_per_s는 seconds에서 나온 값이라 중복)
+_INFORMATIONAL = frozenset(('entries', 'entries_per_s', 'xml_mb', 'wire_mb',
+                            'requests', 'errors', 'retries', 'importtime_ms',
+                            'added', 'changed', 'removed'))
+
+# 서버 재시도 설정: 주입한 503은 Retry-After: 0이므로 사실상 즉시 다시 시도한다
+_BENCH_RETRY = {'attempts': 6, 'base_delay': 0.01, 'max_delay': 0.05, 'jitter': 0,
+                'breaker_threshold': 1000}
+
+
+# ---------------------------------------------------------------------------
+# Parse
+# ---------------------------------------------------------------------------
+
+def parse_cases(sizes):
+    for n in sizes:
+        yield 'navigation/%d' % n, lambda n=n: feedgen.navigation_feed(n)
+        yield 'acquisition/%d' % n, lambda n=n: feedgen.acquisition_feed(n)
+        yield 'acquisition-4fmt/%d' % n, lambda n=n: feedgen.acquisition_feed(n, formats=4)
+    for kind in feedgen.MALFORMED_KINDS:
+        yield ('malformed-%s/%d' % (kind, MALFORMED_SIZE),
+               lambda kind=kind: feedgen.acquisition_feed(MALFORMED_SIZE, malformed=kind))
+
+
+def bench_parse(sizes, repeat):
+    results = {}
+    print('%-28s  %9s  %10s  %12s  %9s' % ('parse', 'xml (MB)', 'time (s)', 'entries/s', 'peak (MB)'))
+    for name, build in parse_cases(sizes):
+        data = build()
+        best = None
+        entries = 0
+        for _i in range(repeat):
+            start = time.perf_counter()
+            feed = opds_parser.parse_feed(data)
+            elapsed = time.perf_counter() - start
+            entries = len(feed.entries)
+            best = elapsed if best is None else min(best, elapsed)
+            del feed
+        tracemalloc.start()
+        feed = opds_parser.parse_feed(data)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del feed
+        results['parse/' + name] = {
+            'entries': entries,
+            'xml_mb': len(data) / 1e6,
+            'seconds': best,
+            'entries_per_s': entries / best if best else 0.0,
+            'peak_mb': peak / 1e6,
+        }
+        print('%-28s  %9.2f  %10.4f  %12.0f  %9.1f' % (
+            name, len(data) / 1e6, best, results['parse/' + name]['entries_per_s'], peak / 1e6))
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Fetch to render
+# ---------------------------------------------------------------------------
+
+def _bench_server_entry(url):
+    return {'name': 'bench', 'url': url, 'auth': 'none', 'retry': dict(_BENCH_RETRY)}
+
+
+def fetch_and_render(url, server):
+    """FetchThread로 받아 BookTableModel에 채운다. (첫 행까지, 전부까지) 초."""
+    model = BookTableModel()
+    loop = QEventLoop()
+    marks = {}
+    start = time.perf_counter()
+
+    def on_entries(entries, first):
+        if first:
+            model.set_entries(entries)
+            marks.setdefault('first_rows', time.perf_counter() - start)
+        else:
+            model.append_entries(entries)
+
+    def on_feed(feed, _digest):
+        if 'first_rows' not in marks:
+            model.set_entries(feed.entries)
+            marks['first_rows'] = time.perf_counter() - start
+        marks['complete'] = time.perf_counter() - start
+
+    def on_error(message):
+        marks['error'] = message
+
+    thread = network.FetchThread(url, server, force=True)
+    thread.entries_ready.connect(on_entries)
+    thread.feed_ready.connect(on_feed)
+    thread.error.connect(on_error)
+    thread.parse_error.connect(on_error)
+    thread.finished.connect(loop.quit)
+    thread.start()
+    loop.exec_()
+    thread.wait()
+    if 'error' in marks:
+        raise RuntimeError(marks['error'])
+    return marks['first_rows'], marks['complete'], model.rowCount()
+
+
+def bench_fetch(repeat):
+    results = {}
+    print('%-28s  %10s  %10s  %9s  %8s' % ('fetch-to-render', 'first (s)', 'all (s)', 'wire (MB)', 'requests'))
+    path = '/opds/feed?n=%d&summary=%d' % (FETCH_ENTRIES, FETCH_SUMMARY_CHARS)
+    for name, config in FETCH_CASES:
+        with BenchServer(config) as srv:
+            server = _bench_server_entry(srv.url)
+            runs = [fetch_and_render(srv.url + path, server) for _i in range(repeat)]
+            first = statistics.median(r[0] for r in runs)
+            complete = statistics.median(r[1] for r in runs)
+            key = 'fetch/%s/%d' % (name, FETCH_ENTRIES)
+            results[key] = {
+                'entries': runs[0][2],
+                'first_rows_s': first,
+                'complete_s': complete,
+                'wire_mb': srv.bytes_sent / repeat / 1e6,
+                'requests': srv.requests,
+                'retries': srv.injected_errors,
+            }
+        print('%-28s  %10.4f  %10.4f  %9.2f  %8d' % (
+            name, first, complete, results[key]['wire_mb'], results[key]['requests']))
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Download
+# ---------------------------------------------------------------------------
+
+def bench_download(workdir):
+    results = {}
+    print('%-28s  %10s  %9s  %8s' % ('download', 'time (s)', 'MB/s', 'resets'))
+    for name, config, workers in DOWNLOAD_CASES:
+        target = os.path.join(workdir, name)
+        os.makedirs(target)
+        with BenchServer(config) as srv:
+            server = _bench_server_entry(srv.url)
+            urls = ['%s/opds/download/%d/epub' % (srv.url, i) for i in range(DOWNLOAD_BOOKS)]
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                sizes = list(pool.map(
+                    lambda i: network._download(urls[i], server, os.path.join(target, '%d.epub' % i)),
+                    range(len(urls))))
+            elapsed = time.perf_counter() - start
+            total = sum(sizes)
+            key = 'download/%s' % name
+            results[key] = {
+                'seconds': elapsed,
+                'mb_per_s': total / 1e6 / elapsed,
+                'requests': srv.requests,
+                'retries': srv.injected_resets,
+            }
+        print('%-28s  %10.3f  %9.1f  %8d' % (name, elapsed, total / 1e6 / elapsed, srv.injected_resets))
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Import time
+# ---------------------------------------------------------------------------
+
+_IMPORT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_import.py')
+# -X importtime 한 줄: "import time: self [us] | cumulative | imported package"
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)\s*$')
+
+
+def _script_command(script, *args):
+    # calibre-debug 안에서는 같은 실행 파일의 -e로, 그 밖에는 이 파이썬으로 돌린다
+    exe = sys.executable
+    if 'calibre' in os.path.basename(exe).lower():
+        return [exe, '-e', script, '--'] + list(args)
+    return [exe, script] + list(args)
+
+
+def _parse_importtime(stderr) -> dict:
+    """{모듈 이름: 누적 import 시간(ms)}"""
+    times = {}
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            times[match.group(4)] = int(match.group(2)) / 1000
+    return times
+
+
+# 기준선과 상관없이 실패로 끝나야 하는 문제
+_failures = []
+
+
+def bench_import(repeat):
+    env = dict(os.environ, PYTHONPROFILEIMPORTTIME='1')
+    runs = []
+    for _i in range(repeat):
+        proc = subprocess.run(_script_command(_IMPORT_SCRIPT, '--json'), env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              universal_newlines=True)
+        try:
+            result = json.loads(proc.stdout)
+        except ValueError:
+            raise RuntimeError('bench_import.py failed:\n' + proc.stderr[-2000:])
+        runs.append((result, _parse_importtime(proc.stderr), proc.returncode))
+    best, importtime, returncode = min(runs, key=lambda r: r[0]['import/action']['seconds'])
+
+    results = {}
+    print('%-28s  %10s  %8s  %8s' % ('import', 'time (ms)', 'modules', 'plugin'))
+    for key in ('import/action', 'import/dialog'):
+        r = best[key]
+        module = _plugin.PACKAGE + ('.main' if key == 'import/action' else '.dialog')
+        results[key] = {
+            'seconds': r['seconds'],
+            'modules': r['modules'],
+            'plugin_modules': r['plugin_modules'],
+        }
+        if module in importtime:
+            results[key]['importtime_ms'] = importtime[module]
+        print('%-28s  %10.1f  %8d  %8d' % (
+            key.split('/', 1)[1], r['seconds'] * 1000, r['modules'], r['plugin_modules']))
+    slowest = sorted(((ms, name) for name, ms in importtime.items()
+                      if name.startswith(_plugin.PACKAGE + '.')), reverse=True)[:5]
+    if slowest:
+        print('slowest plugin modules (-X importtime, cumulative):')
+        for ms, name in slowest:
+            print('    %8.1f ms  %s' % (ms, name))
+    leaks = best['import/action'].get('deferred')
+    if returncode or leaks:
+        _failures.append('the action module imports modules deferred to show_dialog(): %s'
+                         % ', '.join(leaks or ()))
+        print(_failures[-1])
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Incremental sync
+# ---------------------------------------------------------------------------
+
+def _timed_sync(index, srv, server):
+    """(초, 요청 수, SyncDiff) — 끝까지 마치지 못하면 SyncDiff 대신 None."""
+    def fetch(url, etag, modified):
+        return network._fetch_if_changed(url, server, etag, modified)
+
+    before = srv.requests
+    start = time.perf_counter()
+    try:
+        diff = index.sync(srv.url + '/opds', fetch)
+    except catalog_index.SyncIncomplete:
+        diff = None
+    return time.perf_counter() - start, srv.requests - before, diff
+
+
+def _fail_new_category(srv):
+    srv.fail('/opds/category/%d' % srv.add_category())
+
+
+def bench_sync(workdir):
+    results = {}
+    print('%-28s  %10s  %8s  %8s  %8s  %8s' % (
+        'sync', 'time (s)', 'requests', 'added', 'changed', 'removed'))
+    for suffix, options, max_requests in SYNC_CASES:
+        config = ServerConfig(**dict(SYNC_CATALOG, **options))
+        with BenchServer(config) as srv:
+            server = _bench_server_entry(srv.url)
+            index = catalog_index.CatalogIndex(os.path.join(workdir, 'sync%s.sqlite' % suffix))
+            try:
+                for name, change in (('initial', None), ('unchanged', None),
+                                     ('one-category', lambda: srv.touch(SYNC_TOUCHED_CATEGORY)),
+                                     ('added-book', srv.add_book),
+                                     ('new-category-503', lambda: _fail_new_category(srv)),
+                                     ('new-category', srv.recover)):
+                    if change is not None:
+                        change()
+                    completed_at = index.completed_at
+                    seconds, requests, diff = _timed_sync(index, srv, server)
+                    key = 'sync/%s%s' % (name, suffix)
+                    results[key] = {'seconds': seconds, 'requests': requests}
+                    if diff is None:
+                        print('%-28s  %10.3f  %8d  %8s' % (
+                            name + suffix, seconds, requests, 'incomplete'))
+                    else:
+                        results[key].update(added=len(diff.added), changed=len(diff.changed),
+                                            removed=len(diff.removed))
+                        print('%-28s  %10.3f  %8d  %8d  %8d  %8d' % (
+                            name + suffix, seconds, requests,
+                            len(diff.added), len(diff.changed), len(diff.removed)))
+                    problem = None
+                    if name == 'new-category-503':
+                        if diff is not None or index.completed_at != completed_at:
+                            problem = 'was reported as complete'
+                    elif diff is None:
+                        problem = 'did not complete'
+                    elif name == 'new-category' and len(diff.added) != SYNC_NEW_CATEGORY_BOOKS:
+                        problem = 'found %d added books instead of %d' % (
+                            len(diff.added), SYNC_NEW_CATEGORY_BOOKS)
+                    elif name == 'unchanged' and not diff.empty:
+                        problem = 'reported %d changes' % (
+                            len(diff.added) + len(diff.changed) + len(diff.removed))
+                    elif (name == 'unchanged' and max_requests is not None
+                          and requests > max_requests):
+                        problem = 'took %d requests' % requests
+                    elif name == 'added-book' and len(diff.added) != 1:
+                        problem = 'found %d added books instead of 1' % len(diff.added)
+                    if problem:
+                        _failures.append('sync/%s%s %s' % (name, suffix, problem))
+                        print(_failures[-1])
+            finally:
+                index.close()
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Report / compare
+# ---------------------------------------------------------------------------
+
+def _meta(args):
+    try:
+        from calibre.constants import numeric_version
+        calibre_version = '.'.join(str(x) for x in numeric_version)
+    except ImportError:
+        calibre_version = None
+    return {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'calibre': calibre_version,
+        'args': vars(args),
+    }
+
+
+def compare(results, baseline, threshold):
+    """baseline과 비교해 표를 출력하고, threshold보다 나빠진 (이름, 지표) 목록을 반환."""
+    regressions = []
+    print('\n%-40s  %-14s  %12s  %12s  %8s' % ('compared with baseline', 'metric', 'baseline', 'current', 'change'))
+    for key in sorted(results):
+        old = baseline.get(key)
+        if old is None:
+            continue
+        for metric, value in sorted(results[key].items()):
+            if metric in _INFORMATIONAL or not old.get(metric):
+                continue
+            change = value / old[metric] - 1
+            worse = -change if metric in _HIGHER_IS_BETTER else change
+            flag = ''
+            if worse > threshold:
+                flag = '  WORSE'
+                regressions.append((key, metric))
+            elif worse < -threshold:
+                flag = '  better'
+            print('%-40s  %-14s  %12.4g  %12.4g  %+7.1f%%%s' % (
+                key, metric, old[metric], value, change * 100, flag))
+    missing = sorted(set(baseline) - set(results))
+    if missing:
+        print('not run this time: %s' % ', '.join(missing))
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='bench_suite.py', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--only', default='parse,fetch,download,import,sync',
+                        help='comma separated sections to run (default: %(default)s)')
+    parser.add_argument('--full', action='store_true', help='include 100k-entry feeds')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', metavar='PATH', help='write the results to PATH')
+    parser.add_argument('--baseline', metavar='PATH', help='compare with a previous --json file')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='relative change counted as a regression (default: %(default)s)')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sections = {s.strip() for s in args.only.split(',') if s.strip()}
+    app = QCoreApplication.instance() or QCoreApplication([])  # noqa: F841 — 시그널 전달용
+
+    workdir = tempfile.mkdtemp(prefix='opds-bench-')
+    # 사용자의 피드 캐시를 건드리지 않도록 임시 디렉터리의 캐시를 쓴다
+    feed_cache._cache = feed_cache.FeedCache(os.path.join(workdir, 'feed_cache'), 256 * 1024 * 1024)
+    results = {}
+    try:
+        if 'parse' in sections:
+            results.update(bench_parse(FULL_SIZES if args.full else SIZES, args.repeat))
+            print()
+        if 'fetch' in sections:
+            results.update(bench_fetch(args.repeat))
+            print()
+        if 'download' in sections:
+            results.update(bench_download(workdir))
+            print()
+        if 'import' in sections:
+            results.update(bench_import(args.repeat))
+            print()
+        if 'sync' in sections:
+            results.update(bench_sync(workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'meta': _meta(args), 'results': results}, f, indent=2, sort_keys=True)
+        print('\nwrote %s' % args.json)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('\n%d metric(s) worse than the baseline by more than %.0f%%' % (
+                len(regressions), args.threshold * 100))
+            return 1
+    return 1 if _failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,139 @@
+"""
+Synthetic OPDS 1.x feed generator for benchmarks.
+
+Feeds are deterministic for a given set of arguments so that results can
+be compared between runs.
+"""
+
+# 기본 <updated> 값 (피드와 모든 entry)
+EPOCH = '2024-01-01T00:00:00Z'
+
+_FEED_HEAD = (
+    '<?xml version="1.0" encoding="utf-8"?>\n'
+    '<feed xmlns="http://www.w3.org/2005/Atom"'
+    ' xmlns:dc="http://purl.org/dc/elements/1.1/"'
+    ' xmlns:dcterms="http://purl.org/dc/terms/"'
+    ' xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">\n'
+    '<id>urn:bench:%(kind)s</id>\n'
+    '<title>%(title)s</title>\n'
+    '<updated>%(updated)s</updated>\n'
+    '<link rel="self" type="application/atom+xml;profile=opds-catalog;kind=%(kind)s"'
+    ' href="/opds/%(kind)s"/>\n'
+)
+
+_FORMATS = (
+    ('application/epub+zip', 'epub'),
+    ('application/pdf', 'pdf'),
+    ('application/x-mobipocket-ebook', 'mobi'),
+    ('application/x-cbz', 'cbz'),
+)
+
+
+# malformed= 변형: 실제 서버에서 본 깨진 피드들
+MALFORMED_KINDS = (
+    'entity',       # 정의되지 않은 HTML 엔티티 (&nbsp;)
+    'ampersand',    # 이스케이프하지 않은 & (제목)
+    'encoding',     # utf-8로 선언했지만 latin-1 바이트가 섞임
+    'truncated',    # 전송 도중 끊긴 문서 (마지막 엔트리 중간에서 끝남)
+)
+
+
+_LOREM = (
+    'Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod '
+    'tempor incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, '
+    'quis nostrud exercitation ullamco laboris nisi ut aliquip ex ea commodo '
+    'consequat. Duis aute irure dolor in reprehenderit in voluptate velit esse. ')
+
+
+def _filler(chars: int, seed: int) -> str:
+    if chars <= 0:
+        return ''
+    offset = seed % len(_LOREM)
+    text = (_LOREM[offset:] + _LOREM * (chars // len(_LOREM) + 1))[:chars]
+    return ' ' + text
+
+
+def navigation_feed(n: int, updated=None, dated: bool = True) -> bytes:
+    """
+    updated: {category: timestamp} for entries whose <updated> is not EPOCH;
+    the feed's own <updated> is the latest of them.
+    dated: False leaves <updated> out of the entries and keeps the feed's at
+    EPOCH, like static "Authors / Newest / ..." root feeds.
+    """
+    updated = updated if dated and updated else {}
+    stamps = [updated.get(i, EPOCH) for i in range(n)]
+    parts = [_FEED_HEAD % {'kind': 'navigation', 'title': 'Navigation %d' % n,
+                           'updated': max(stamps, default=EPOCH)}]
+    for i in range(n):
+        parts.append(
+            '<entry><title>Category %d</title><id>urn:bench:nav:%d</id>'
+            '%s'
+            '<content type="text">%d books</content>'
+            '<link rel="subsection" href="/opds/category/%d"'
+            ' type="application/atom+xml;profile=opds-catalog;kind=acquisition"/>'
+            '</entry>\n' % (i, i, '<updated>%s</updated>' % stamps[i] if dated else '',
+                              i * 7, i))
+    parts.append('</feed>\n')
+    return ''.join(parts).encode('utf-8')
+
+
+def acquisition_feed(n: int, formats: int = 2, publisher: str = 'calibre-web',
+                     next_url: str = None, malformed=None,
+                     start: int = 0, summary_chars: int = 0, updated: str = EPOCH,
+                     feed_updated: str = None) -> bytes:
+    """
+    n entries with ``formats`` acquisition links each.
+
+    publisher: 'calibre-web' for ``<publisher><name>`` (Atom namespace),
+    'dcterms' for ``<dcterms:publisher>``, anything else for none.
+    malformed: one of MALFORMED_KINDS (True means 'entity'); every variant
+    is rejected by strict XML parsers.
+    summary_chars: pad every summary with this much filler text (real
+    catalogs usually carry a paragraph or two of description).
+    updated: <updated> of every entry, and of the feed unless feed_updated is given.
+    """
+    parts = [_FEED_HEAD % {'kind': 'acquisition', 'title': 'Acquisition %d' % n,
+                           'updated': feed_updated or updated}]
+    parts.append('<opensearch:totalResults>%d</opensearch:totalResults>\n' % n)
+    if next_url:
+        parts.append('<link rel="next" type="application/atom+xml" href="%s"/>\n' % next_url)
+    if malformed is True:
+        malformed = 'entity'
+    if malformed and malformed not in MALFORMED_KINDS:
+        raise ValueError('unknown malformed kind: %r' % (malformed,))
+    entity = '&nbsp;' if malformed == 'entity' else ' '
+    amp = ' & ' if malformed == 'ampersand' else ' '
+    for i in range(start, start + n):
+        if publisher == 'calibre-web':
+            pub = '<publisher><name>Publisher %d</name></publisher>' % (i % 50)
+        elif publisher == 'dcterms':
+            pub = '<dcterms:publisher>Publisher %d</dcterms:publisher>' % (i % 50)
+        else:
+            pub = ''
+        links = ''.join(
+            '<link rel="http://opds-spec.org/acquisition" type="%s"'
+            ' href="/opds/download/%d/%s" length="%d"/>' % (mime, i, ext, 100000 + i)
+            for mime, ext in _FORMATS[:max(0, formats)])
+        parts.append(
+            '<entry><title>Book title%snumber %d</title>'
+            '<id>urn:uuid:00000000-0000-0000-0000-%012d</id>'
+            '<updated>%s</updated>'
+            '<author><name>Author %d</name></author>'
+            '%s'
+            '<dc:language>en</dc:language>'
+            '<dcterms:issued>2001-01-01</dcterms:issued>'
+            '<dc:identifier>urn:isbn:978%010d</dc:identifier>'
+            '<category term="Fiction" label="Fiction"/>'
+            '<summary>Summary of book %d.%sIt is a fine book.%s</summary>'
+            '<link rel="http://opds-spec.org/image" type="image/jpeg" href="/opds/cover/%d"/>'
+            '<link rel="http://opds-spec.org/image/thumbnail" type="image/jpeg"'
+            ' href="/opds/thumb/%d"/>'
+            '%s</entry>\n' % (amp, i, i, updated, i % 500, pub, i, i, entity,
+                               _filler(summary_chars, i), i, i, links))
+    parts.append('</feed>\n')
+    data = ''.join(parts).encode('utf-8')
+    if malformed == 'encoding':
+        data = data.replace(b'It is a fine book.', b'It is a fine b\xe9ok.')
+    elif malformed == 'truncated':
+        data = data[:data.rfind(b'<summary>')]
+    return data
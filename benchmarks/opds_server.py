@@ -0,0 +1,383 @@
+"""
+Local stand-in OPDS server for benchmarks.
+
+Serves feedgen catalogs over HTTP/1.1 keep-alive from a thread per
+connection, with configurable latency, bandwidth, compression and error
+injection so that network code can be measured without a real server.
+
+    python benchmarks/opds_server.py --port 8080 --latency 0.05 --gzip
+
+Routes:
+
+    /opds                          navigation feed of ``categories`` entries
+    /opds/category/<i>[?page=k]    acquisition pages of ``page_size`` books with next links
+    /opds/feed?n=&formats=&malformed=&summary=
+                                   one acquisition feed, generated on request
+    /opds/download/<i>/<ext>       ``book_size`` bytes (Range / If-Range supported)
+
+With ``etags`` feeds carry an ETag and answer If-None-Match with 304.
+``touch(i)`` changes category i: its entries, pages and navigation entry
+get a new ``<updated>`` (and so new ETags). ``add_book()`` appends a book
+to the last page of the last category; that page and the category's
+navigation entry get a new ``<updated>``. ``add_category()`` appends a
+category (with a new ``<updated>``) to the navigation feed. With
+``dated_navigation=False`` navigation entries carry no ``<updated>`` and the
+root's ``<updated>`` never changes. ``fail(path)`` answers one path with 503
+until ``recover()``.
+"""
+import argparse
+import datetime
+import gzip
+import hashlib
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import feedgen   # noqa: E402
+
+_FEED_TYPE = 'application/atom+xml;profile=opds-catalog'
+_BOOK_TYPES = {'epub': 'application/epub+zip', 'pdf': 'application/pdf',
+               'mobi': 'application/x-mobipocket-ebook', 'cbz': 'application/x-cbz'}
+_CATEGORY_RE = re.compile(r'^/opds/category/(\d+)$')
+_DOWNLOAD_RE = re.compile(r'^/opds/download/(\d+)/(\w+)$')
+_RANGE_RE = re.compile(r'^bytes=(\d+)-$')
+# add_category()로 더한 카테고리의 책 번호 시작 (add_book()이 붙이는 책과 겹치지 않게)
+_ADDED_CATEGORY_START = 10 ** 7
+# 대역폭 제한 시 이 단위로 나눠 쓰고 쉰다
+_THROTTLE_CHUNK = 16 * 1024
+
+
+class ServerConfig:
+    """
+    latency:     seconds before every response (per request, like a slow backend)
+    bandwidth:   bytes/s per connection, 0 = unlimited
+    compression: None, 'gzip' or 'deflate' (only when the client accepts it; feeds only)
+    error_rate:  fraction of requests answered with 503 + Retry-After: 0
+    reset_rate:  fraction of responses cut off halfway through the body
+    etags:       send ETags for feeds and honour If-None-Match
+    dated_navigation: <updated> on navigation entries (see touch())
+    """
+
+    def __init__(self, latency=0.0, bandwidth=0, compression=None, error_rate=0.0,
+                 reset_rate=0.0, categories=20, page_size=100, pages=5,
+                 book_size=1024 * 1024, seed=1, etags=False, dated_navigation=True):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.compression = compression
+        self.error_rate = error_rate
+        self.reset_rate = reset_rate
+        self.categories = categories
+        self.page_size = page_size
+        self.pages = pages
+        self.book_size = book_size
+        self.seed = seed
+        self.etags = etags
+        self.dated_navigation = dated_navigation
+
+
+class BenchServer:
+    """Context manager: ``with BenchServer(ServerConfig(...)) as srv: srv.url``."""
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.config = config or ServerConfig()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.bench = self
+        self._thread = None
+        self._lock = threading.Lock()
+        self._random = random.Random(self.config.seed)
+        self._bodies = {}
+        self._book = None
+        self.revisions = {}     # category -> touch() 횟수
+        self.added_books = 0
+        self.added_categories = 0
+        self.failing = set()    # 503으로 답하는 경로
+        self.requests = 0
+        self.not_modified = 0
+        self.injected_errors = 0
+        self.injected_resets = 0
+        self.bytes_sent = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def touch(self, category):
+        """카테고리 하나의 책을 모두 갱신된 것으로 만든다."""
+        with self._lock:
+            self.revisions[category] = self.revisions.get(category, 0) + 1
+            self._bodies.clear()
+
+    def add_book(self):
+        """마지막 카테고리의 마지막 페이지에 책 한 권을 더한다 (기존 entry의 <updated>는 그대로)."""
+        with self._lock:
+            self.added_books += 1
+            self._bodies.clear()
+
+    def add_category(self) -> int:
+        """navigation 피드 끝에 카테고리 하나를 더하고 그 번호를 반환한다."""
+        with self._lock:
+            category = self.config.categories + self.added_categories
+            self.added_categories += 1
+            self.revisions[category] = 1
+            self._bodies.clear()
+        return category
+
+    def fail(self, path):
+        with self._lock:
+            self.failing.add(path)
+
+    def recover(self):
+        with self._lock:
+            self.failing.clear()
+
+    def updated(self, category) -> str:
+        return self._stamp(self.revisions.get(category, 0))
+
+    def added_stamp(self) -> str:
+        return self._stamp(1000 + self.added_books)
+
+    def navigation_stamps(self) -> dict:
+        stamps = {c: self.updated(c) for c in self.revisions}
+        if self.added_books:
+            stamps[self.config.categories - 1] = self.added_stamp()
+        return stamps
+
+    @staticmethod
+    def _stamp(revision) -> str:
+        if not revision:
+            return feedgen.EPOCH
+        stamp = datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=revision)
+        return stamp.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    # -- 응답 본문 (같은 요청에는 같은 바이트, 압축본도 한 번만 만든다) ---------
+
+    def feed_body(self, key, build, encoding):
+        with self._lock:
+            raw = self._bodies.get((key, None))
+        if raw is None:
+            raw = build()
+            with self._lock:
+                self._bodies[(key, None)] = raw
+        if encoding is None:
+            return raw
+        with self._lock:
+            body = self._bodies.get((key, encoding))
+        if body is None:
+            body = gzip.compress(raw, 6) if encoding == 'gzip' else zlib.compress(raw, 6)
+            with self._lock:
+                self._bodies[(key, encoding)] = body
+        return body
+
+    def book_body(self) -> bytes:
+        if self._book is None:
+            # 압축되지 않는 내용 (다운로드는 identity로 받으므로 의미는 없지만 실제 EPUB에 가깝게)
+            rnd = random.Random(self.config.seed)
+            block = bytes(rnd.getrandbits(8) for _i in range(64 * 1024))
+            self._book = (block * (self.config.book_size // len(block) + 1))[:self.config.book_size]
+        return self._book
+
+    def roll(self, rate) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        bench = self.server.bench
+        config = bench.config
+        with bench._lock:
+            bench.requests += 1
+        if config.latency:
+            time.sleep(config.latency)
+        url = urlsplit(self.path)
+        if bench.roll(config.error_rate) or url.path in bench.failing:
+            with bench._lock:
+                bench.injected_errors += 1
+            self._send_empty(503, {'Retry-After': '0'})
+            return
+
+        query = parse_qs(url.query)
+        match = _DOWNLOAD_RE.match(url.path)
+        if match:
+            self._send_book(match.group(2))
+            return
+        build = self._feed_builder(url.path, query, config)
+        if build is None:
+            self._send_empty(404)
+            return
+        encoding = self._encoding(config)
+        headers = {'Content-Type': _FEED_TYPE, 'Vary': 'Accept-Encoding'}
+        if config.etags:
+            raw = bench.feed_body(self.path, build, None)
+            etag = '"%s"' % hashlib.sha1(raw).hexdigest()[:16]
+            headers['ETag'] = etag
+            if self.headers.get('If-None-Match') == etag:
+                with bench._lock:
+                    bench.not_modified += 1
+                self._send_empty(304, headers)
+                return
+        body = bench.feed_body(self.path, build, encoding)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        self._send(200, headers, body)
+
+    def _feed_builder(self, path, query, config):
+        def arg(name, default):
+            return query.get(name, [default])[0]
+
+        bench = self.server.bench
+        if path in ('/', '/opds'):
+            return lambda: feedgen.navigation_feed(
+                config.categories + bench.added_categories, bench.navigation_stamps(),
+                dated=config.dated_navigation)
+        match = _CATEGORY_RE.match(path)
+        if match:
+            category, page = int(match.group(1)), int(arg('page', '0'))
+            next_url = None
+            if page + 1 < config.pages:
+                next_url = '/opds/category/%d?page=%d' % (category, page + 1)
+            start = (category * config.pages + page) * config.page_size
+            if category >= config.categories:
+                start += _ADDED_CATEGORY_START
+            size, feed_updated = config.page_size, None
+            if (category, page) == (config.categories - 1, config.pages - 1) and bench.added_books:
+                # 마지막 책 뒤에 붙이므로 다른 페이지의 id와 겹치지 않는다
+                size += bench.added_books
+                feed_updated = bench.added_stamp()
+            return lambda: feedgen.acquisition_feed(
+                size, next_url=next_url, start=start,
+                updated=bench.updated(category), feed_updated=feed_updated)
+        if path == '/opds/feed':
+            return lambda: feedgen.acquisition_feed(
+                int(arg('n', '100')), formats=int(arg('formats', '2')),
+                malformed=arg('malformed', '') or None,
+                summary_chars=int(arg('summary', '0')))
+        return None
+
+    def _encoding(self, config):
+        accepted = self.headers.get('Accept-Encoding', '')
+        if config.compression and config.compression in accepted:
+            return config.compression
+        return None
+
+    def _send_book(self, ext):
+        bench = self.server.bench
+        body = bench.book_body()
+        etag = '"bench-%d"' % len(body)
+        headers = {'Content-Type': _BOOK_TYPES.get(ext, 'application/octet-stream'),
+                   'Accept-Ranges': 'bytes', 'ETag': etag}
+        match = _RANGE_RE.match(self.headers.get('Range', ''))
+        if_range = self.headers.get('If-Range')
+        if match and (if_range is None or if_range == etag):
+            start = int(match.group(1))
+            if start >= len(body):
+                self._send_empty(416, {'Content-Range': 'bytes */%d' % len(body)})
+                return
+            headers['Content-Range'] = 'bytes %d-%d/%d' % (start, len(body) - 1, len(body))
+            self._send(206, headers, body[start:])
+            return
+        self._send(200, headers, body)
+
+    def _send_empty(self, status, headers=None):
+        self._send(status, headers or {}, b'')
+
+    def _send(self, status, headers, body):
+        bench = self.server.bench
+        config = bench.config
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if bench.roll(config.reset_rate) and len(body) > 1:
+            # 본문 절반만 보내고 연결을 끊는다
+            with bench._lock:
+                bench.injected_resets += 1
+            body = body[:len(body) // 2]
+            self.close_connection = True
+        self._write(body, config.bandwidth)
+        with bench._lock:
+            bench.bytes_sent += len(body)
+
+    def _write(self, body, bandwidth):
+        try:
+            if not bandwidth:
+                self.wfile.write(body)
+                return
+            started = time.monotonic()
+            view = memoryview(body)
+            for offset in range(0, len(body), _THROTTLE_CHUNK):
+                self.wfile.write(view[offset:offset + _THROTTLE_CHUNK])
+                ahead = (offset + _THROTTLE_CHUNK) / bandwidth - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local OPDS stand-in server for benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds per request')
+    parser.add_argument('--bandwidth', type=float, default=0, help='KB/s per connection')
+    parser.add_argument('--gzip', dest='compression', action='store_const', const='gzip')
+    parser.add_argument('--deflate', dest='compression', action='store_const', const='deflate')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--reset-rate', type=float, default=0.0)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--book-size', type=int, default=1024, help='KB')
+    parser.add_argument('--etags', action='store_true', help='ETag / If-None-Match for feeds')
+    opts = parser.parse_args(argv)
+    config = ServerConfig(
+        latency=opts.latency, bandwidth=int(opts.bandwidth * 1024),
+        compression=opts.compression, error_rate=opts.error_rate,
+        reset_rate=opts.reset_rate, categories=opts.categories,
+        page_size=opts.page_size, pages=opts.pages, book_size=opts.book_size * 1024,
+        etags=opts.etags)
+    server = BenchServer(config, opts.host, opts.port)
+    print('Serving %s/opds (Ctrl+C to stop)' % server.url)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
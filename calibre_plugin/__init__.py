@@ -1,3 +1,5 @@
+import sys
+
 from calibre.customize import InterfaceActionBase
 
 __license__ = 'BSD'
@@ -18,3 +20,8 @@ class OPDSClientPlugin(InterfaceActionBase):
 
     def is_customizable(self):
         return False
+
+    def cli_main(self, argv):
+        """calibre-debug -r "OPDS Client" -- SERVER ...: GUI 없이 카탈로그를 미러링."""
+        from calibre_plugins.opds_client.mirror import main
+        sys.exit(main(argv[1:]))
@@ -0,0 +1,491 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import List, NamedTuple
+from urllib.parse import urljoin, urlsplit
+
+from .config import data_dir
+from .opds_parser import parse_feed, BookEntry, NavigationFeed
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# 한 번의 크롤에서 따라가는 페이지 수 상한 (next 링크가 끝없이 바뀌는 서버 대비)
+_MAX_CRAWL_PAGES = 20000
+_SEARCH_LIMIT = 500
+
+# bm25 열 가중치: title, authors, publisher, summary, formats
+_RANK_WEIGHTS = (10.0, 5.0, 2.0, 1.0, 0.5)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS books (
+    id        INTEGER PRIMARY KEY,
+    key       TEXT UNIQUE NOT NULL,
+    page      TEXT NOT NULL,
+    gen       INTEGER NOT NULL,
+    title     TEXT NOT NULL,
+    authors   TEXT NOT NULL,
+    publisher TEXT NOT NULL,
+    summary   TEXT NOT NULL,
+    cover_url TEXT NOT NULL,
+    formats   TEXT NOT NULL,
+    extra     TEXT NOT NULL DEFAULT '{}',
+    stamp     TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS books_page ON books(page);
+CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+    title, authors, publisher, summary, formats,
+    prefix='2 3'
+);
+CREATE TABLE IF NOT EXISTS pages (
+    url           TEXT PRIMARY KEY,
+    digest        TEXT NOT NULL,
+    children      TEXT NOT NULL,
+    etag          TEXT NOT NULL DEFAULT '',
+    last_modified TEXT NOT NULL DEFAULT '',
+    updated       TEXT NOT NULL DEFAULT '',
+    listed        TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS page_books (
+    page TEXT NOT NULL,
+    key  TEXT NOT NULL,
+    PRIMARY KEY (page, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS crawl_queue (
+    seq    INTEGER PRIMARY KEY,
+    url    TEXT UNIQUE NOT NULL,
+    done   INTEGER NOT NULL DEFAULT 0,
+    listed TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS sync_changes (
+    key   TEXT PRIMARY KEY,
+    kind  TEXT NOT NULL,
+    title TEXT NOT NULL
+);
+'''
+
+# books.extra에 JSON으로 두는 BookEntry 필드 (가져오기 때 쓰는 메타데이터)
+_EXTRA_FIELDS = ('identifiers', 'series', 'series_index', 'tags', 'languages', 'pubdate',
+                 'id', 'updated')
+
+# crawl_queue.done 값: 받지 못한 새 페이지는 다음 동기화에서 다시 시도한다
+_PENDING = 0
+_DONE = 1
+_FAILED = 2
+
+# SyncDiff 종류 (sync_changes.kind)
+_ADDED = 'added'
+_CHANGED = 'changed'
+
+# 검색어 안의 author:xxx / format:xxx 필터
+_FILTER_RE = re.compile(r'\b(author|format):("[^"]*"|\S+)', re.IGNORECASE)
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def index_path(server: dict) -> str:
+    """서버(URL + 사용자)마다 별도의 SQLite 파일."""
+    raw = '\0'.join((server.get('url', ''), server.get('username', '')))
+    name = hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16] + '.sqlite'
+    return os.path.join(data_dir('index'), name)
+
+
+class SyncDiff(NamedTuple):
+    """sync() 한 번으로 달라진 책. 각 목록은 (key, title) 튜플."""
+    added: List[tuple]
+    changed: List[tuple]
+    removed: List[tuple]
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.changed or self.removed)
+
+
+class SyncIncomplete(Exception):
+    """
+    처음 보는 페이지를 받거나 파싱하지 못해 동기화를 마치지 못했다.
+    failed는 (url, 오류) 목록. 진행 상태는 남으므로 다시 sync()하면 그 페이지부터 시도한다.
+    """
+
+    def __init__(self, failed):
+        super().__init__('%d catalog pages could not be read (first: %s: %s)'
+                         % (len(failed), failed[0][0], failed[0][1]))
+        self.failed = failed
+
+
+class _PageUnavailable(Exception):
+    pass
+
+
+def _book_key(entry: BookEntry, page: str) -> str:
+    if entry.id:
+        return entry.id
+    if entry.formats:
+        return entry.formats[0].url
+    return '\0'.join([page, entry.title] + list(entry.authors))
+
+
+def _fts_phrase(text: str) -> str:
+    tokens = _TOKEN_RE.findall(text)
+    return ' '.join('"%s"*' % t for t in tokens)
+
+
+def build_match(query: str) -> str:
+    """
+    검색창 문자열을 FTS5 MATCH 식으로 바꾼다.
+    모든 단어를 접두어 일치로 AND 하고, author:이름 / format:epub 은 해당 열로 제한한다.
+    """
+    parts = []
+    for kind, value in _FILTER_RE.findall(query):
+        phrase = _fts_phrase(value.strip('"'))
+        if phrase:
+            column = 'authors' if kind.lower() == 'author' else 'formats'
+            parts.append('%s : (%s)' % (column, phrase))
+    rest = _fts_phrase(_FILTER_RE.sub(' ', query))
+    if rest:
+        parts.insert(0, rest)
+    return ' AND '.join(parts)
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class CatalogIndex:
+    """
+    서버 하나의 카탈로그를 담는 로컬 SQLite FTS5 색인.
+
+    크롤 진행 상태(crawl_queue)와 페이지별 스냅샷(pages: digest, 검증자, <updated>, 하위 피드;
+    page_books: 실린 책)도 같은 파일에 두어, 중단된 동기화는 이어서 진행하고
+    바뀌지 않은 하위 트리는 요청하지 않는다.
+    연결은 만든 스레드에서만 쓴다 — 크롤 스레드와 GUI는 각자 인스턴스를 연다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        columns = {row[1] for row in self._db.execute('PRAGMA table_info(books)')}
+        if 'stamp' not in columns:
+            # 책 키가 entry <id>로 바뀌고 페이지별 스냅샷이 생겼다:
+            # 예전 색인은 버리고 다음 동기화에서 처음부터 만든다
+            self._db.executescript(
+                'DROP TABLE books; DROP TABLE books_fts; DROP TABLE pages; '
+                'DROP TABLE crawl_queue; DELETE FROM meta;')
+            self._db.executescript(_SCHEMA)
+
+    @classmethod
+    def for_server(cls, server: dict) -> 'CatalogIndex':
+        return cls(index_path(server))
+
+    def close(self):
+        self._db.close()
+
+    # ------------------------------------------------------------------
+    # Meta
+    # ------------------------------------------------------------------
+
+    def _get_meta(self, key, default=None):
+        row = self._db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self._db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                         (key, str(value)))
+
+    @property
+    def completed_at(self) -> float:
+        """마지막으로 끝까지 마친 크롤 시각 (없으면 0)."""
+        return float(self._get_meta('completed_at', 0))
+
+    @property
+    def crawl_pending(self) -> bool:
+        return self._get_meta('crawl_gen') is not None
+
+    def failed_pages(self) -> int:
+        """진행 중인 동기화에서 받지 못한 페이지 수."""
+        return self._db.execute(
+            'SELECT COUNT(*) FROM crawl_queue WHERE done = ?', (_FAILED,)).fetchone()[0]
+
+    def book_count(self) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM books').fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(self, query: str, limit=_SEARCH_LIMIT):
+        """관련도(bm25) 순으로 BookEntry 목록을 반환."""
+        match = build_match(query)
+        if not match:
+            return []
+        rows = self._db.execute(
+            'SELECT b.title, b.authors, b.formats, b.summary, b.cover_url, b.publisher, b.extra '
+            'FROM books_fts JOIN books b ON b.id = books_fts.rowid '
+            'WHERE books_fts MATCH ? ORDER BY bm25(books_fts, %s) LIMIT ?'
+            % ', '.join(str(w) for w in _RANK_WEIGHTS),
+            (match, limit)).fetchall()
+        return [
+            BookEntry(title=title, authors=json.loads(authors),
+                      formats=json.loads(formats), summary=summary,
+                      cover_url=cover_url, publisher=publisher, **json.loads(extra))
+            for title, authors, formats, summary, cover_url, publisher, extra in rows
+        ]
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def sync(self, root_url: str, fetch, should_stop=lambda: False, progress=None):
+        """
+        root_url부터 navigation / acquisition 트리를 넓이 우선으로 훑어 색인을 카탈로그에 맞춘다.
+        fetch(url, etag, last_modified)는 호출 측이 주는 조건부 GET으로,
+        304면 None, 아니면 (본문, ETag, Last-Modified)를 반환한다.
+
+        상위 navigation entry의 <updated>가 지난번과 같으면 그 피드 아래 하위 트리를
+        요청하지 않고 지난번 스냅샷대로 둔다. 저장해 둔 ETag / Last-Modified로 보낸 조건부
+        요청에 304이거나 본문 또는 (acquisition 피드의) feed <updated>가 같으면 그 페이지만
+        다시 파싱하지 않고, 하위 피드는 각자 (조건부로) 확인한다. 그래서 entry마다 <updated>를 싣는 서버는
+        바뀌지 않은 카탈로그를 루트 요청 한 번으로, 그렇지 않은 서버는 페이지마다 304로 맞춘다.
+
+        중간에 멈추면(should_stop) None을 반환하고 다음 호출에서 이어간다.
+        처음 보는 페이지를 받지 못하면 그 하위 트리를 알 수 없으므로 나머지를 다 훑은 뒤
+        SyncIncomplete를 던지고 완료로 기록하지 않는다 (다음 호출이 그 페이지부터 다시 시도).
+        끝까지 마치면 이번에 보이지 않은 책을 지우고 SyncDiff를 반환한다.
+        progress(pages_done, books)는 페이지마다 불린다.
+        """
+        gen = self._begin(root_url)
+        host = urlsplit(root_url).netloc
+        pages_done = self._db.execute(
+            'SELECT COUNT(*) FROM crawl_queue WHERE done = ?', (_DONE,)).fetchone()[0]
+        failed = []
+
+        while pages_done < _MAX_CRAWL_PAGES:
+            row = self._db.execute(
+                'SELECT seq, url, listed FROM crawl_queue WHERE done = ? '
+                'ORDER BY seq LIMIT 1', (_PENDING,)).fetchone()
+            if row is None:
+                break
+            if should_stop():
+                return None
+            seq, url, listed = row
+            try:
+                children = self._sync_page(url, listed, gen, host, fetch)
+            except _PageUnavailable as e:
+                failed.append((url, e.__cause__))
+                with self._db:
+                    self._db.execute('UPDATE crawl_queue SET done = ? WHERE seq = ?',
+                                     (_FAILED, seq))
+                continue
+            with self._db:
+                self._db.executemany(
+                    'INSERT OR IGNORE INTO crawl_queue (url, listed) VALUES (?, ?)',
+                    [(c, updated) for c, updated in children if urlsplit(c).netloc == host])
+                self._db.execute('UPDATE crawl_queue SET done = ? WHERE seq = ?', (_DONE, seq))
+            pages_done += 1
+            if progress is not None:
+                progress(pages_done, self.book_count())
+
+        if failed:
+            raise SyncIncomplete(failed)
+        return self._finish(gen)
+
+    def _begin(self, root_url) -> int:
+        gen = self._get_meta('crawl_gen')
+        if gen is not None and self._get_meta('crawl_root') == root_url:
+            # 중단된 동기화 이어서 (지난번에 받지 못한 페이지도 다시 시도)
+            with self._db:
+                self._db.execute('UPDATE crawl_queue SET done = ? WHERE done = ?',
+                                 (_PENDING, _FAILED))
+            return int(gen)
+        gen = int(self._get_meta('last_gen', 0)) + 1
+        with self._db:
+            self._db.execute('DELETE FROM crawl_queue')
+            self._db.execute('DELETE FROM sync_changes')
+            self._db.execute('INSERT INTO crawl_queue (url) VALUES (?)', (root_url,))
+            self._set_meta('crawl_gen', gen)
+            self._set_meta('crawl_root', root_url)
+        return gen
+
+    def _finish(self, gen) -> SyncDiff:
+        with self._db:
+            stale = self._db.execute(
+                'SELECT id, key, title FROM books WHERE gen != ?', (gen,)).fetchall()
+            self._db.executemany('DELETE FROM books_fts WHERE rowid = ?',
+                                 [(row[0],) for row in stale])
+            self._db.execute('DELETE FROM books WHERE gen != ?', (gen,))
+            self._db.execute('DELETE FROM pages WHERE url NOT IN (SELECT url FROM crawl_queue)')
+            self._db.execute(
+                'DELETE FROM page_books WHERE page NOT IN (SELECT url FROM crawl_queue)')
+            changes = self._db.execute(
+                'SELECT kind, key, title FROM sync_changes ORDER BY rowid').fetchall()
+            self._db.execute('DELETE FROM sync_changes')
+            self._db.execute('DELETE FROM crawl_queue')
+            self._db.execute("DELETE FROM meta WHERE key IN ('crawl_gen', 'crawl_root')")
+            self._set_meta('last_gen', gen)
+            self._set_meta('completed_at', time.time())
+        return SyncDiff(
+            added=[(key, title) for kind, key, title in changes if kind == _ADDED],
+            changed=[(key, title) for kind, key, title in changes if kind == _CHANGED],
+            removed=[(key, title) for _id, key, title in stale],
+        )
+
+    def _sync_page(self, url, listed, gen, host, fetch):
+        """
+        페이지 하나를 맞추고 따라갈 (url, 상위 entry의 updated) 목록을 반환.
+        listed는 이 페이지를 가리킨 navigation entry의 <updated> (없으면 '').
+        """
+        known = self._db.execute(
+            'SELECT digest, children, etag, last_modified, updated, listed '
+            'FROM pages WHERE url = ?', (url,)).fetchone()
+        if known is not None and listed and listed == known[5]:
+            self._keep_subtree(url, gen, host)
+            return []
+
+        try:
+            response = fetch(url, known[2] if known else '', known[3] if known else '')
+        except Exception as e:
+            # 받지 못한 페이지: 알던 책은 이번 세대로 유지하고 하위 피드는 각자 확인한다.
+            # 처음 보는 페이지는 하위 트리를 모르므로 실패로 남긴다
+            if known is None:
+                raise _PageUnavailable(url) from e
+            return self._keep_page(url, gen, known)
+        if response is None:
+            if known is None:
+                raise _PageUnavailable(url) from ValueError('304 without a stored copy')
+            return self._keep_page(url, gen, known, listed=listed or known[5])
+
+        data, etag, last_modified = response
+        digest = hashlib.sha1(data).hexdigest()
+        if known is not None and digest == known[0]:
+            return self._keep_page(url, gen, known, etag=etag, last_modified=last_modified,
+                                   listed=listed or known[5])
+
+        try:
+            feed = parse_feed(data)
+        except Exception as e:
+            if known is None:
+                raise _PageUnavailable(url) from e
+            return self._keep_page(url, gen, known)
+        # navigation 피드는 본문이 바뀌면 다시 읽는다: feed <updated>를 고치지 않고
+        # 카테고리를 더하는 서버에서 저장해 둔 하위 목록을 쓰면 새 하위 트리를 놓친다
+        if (known is not None and feed.updated and feed.updated == known[4]
+                and not isinstance(feed, NavigationFeed)):
+            return self._keep_page(url, gen, known, digest=digest, etag=etag,
+                                   last_modified=last_modified, listed=listed or known[5])
+
+        if isinstance(feed, NavigationFeed):
+            children = [(urljoin(url, e.url), e.updated) for e in feed.entries if e.url]
+        else:
+            children = [(urljoin(url, feed.next_url), '')] if feed.next_url else []
+
+        with self._db:
+            self._db.execute('DELETE FROM page_books WHERE page = ?', (url,))
+            if not isinstance(feed, NavigationFeed):
+                for entry in feed.entries:
+                    self._put_book(entry, url, gen)
+            self._db.execute(
+                'INSERT OR REPLACE INTO pages (url, digest, children, etag, last_modified, '
+                'updated, listed) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, digest, json.dumps(children), etag or '', last_modified or '',
+                 feed.updated, listed))
+        return children
+
+    def _keep_page(self, url, gen, known, **columns):
+        """
+        바뀌지 않은 페이지(304, 같은 본문, 같은 feed <updated>, 또는 받지 못함)의 책을
+        이번 세대로 유지하고, 저장해 둔 하위 피드를 지난번 <updated>와 함께 다시 큐에 넣는다.
+        문서 하나가 그대로라도 그 아래 피드는 바뀌었을 수 있으므로 하위 트리를 건너뛰지는 않는다.
+        columns는 갱신할 pages 열 (새 검증자 등).
+        """
+        with self._db:
+            self._keep_books(url, gen)
+            if columns:
+                self._db.execute(
+                    'UPDATE pages SET %s WHERE url = ?'
+                    % ', '.join('%s = ?' % c for c in columns),
+                    [value or '' for value in columns.values()] + [url])
+        return [tuple(child) for child in json.loads(known[1])]
+
+    def _keep_books(self, page, gen):
+        self._db.execute(
+            'UPDATE books SET gen = ? WHERE key IN (SELECT key FROM page_books WHERE page = ?)',
+            (gen, page))
+
+    def _keep_subtree(self, url, gen, host):
+        """
+        url과 지난번에 그 아래에서 본 페이지를 요청 없이 이번 세대로 유지한다.
+        스냅샷이 없는 하위 페이지(지난번에 받지 못한 곳)는 건너뛰지 않고 큐에 남겨 받는다.
+        """
+        todo = [url]
+        seen = {url}
+        with self._db:
+            while todo:
+                page = todo.pop()
+                row = self._db.execute(
+                    'SELECT children FROM pages WHERE url = ?', (page,)).fetchone()
+                if page != url:
+                    self._db.execute(
+                        'INSERT OR IGNORE INTO crawl_queue (url) VALUES (?)', (page,))
+                    if row is None:
+                        continue
+                    self._db.execute('UPDATE crawl_queue SET done = ? WHERE url = ?',
+                                     (_DONE, page))
+                self._keep_books(page, gen)
+                for child, _updated in json.loads(row[0]):
+                    if child not in seen and urlsplit(child).netloc == host:
+                        seen.add(child)
+                        todo.append(child)
+
+    def _put_book(self, entry, page, gen):
+        key = _book_key(entry, page)
+        record = entry.to_dict()
+        # entry <updated>가 없는 서버는 내용이 바뀌었는지로 판단한다
+        stamp = entry.updated or hashlib.sha1(
+            json.dumps(record, sort_keys=True).encode('utf-8')).hexdigest()
+        self._db.execute('INSERT OR IGNORE INTO page_books (page, key) VALUES (?, ?)',
+                         (page, key))
+        row = self._db.execute('SELECT id, stamp FROM books WHERE key = ?', (key,)).fetchone()
+        if row is not None and row[1] == stamp:
+            self._db.execute('UPDATE books SET gen = ? WHERE id = ?', (gen, row[0]))
+            return
+
+        authors = json.dumps(entry.authors)
+        formats = json.dumps(record['formats'])
+        extra = json.dumps({name: record[name] for name in _EXTRA_FIELDS})
+        if row is not None:
+            book_id = row[0]
+            self._db.execute('DELETE FROM books_fts WHERE rowid = ?', (book_id,))
+            self._db.execute(
+                'UPDATE books SET page = ?, gen = ?, title = ?, authors = ?, publisher = ?, '
+                'summary = ?, cover_url = ?, formats = ?, extra = ?, stamp = ? WHERE id = ?',
+                (page, gen, entry.title, authors, entry.publisher, entry.summary,
+                 entry.cover_url, formats, extra, stamp, book_id))
+            kind = _CHANGED
+        else:
+            book_id = self._db.execute(
+                'INSERT INTO books (key, page, gen, title, authors, publisher, summary, '
+                'cover_url, formats, extra, stamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, page, gen, entry.title, authors, entry.publisher, entry.summary,
+                 entry.cover_url, formats, extra, stamp)).lastrowid
+            kind = _ADDED
+        # 이번 동기화에서 이미 추가로 기록된 책은 추가로 남긴다
+        self._db.execute('INSERT OR IGNORE INTO sync_changes (key, kind, title) VALUES (?, ?, ?)',
+                         (key, kind, entry.title))
+        self._db.execute(
+            'INSERT INTO books_fts (rowid, title, authors, publisher, summary, formats) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (book_id, entry.title, ' '.join(entry.authors), entry.publisher,
+             entry.summary, ' '.join(f.type for f in entry.formats)))
@@ -1,9 +1,25 @@
+import os
+
+from calibre.constants import config_dir
 from calibre.utils.config import JSONConfig
 
 prefs = JSONConfig('plugins/opds_client')
 
 prefs.defaults['servers'] = []
 prefs.defaults['last_server'] = 0
+prefs.defaults['max_connections_per_host'] = 4
+prefs.defaults['idle_connection_timeout'] = 30
+prefs.defaults['download_workers'] = 3
+prefs.defaults['max_downloads_per_host'] = 2
+prefs.defaults['feed_cache_max_mb'] = 50
+prefs.defaults['parsed_cache_max_mb'] = 64
+prefs.defaults['load_all_max_pages'] = 50
+prefs.defaults['show_covers'] = True
+prefs.defaults['cover_cache_max_mb'] = 100
+prefs.defaults['retry_policy'] = {}
+prefs.defaults['import_batch_size'] = 10
+prefs.defaults['import_batch_delay'] = 5
+prefs.defaults['telemetry_max_spans'] = 1000
 
 
 def load_servers():
@@ -25,3 +41,10 @@ def get_last_server():
 
 def set_last_server(index):
     prefs['last_server'] = index
+
+
+def data_dir(*parts):
+    """Calibre 설정 디렉터리 아래의 플러그인 데이터 디렉터리 (없으면 생성)."""
+    path = os.path.join(config_dir, 'plugins', 'opds_client', *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,209 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import urljoin
+
+from PyQt5.QtCore import QObject, QSize, pyqtSignal
+from PyQt5.QtGui import QPixmap
+
+from .config import prefs, data_dir
+from .network import CoverThread
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+THUMB_SIZE = QSize(40, 60)
+
+_COVER_WORKERS = 4
+# 메모리에 두는 QPixmap 수 (40x60 RGBA ≈ 10KB → 약 10MB)
+_MEMORY_COVERS = 1000
+# 대기열 상한. 빠르게 스크롤해 지나간 행의 요청은 오래된 것부터 버린다
+_MAX_PENDING = 200
+# 디스크 캐시 정리는 이 횟수의 put마다 한 번 (디렉터리 훑기 비용 분산)
+_EVICT_EVERY = 50
+
+
+# ---------------------------------------------------------------------------
+# Disk cache
+# ---------------------------------------------------------------------------
+
+class CoverDiskCache:
+    """
+    축소한 표지 이미지를 URL의 SHA-1 파일명으로 보관하는 디스크 캐시.
+    접근 시각은 파일 mtime으로 기록하고, 크기 상한을 넘으면 오래된 것부터 지운다.
+    여러 CoverThread에서 동시에 호출된다.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._puts = 0
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.root, hashlib.sha1(url.encode('utf-8')).hexdigest())
+
+    def get(self, url: str):
+        path = self._path(url)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path, None)
+            return data
+        except OSError:
+            return None
+
+    def put(self, url: str, data: bytes):
+        path = self._path(url)
+        try:
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            return
+        with self._lock:
+            self._puts += 1
+            if self._puts % _EVICT_EVERY == 0:
+                self._evict()
+
+    def _evict(self):
+        files = []
+        total = 0
+        for entry in os.scandir(self.root):
+            if entry.is_file():
+                st = entry.stat()
+                files.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        files.sort()
+        for _mtime, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+# ---------------------------------------------------------------------------
+# Work queue
+# ---------------------------------------------------------------------------
+
+class CoverQueue:
+    """
+    CoverThread들이 나눠 가져가는 LIFO 대기열.
+    가장 최근에 화면에 그려진 행의 표지를 먼저 받는다.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._items = OrderedDict()     # url -> server
+        self._closed = False
+
+    def put(self, url, server) -> list:
+        """넣고, 상한을 넘어 버린 URL 목록을 반환."""
+        dropped = []
+        with self._cond:
+            self._items.pop(url, None)
+            self._items[url] = server
+            while len(self._items) > _MAX_PENDING:
+                dropped.append(self._items.popitem(last=False)[0])
+            self._cond.notify()
+        return dropped
+
+    def take(self):
+        """(url, server) 또는 닫혔으면 None. 항목이 생길 때까지 기다린다."""
+        with self._cond:
+            while not self._items and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+            return self._items.popitem(last=True)
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._items.clear()
+            self._cond.notify_all()
+
+
+# ---------------------------------------------------------------------------
+# Loader
+# ---------------------------------------------------------------------------
+
+class CoverLoader(QObject):
+    """
+    표지 썸네일 로더. pixmap(url)은 메모리에 있으면 바로 돌려주고,
+    없으면 작업을 대기열에 넣고 None을 반환한다. 준비되면 cover_ready(url)을 보낸다.
+
+    내려받기와 디코딩/축소는 CoverThread 풀에서, QPixmap 변환만 GUI 스레드에서 한다.
+    """
+
+    cover_ready = pyqtSignal(str)
+
+    def __init__(self, gui=None, parent=None):
+        super().__init__(parent)
+        self.server = None
+        self.base_url = ''
+        self._memory = OrderedDict()    # url -> QPixmap
+        self._requested = set()
+        self._failed = set()
+        self._queue = CoverQueue()
+        max_bytes = int(prefs['cover_cache_max_mb']) * 1024 * 1024
+        disk = CoverDiskCache(data_dir('covers'), max_bytes)
+        self._threads = []
+        for _ in range(_COVER_WORKERS):
+            thread = CoverThread(self._queue, disk, THUMB_SIZE, gui)
+            thread.loaded.connect(self._on_loaded)
+            thread.failed.connect(self._on_failed)
+            thread.finished.connect(thread.deleteLater)
+            self._threads.append(thread)
+            thread.start()
+
+    def set_source(self, server, base_url):
+        """
+        이후 요청에 쓸 서버(인증)와 상대 URL 기준 주소.
+        다른 목록으로 바뀌면 아직 시작하지 않은 이전 목록의 요청은 버린다.
+        """
+        base_url = base_url or ''
+        if base_url != self.base_url:
+            self._queue.clear()
+            self._requested.clear()
+        self.server = server
+        self.base_url = base_url
+
+    def pixmap(self, url: str):
+        url = urljoin(self.base_url, url)
+        pixmap = self._memory.get(url)
+        if pixmap is not None:
+            self._memory.move_to_end(url)
+            return pixmap
+        if url not in self._requested and url not in self._failed and self.server:
+            self._requested.add(url)
+            self._requested.difference_update(self._queue.put(url, self.server))
+        return None
+
+    def shutdown(self):
+        for thread in self._threads:
+            thread.loaded.disconnect()
+            thread.failed.disconnect()
+            thread.requestInterruption()
+        self._threads = []
+        self._queue.close()
+
+    def _on_loaded(self, url, image):
+        self._requested.discard(url)
+        self._memory[url] = QPixmap.fromImage(image)
+        while len(self._memory) > _MEMORY_COVERS:
+            self._memory.popitem(last=False)
+        self.cover_ready.emit(url)
+
+    def _on_failed(self, url):
+        self._requested.discard(url)
+        self._failed.add(url)
@@ -0,0 +1,221 @@
+import time
+from urllib.parse import urlsplit
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QComboBox,
+    QTableWidget, QTableWidgetItem, QAbstractItemView, QHeaderView, QSplitter,
+)
+from PyQt5.QtCore import Qt, QTimer
+
+from calibre.gui2 import choose_save_file, error_dialog
+
+from .telemetry import (
+    COVER, DOWNLOAD, FEED, PHASES, export_csv, export_json, get_telemetry,
+)
+
+load_translations()
+
+# 열려 있는 동안 이 간격(ms)으로 새 기록이 있는지 본다
+_REFRESH_INTERVAL = 1000
+
+_KIND_LABELS = {
+    FEED:     _('Feed'),
+    DOWNLOAD: _('Download'),
+    COVER:    _('Cover'),
+}
+
+_METRIC_LABELS = (
+    ('total',    _('Total')),
+    ('ttfb',     _('Time to first byte')),
+    ('transfer', _('Transfer')),
+    ('parse',    _('Parse')),
+    ('render',   _('Render')),
+)
+
+_PHASE_LABELS = {
+    'dns':      _('DNS'),
+    'connect':  _('Connect'),
+    'tls':      _('TLS'),
+    'ttfb':     _('TTFB'),
+    'transfer': _('Transfer'),
+    'parse':    _('Parse'),
+    'render':   _('Render'),
+}
+
+
+def _ms(seconds) -> str:
+    return '' if seconds is None else '%.0f' % (seconds * 1000)
+
+
+class DiagnosticsPanel(QWidget):
+    """
+    최근 요청의 구간별 시간(telemetry)을 보여주는 OPDSDialog의 진단 탭.
+    위: 서버별 p50/p95/p99, 아래: 요청 목록(최신순). JSON/CSV로 내보낼 수 있다.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._shown_generation = None
+        self._build_ui()
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(_REFRESH_INTERVAL)
+        self._timer.timeout.connect(self._refresh_if_changed)
+
+    def _build_ui(self):
+        layout = QVBoxLayout(self)
+
+        top = QHBoxLayout()
+        top.addWidget(QLabel(_('Percentiles of:')))
+        self.metric_combo = QComboBox()
+        for metric, label in _METRIC_LABELS:
+            self.metric_combo.addItem(label, metric)
+        top.addWidget(self.metric_combo)
+        self.kind_combo = QComboBox()
+        self.kind_combo.addItem(_('All requests'), None)
+        for kind in (FEED, DOWNLOAD, COVER):
+            self.kind_combo.addItem(_KIND_LABELS[kind], kind)
+        top.addWidget(self.kind_combo)
+        top.addStretch()
+        self.lbl_count = QLabel('')
+        top.addWidget(self.lbl_count)
+        layout.addLayout(top)
+
+        self.host_table = self._make_table(
+            [_('Server'), _('Requests'), _('Errors'), _('p50 (ms)'), _('p95 (ms)'), _('p99 (ms)')])
+        self.span_table = self._make_table(
+            [_('Time'), _('Kind'), _('Server'), _('Path'), _('Status'), _('Cache'),
+             _('Retries'), _('KB')] +
+            ['%s (ms)' % _PHASE_LABELS[p] for p in PHASES] + [_('Total (ms)')])
+
+        try:
+            splitter = QSplitter(Qt.Vertical)
+        except AttributeError:
+            splitter = QSplitter(Qt.Orientation.Vertical)
+        splitter.addWidget(self.host_table)
+        splitter.addWidget(self.span_table)
+        splitter.setStretchFactor(1, 3)
+        layout.addWidget(splitter, 1)
+
+        buttons = QHBoxLayout()
+        self.btn_export_json = QPushButton(_('Export JSON…'))
+        self.btn_export_csv = QPushButton(_('Export CSV…'))
+        self.btn_clear = QPushButton(_('Clear'))
+        buttons.addWidget(self.btn_export_json)
+        buttons.addWidget(self.btn_export_csv)
+        buttons.addStretch()
+        buttons.addWidget(self.btn_clear)
+        layout.addLayout(buttons)
+
+        self.metric_combo.currentIndexChanged.connect(lambda _i: self.refresh())
+        self.kind_combo.currentIndexChanged.connect(lambda _i: self.refresh())
+        self.btn_export_json.clicked.connect(lambda: self._export('json'))
+        self.btn_export_csv.clicked.connect(lambda: self._export('csv'))
+        self.btn_clear.clicked.connect(self._on_clear)
+
+    @staticmethod
+    def _make_table(labels):
+        table = QTableWidget(0, len(labels))
+        table.setHorizontalHeaderLabels(labels)
+        try:
+            table.setSelectionBehavior(QAbstractItemView.SelectRows)
+            table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+            _contents = QHeaderView.ResizeToContents
+        except AttributeError:
+            table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+            table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+            _contents = QHeaderView.ResizeMode.ResizeToContents
+        table.horizontalHeader().setSectionResizeMode(_contents)
+        table.verticalHeader().setVisible(False)
+        return table
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self._timer.start()
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
+
+    def _refresh_if_changed(self):
+        if get_telemetry().generation != self._shown_generation:
+            self.refresh()
+
+    def refresh(self):
+        telemetry = get_telemetry()
+        self._shown_generation = telemetry.generation
+        spans = telemetry.spans()
+        self.lbl_count.setText(_('%(count)d of the last %(max)d requests') % {
+            'count': len(spans), 'max': telemetry.max_spans})
+        self._fill_hosts(telemetry.percentiles(self.metric_combo.currentData() or 'total',
+                                               self.kind_combo.currentData()))
+        self._fill_spans(spans)
+
+    def _fill_hosts(self, stats):
+        table = self.host_table
+        table.setRowCount(len(stats))
+        # p95가 나쁜 서버가 위로
+        hosts = sorted(stats, key=lambda h: -(stats[h]['p95'] or 0))
+        for row, host in enumerate(hosts):
+            s = stats[host]
+            values = (host, str(s['count']), str(s['errors']),
+                      _ms(s['p50']), _ms(s['p95']), _ms(s['p99']))
+            for col, value in enumerate(values):
+                table.setItem(row, col, QTableWidgetItem(value))
+
+    def _fill_spans(self, spans):
+        table = self.span_table
+        table.setUpdatesEnabled(False)
+        table.setRowCount(len(spans))
+        for row, span in enumerate(reversed(spans)):
+            path = urlsplit(span.url).path or '/'
+            values = [
+                time.strftime('%H:%M:%S', time.localtime(span.started)),
+                _KIND_LABELS.get(span.kind, span.kind),
+                span.host,
+                path,
+                str(span.status or ''),
+                span.cache,
+                str(max(0, span.attempts - 1)),
+                '%.1f' % (span.wire_bytes / 1024),
+            ] + [_ms(getattr(span, p)) for p in PHASES] + [
+                _ms(span.total) if span.finished else _('running'),
+            ]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                item.setToolTip(span.error or span.url)
+                table.setItem(row, col, item)
+        table.setUpdatesEnabled(True)
+
+    # ------------------------------------------------------------------
+    # Actions
+    # ------------------------------------------------------------------
+
+    def _export(self, fmt):
+        if fmt == 'json':
+            filters = [(_('JSON files'), ['json'])]
+        else:
+            filters = [(_('CSV files'), ['csv'])]
+        path = choose_save_file(
+            self, 'opds-client-diagnostics-export', _('Export request timings'),
+            filters=filters, all_files=False,
+            initial_filename='opds-timings.%s' % fmt)
+        if not path:
+            return
+        spans = get_telemetry().spans()
+        try:
+            if fmt == 'json':
+                export_json(spans, path)
+            else:
+                export_csv(spans, path)
+        except OSError as e:
+            error_dialog(self, _('Export failed'), str(e), show=True)
+
+    def _on_clear(self):
+        get_telemetry().clear()
+        self.refresh()
@@ -1,5 +1,6 @@
 import os
-import tempfile
+import sqlite3
+import time
 import urllib.parse
 from urllib.parse import urljoin
 
@@ -7,35 +8,49 @@ from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QComboBox, QPushButton,
     QLabel, QStackedWidget, QListWidget, QListWidgetItem,
     QTableView, QAbstractItemView, QLineEdit, QMessageBox,
-    QHeaderView,
+    QHeaderView, QProgressBar, QCheckBox, QTabWidget, QWidget,
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread
 
-from calibre.gui2 import error_dialog, info_dialog
+from calibre.gui2 import error_dialog
 
 try:
     _USER_ROLE = Qt.UserRole
 except AttributeError:
     _USER_ROLE = Qt.ItemDataRole.UserRole
 
-from .config import load_servers, get_last_server, set_last_server
-from .opds_parser import parse_feed, NavigationFeed, AcquisitionFeed
+from .catalog_index import CatalogIndex, index_path
+from .config import prefs, load_servers, get_last_server, set_last_server
+from .feed_cache import cache_key, get_parsed_cache
+from .opds_parser import NavigationFeed, AcquisitionFeed
 from .model import BookTableModel
-from .network import FetchThread, DownloadThread
+from .covers import CoverLoader, THUMB_SIZE
+from .diagnostics import DiagnosticsPanel
+from .network import (
+    FetchThread, IndexThread, LoadAllThread, OpenSearchThread, PrefetchThread,
+)
+from .opensearch import expand_template, get_opensearch_cache, is_template
+from .download_queue import FAILED, CANCELLED
+from .queue_dialog import DownloadQueueDialog
+from .telemetry import get_telemetry
 from .server_dialog import ServerManagerDialog
 
 load_translations()
 
+# 열 너비를 맞출 때 재 보는 행 수
+_COLUMN_SAMPLE_ROWS = 100
+
 
 # ---------------------------------------------------------------------------
 # Main dialog
 # ---------------------------------------------------------------------------
 
 class OPDSDialog(QDialog):
-    def __init__(self, gui, icon, do_add_books):
+    def __init__(self, gui, icon, downloads, library=None):
         super().__init__(gui)
         self.gui = gui
-        self.do_add_books = do_add_books
+        self.downloads = downloads
+        self.library = library
         self.setWindowTitle(_('OPDS Client'))
         self.setMinimumWidth(700)
         self.setMinimumHeight(500)
@@ -45,15 +60,31 @@ class OPDSDialog(QDialog):
         self._breadcrumb = []
         self._current_feed = None
         self._fetch_thread = None
-        self._download_thread = None
+        self._fetch_key = None
+        self._shown_digest = None
+        self._prefetch_thread = None
+        self._load_all_thread = None
+        self._load_all_pages = 0
+        self._load_all_more = False
+        self._index_thread = None
+        self._index = None
+        self._search_link = None     # 현재 서버의 OpenSearch 설명 문서 URL
+        self._osd_thread = None
+        self._pending_query = None
+        self._covers = None
+        self._queue_dialog = None
 
         self._build_ui()
+        self.book_model.set_library_index(library)
+        self._row_height = self.book_table.verticalHeader().defaultSectionSize()
+        self._apply_cover_mode()
         self._populate_server_combo()
 
         last = get_last_server()
         if self._servers:
             idx = min(last, len(self._servers) - 1)
             self.server_combo.setCurrentIndex(idx)
+            self._update_index_label()
             self._load_root()
 
     # ------------------------------------------------------------------
@@ -61,7 +92,11 @@ class OPDSDialog(QDialog):
     # ------------------------------------------------------------------
 
     def _build_ui(self):
-        main_layout = QVBoxLayout(self)
+        outer_layout = QVBoxLayout(self)
+        self.tabs = QTabWidget()
+        outer_layout.addWidget(self.tabs)
+        catalog_page = QWidget()
+        main_layout = QVBoxLayout(catalog_page)
 
         # Top: server selector
         top_layout = QHBoxLayout()
@@ -71,6 +106,13 @@ class OPDSDialog(QDialog):
         top_layout.addWidget(self.server_combo, 1)
         self.btn_manage = QPushButton(_('Manage Servers'))
         top_layout.addWidget(self.btn_manage)
+        self.lbl_index = QLabel('')
+        top_layout.addWidget(self.lbl_index)
+        self.btn_index = QPushButton(_('Build Index'))
+        self.btn_index.setToolTip(
+            _('Crawl this server\'s catalog into a local index so searches are instant and work offline.\n'
+              'Later runs only fetch the parts of the catalog that changed.'))
+        top_layout.addWidget(self.btn_index)
         main_layout.addLayout(top_layout)
 
         # Navigation bar
@@ -97,16 +139,21 @@ class OPDSDialog(QDialog):
             self.book_table.setSelectionBehavior(QAbstractItemView.SelectRows)
             self.book_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
             _stretch = QHeaderView.Stretch
-            _rtc = QHeaderView.ResizeToContents
+            _interactive = QHeaderView.Interactive
         except AttributeError:
             self.book_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
             self.book_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
             _stretch = QHeaderView.ResizeMode.Stretch
-            _rtc = QHeaderView.ResizeMode.ResizeToContents
-        self.book_table.horizontalHeader().setSectionResizeMode(0, _stretch)
-        self.book_table.horizontalHeader().setSectionResizeMode(1, _rtc)
-        self.book_table.horizontalHeader().setSectionResizeMode(2, _rtc)
-        self.book_table.horizontalHeader().setSectionResizeMode(3, _rtc)
+            _interactive = QHeaderView.ResizeMode.Interactive
+        # ResizeToContents 모드는 행이 바뀔 때마다 모든 셀을 재므로,
+        # 피드를 보여줄 때 앞쪽 _COLUMN_SAMPLE_ROWS 행만 재서 한 번 맞춘다
+        header = self.book_table.horizontalHeader()
+        header.setResizeContentsPrecision(_COLUMN_SAMPLE_ROWS)
+        header.setSectionResizeMode(0, _stretch)
+        for col in (1, 2, 3):
+            header.setSectionResizeMode(col, _interactive)
+        header.setSortIndicator(-1, Qt.AscendingOrder)
+        self.book_table.setSortingEnabled(True)
         self.stack.addWidget(self.book_table)
 
         main_layout.addWidget(self.stack, 1)
@@ -120,9 +167,14 @@ class OPDSDialog(QDialog):
         bottom_layout.addWidget(self.search_edit, 1)
         bottom_layout.addWidget(self.btn_search)
         bottom_layout.addSpacing(20)
+        self.chk_covers = QCheckBox(_('Covers'))
+        self.chk_covers.setChecked(bool(prefs['show_covers']))
+        bottom_layout.addWidget(self.chk_covers)
         self.btn_download = QPushButton(_('Download Selected'))
         self.btn_download.setEnabled(False)
         bottom_layout.addWidget(self.btn_download)
+        self.btn_queue = QPushButton(_('Downloads'))
+        bottom_layout.addWidget(self.btn_queue)
         main_layout.addLayout(bottom_layout)
 
         # Pagination
@@ -139,11 +191,26 @@ class OPDSDialog(QDialog):
         page_layout.addWidget(self.btn_prev)
         page_layout.addWidget(self.lbl_page)
         page_layout.addWidget(self.btn_next)
+        self.btn_load_all = QPushButton(_('Load All Pages'))
+        self.btn_load_all.setToolTip(
+            _('Follow the next-page links and show every book of this listing in one list'))
+        self.btn_load_all.setEnabled(False)
+        page_layout.addWidget(self.btn_load_all)
         page_layout.addStretch()
         main_layout.addLayout(page_layout)
 
+        # Download queue progress
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        main_layout.addWidget(self.progress_bar)
+
+        self.tabs.addTab(catalog_page, _('Catalog'))
+        self.diagnostics = DiagnosticsPanel()
+        self.tabs.addTab(self.diagnostics, _('Diagnostics'))
+
         # Signals
         self.btn_manage.clicked.connect(self._on_manage_servers)
+        self.btn_index.clicked.connect(self._on_index_clicked)
         self.server_combo.currentIndexChanged.connect(self._on_server_changed)
         self.btn_back.clicked.connect(self._on_back)
         self.btn_refresh.clicked.connect(self._on_refresh)
@@ -151,7 +218,12 @@ class OPDSDialog(QDialog):
         self.btn_search.clicked.connect(self._on_search)
         self.search_edit.returnPressed.connect(self._on_search)
         self.btn_download.clicked.connect(self._on_download)
+        self.btn_queue.clicked.connect(self._show_queue)
+        self.downloads.job_added.connect(self._on_job_added)
+        self.downloads.job_changed.connect(self._on_job_changed)
         self.btn_next.clicked.connect(self._on_next_page)
+        self.btn_load_all.clicked.connect(self._on_load_all)
+        self.chk_covers.toggled.connect(self._on_covers_toggled)
         self.book_table.selectionModel().selectionChanged.connect(self._on_book_selection)
 
         self._next_url = None
@@ -177,6 +249,11 @@ class OPDSDialog(QDialog):
 
     def _on_server_changed(self, idx):
         set_last_server(idx)
+        self._cancel_index()
+        self._close_index()
+        self._update_index_label()
+        self._cancel_search_discovery()
+        self._search_link = None
         self._url_stack.clear()
         self._breadcrumb.clear()
         self._prev_urls.clear()
@@ -211,7 +288,7 @@ class OPDSDialog(QDialog):
 
     def _on_refresh(self):
         if self._current_url:
-            self._fetch_url(self._current_url)
+            self._fetch_url(self._current_url, force=True)
         else:
             self._load_root()
 
@@ -228,7 +305,7 @@ class OPDSDialog(QDialog):
         self._update_breadcrumb()
         self._fetch_url(server['url'])
 
-    def _fetch_url(self, url: str):
+    def _fetch_url(self, url: str, force=False):
         server = self._current_server()
         if not server:
             return
@@ -237,26 +314,104 @@ class OPDSDialog(QDialog):
             url = urljoin(self._current_url, url)
 
         self._current_url = url
-        self.setEnabled(False)
-
-        if self._fetch_thread and self._fetch_thread.isRunning():
-            self._fetch_thread.quit()
-            self._fetch_thread.wait()
-
-        self._fetch_thread = FetchThread(url, server, self)
-        self._fetch_thread.finished.connect(self._on_fetch_done)
-        self._fetch_thread.error.connect(self._on_fetch_error)
-        self._fetch_thread.start()
+        self._fetch_key = cache_key(url, server)
+        self._cancel_prefetch()
+        self._cancel_load_all()
+
+        # 파싱된 피드가 메모리에 있으면 바로 그리고, 아래 요청은 백그라운드 갱신으로 쓴다
+        cached = None if force else get_parsed_cache().get(self._fetch_key)
+        if cached is not None:
+            self._shown_digest = cached.digest
+            self._render_feed(cached.feed)
+        else:
+            self._shown_digest = None
+            self.setEnabled(False)
+
+        self._cancel_fetch()
+        # 스레드는 대화상자보다 오래 살 수 있으므로 메인 창에 붙여 두고 끝나면 지운다
+        thread = FetchThread(url, server, self.gui, force=force,
+                             known_digest=self._shown_digest)
+        thread.entries_ready.connect(self._on_entries_ready)
+        thread.feed_ready.connect(self._on_feed_ready)
+        thread.error.connect(self._on_fetch_error)
+        thread.parse_error.connect(self._on_parse_error)
+        thread.finished.connect(lambda t=thread: self._on_thread_finished(t))
+        thread.finished.connect(thread.deleteLater)
+        self._fetch_thread = thread
+        thread.start()
+
+    def _cancel_fetch(self):
+        thread = self._fetch_thread
+        if thread is None:
+            return
+        self._fetch_thread = None
+        for sig in (thread.entries_ready, thread.feed_ready,
+                    thread.error, thread.parse_error):
+            sig.disconnect()
+        thread.requestInterruption()
+
+    def reject(self):
+        self._cancel_fetch()
+        self._cancel_prefetch()
+        self._cancel_load_all()
+        self._cancel_index()
+        self._close_index()
+        self._cancel_search_discovery()
+        # DownloadManager는 액션이 들고 있어 이 대화상자보다 오래 산다
+        self.downloads.job_added.disconnect(self._on_job_added)
+        self.downloads.job_changed.disconnect(self._on_job_changed)
+        if self._covers is not None:
+            self._covers.shutdown()
+            self._covers = None
+        self.book_model.set_library_index(None)
+        super().reject()
+
+    def _on_thread_finished(self, thread):
+        if thread is self._fetch_thread:
+            self._fetch_thread = None
+        elif thread is self._prefetch_thread:
+            self._prefetch_thread = None
+        elif thread is self._osd_thread:
+            self._osd_thread = None
+        elif thread is self._index_thread:
+            self._index_thread = None
+            self.btn_index.setText(_('Build Index'))
+        elif thread is self._load_all_thread:
+            self._load_all_thread = None
+            self._on_load_all_done()
+
+    def _on_entries_ready(self, entries, first):
+        # 큰 acquisition 피드는 파싱이 끝나기 전부터 행을 보여준다
+        started = time.perf_counter()
+        self.setEnabled(True)
+        if first:
+            self.stack.setCurrentIndex(1)
+            self._set_cover_source()
+            self.book_model.set_entries(entries)
+            self.book_table.resizeColumnsToContents()
+        else:
+            self.book_model.append_entries(entries)
+        self._note_render_time(started)
 
-    def _on_fetch_done(self, data: bytes):
+    def _on_feed_ready(self, feed, digest):
+        started = time.perf_counter()
         self.setEnabled(True)
-        try:
-            feed = parse_feed(data)
-        except Exception as e:
-            error_dialog(self, _('Parse Error'), str(e), show=True)
+        self._shown_digest = digest
+        self._render_feed(feed)
+        self._note_render_time(started)
+
+    def _note_render_time(self, started):
+        # 요청 기록(Span)에 화면에 그리는 데 쓴 시간을 더한다 (묶음이 여럿이면 합)
+        thread = self._fetch_thread
+        if thread is None:
             return
+        span = thread.span
+        span.render = (span.render or 0.0) + time.perf_counter() - started
+        get_telemetry().touch()
 
+    def _render_feed(self, feed):
         self._current_feed = feed
+        self._note_search_link(feed)
         self._update_breadcrumb()
 
         if isinstance(feed, NavigationFeed):
@@ -266,8 +421,14 @@ class OPDSDialog(QDialog):
 
     def _on_fetch_error(self, msg: str):
         self.setEnabled(True)
+        if self._shown_digest is not None:
+            return      # 캐시된 피드를 보여주는 중이면 갱신 실패는 조용히 넘긴다
         error_dialog(self, _('Connection Error'), msg, show=True)
 
+    def _on_parse_error(self, msg: str):
+        self.setEnabled(True)
+        error_dialog(self, _('Parse Error'), msg, show=True)
+
     # ------------------------------------------------------------------
     # Navigation view
     # ------------------------------------------------------------------
@@ -298,14 +459,63 @@ class OPDSDialog(QDialog):
 
     def _show_acquisition(self, feed: AcquisitionFeed):
         self.stack.setCurrentIndex(1)
+        self._set_cover_source()
         self.book_model.set_entries(feed.entries)
+        self.book_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
         self.book_table.resizeColumnsToContents()
         self._update_pagination(feed.next_url)
+        self._start_prefetch(feed.next_url)
+
+    def _start_prefetch(self, next_url):
+        server = self._current_server()
+        pages = int(server.get('prefetch_pages', 0) or 0) if server else 0
+        self._cancel_prefetch()
+        if not next_url or pages <= 0:
+            return
+        thread = PrefetchThread(urljoin(self._current_url, next_url), server,
+                                pages, self.gui)
+        thread.finished.connect(lambda t=thread: self._on_thread_finished(t))
+        thread.finished.connect(thread.deleteLater)
+        self._prefetch_thread = thread
+        thread.start(QThread.LowPriority)
+
+    def _cancel_prefetch(self):
+        thread, self._prefetch_thread = self._prefetch_thread, None
+        if thread is not None:
+            thread.requestInterruption()
 
     def _on_book_selection(self):
         selected = self.book_table.selectionModel().selectedRows()
         self.btn_download.setEnabled(len(selected) > 0)
 
+    # ------------------------------------------------------------------
+    # Cover thumbnails
+    # ------------------------------------------------------------------
+
+    def _on_covers_toggled(self, checked):
+        prefs['show_covers'] = checked
+        self._apply_cover_mode()
+
+    def _apply_cover_mode(self):
+        header = self.book_table.verticalHeader()
+        if self.chk_covers.isChecked():
+            if self._covers is None:
+                self._covers = CoverLoader(self.gui, self)
+                self._set_cover_source()
+            self.book_table.setIconSize(THUMB_SIZE)
+            header.setDefaultSectionSize(THUMB_SIZE.height() + 4)
+            self.book_model.set_cover_loader(self._covers)
+        else:
+            self.book_model.set_cover_loader(None)
+            header.setDefaultSectionSize(self._row_height)
+            if self._covers is not None:
+                self._covers.shutdown()
+                self._covers = None
+
+    def _set_cover_source(self):
+        if self._covers is not None:
+            self._covers.set_source(self._current_server(), self._current_url)
+
     # ------------------------------------------------------------------
     # Search
     # ------------------------------------------------------------------
@@ -318,13 +528,190 @@ class OPDSDialog(QDialog):
         if not server:
             return
 
-        base_url = server['url']
-        search_url = base_url + ('&' if '?' in base_url else '?') + 'q=' + urllib.parse.quote(query)
+        results = self._search_index(server, query)
 
         self._url_stack.append(self._current_url)
         self._breadcrumb.append(_('Search: %s') % query)
         self._update_breadcrumb()
-        self._fetch_url(search_url)
+
+        if results is not None:
+            # 로컬 색인 결과는 요청 없이 바로 보여준다 (Back은 이전 URL을 다시 연다)
+            self._cancel_fetch()
+            self._cancel_prefetch()
+            self._cancel_load_all()
+            self._shown_digest = None
+            self._prev_urls.clear()
+            self._render_feed(AcquisitionFeed(title=query, entries=results))
+            return
+
+        cached = get_opensearch_cache().get(server)
+        if cached is not None:
+            self._fetch_url(expand_template(cached[0], query))
+            return
+        if self._search_link:
+            # 설명 문서를 받아 템플릿을 얻은 뒤 검색한다
+            self._pending_query = query
+            self._discover_search(self._search_link)
+            return
+        self._fetch_url(self._legacy_search_url(server, query))
+
+    @staticmethod
+    def _legacy_search_url(server, query):
+        # 검색 링크를 광고하지 않는 서버용
+        base_url = server['url']
+        return base_url + ('&' if '?' in base_url else '?') + 'q=' + urllib.parse.quote(query)
+
+    # ------------------------------------------------------------------
+    # OpenSearch discovery
+    # ------------------------------------------------------------------
+
+    def _note_search_link(self, feed):
+        """피드의 rel="search" 링크로 서버의 검색 템플릿을 알아 두거나 갱신한다."""
+        server = self._current_server()
+        href = getattr(feed, 'search_url', None)
+        if not server or not href:
+            return
+        href = urljoin(self._current_url, href)
+        cache = get_opensearch_cache()
+        cached = cache.get(server)
+        if is_template(href):
+            if cached is None or cached[0] != href:
+                cache.put(server, href, href)
+            return
+        self._search_link = href
+        if cached is None or not cached[1]:
+            self._discover_search(href)
+
+    def _discover_search(self, description_url):
+        if self._osd_thread is not None:
+            return
+        server = self._current_server()
+        if not server:
+            return
+        thread = OpenSearchThread(description_url, server, self.gui)
+        thread.resolved.connect(self._on_search_resolved)
+        thread.error.connect(self._on_search_discovery_failed)
+        thread.finished.connect(lambda t=thread: self._on_thread_finished(t))
+        thread.finished.connect(thread.deleteLater)
+        self._osd_thread = thread
+        thread.start()
+
+    def _cancel_search_discovery(self):
+        self._pending_query = None
+        thread, self._osd_thread = self._osd_thread, None
+        if thread is not None:
+            thread.resolved.disconnect()
+            thread.error.disconnect()
+
+    def _on_search_resolved(self, template):
+        query, self._pending_query = self._pending_query, None
+        if query:
+            self._fetch_url(expand_template(template, query))
+
+    def _on_search_discovery_failed(self, msg):
+        query, self._pending_query = self._pending_query, None
+        server = self._current_server()
+        if query and server:
+            self._fetch_url(self._legacy_search_url(server, query))
+
+    # ------------------------------------------------------------------
+    # Local catalog index
+    # ------------------------------------------------------------------
+
+    def _open_index(self, server):
+        """색인 파일이 있으면 열어 둔 CatalogIndex를, 없으면 None."""
+        path = index_path(server)
+        if self._index is not None and self._index.path == path:
+            return self._index
+        self._close_index()
+        if not os.path.exists(path):
+            return None
+        try:
+            self._index = CatalogIndex(path)
+        except sqlite3.Error:
+            return None
+        return self._index
+
+    def _close_index(self):
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    def _search_index(self, server, query):
+        """완성된 색인이 있으면 검색 결과 목록, 없으면 None (서버 검색으로 대체)."""
+        index = self._open_index(server)
+        if index is None or not index.completed_at:
+            return None
+        try:
+            return index.search(query)
+        except sqlite3.Error:
+            return None
+
+    def _on_index_clicked(self):
+        if self._index_thread is not None:
+            self._cancel_index()
+            return
+        server = self._current_server()
+        if not server:
+            return
+        # 크롤 스레드가 쓰는 동안 GUI 쪽 연결은 닫아 둔다 (끝나면 다시 연다)
+        self._close_index()
+        thread = IndexThread(server, self.gui)
+        thread.progress.connect(self._on_index_progress)
+        thread.completed.connect(self._on_index_completed)
+        thread.synced.connect(self._on_index_synced)
+        thread.error.connect(self._on_index_error)
+        thread.finished.connect(lambda t=thread: self._on_thread_finished(t))
+        thread.finished.connect(thread.deleteLater)
+        self._index_thread = thread
+        self.btn_index.setText(_('Stop Indexing'))
+        self.lbl_index.setText(_('Indexing...'))
+        thread.start(QThread.LowPriority)
+
+    def _cancel_index(self):
+        thread, self._index_thread = self._index_thread, None
+        if thread is not None:
+            for sig in (thread.progress, thread.completed, thread.synced, thread.error):
+                sig.disconnect()
+            thread.requestInterruption()
+            self.btn_index.setText(_('Build Index'))
+            self.lbl_index.setText(_('Indexing paused'))
+
+    def _on_index_progress(self, pages, books):
+        self.lbl_index.setText(_('Indexing: %(pages)d pages, %(books)d books') % {
+            'pages': pages, 'books': books})
+
+    def _on_index_completed(self, done):
+        self._update_index_label()
+
+    def _on_index_synced(self, diff):
+        server = self._current_server()
+        index = self._open_index(server) if server else None
+        if index is None:
+            return
+        self.lbl_index.setText(
+            _('Index: %(books)d books (%(added)d new, %(changed)d changed, %(removed)d removed)') % {
+                'books': index.book_count(), 'added': len(diff.added),
+                'changed': len(diff.changed), 'removed': len(diff.removed)})
+
+    def _on_index_error(self, msg: str):
+        self._update_index_label()
+        error_dialog(self, _('Index Error'), msg, show=True)
+
+    def _update_index_label(self):
+        server = self._current_server()
+        index = self._open_index(server) if server else None
+        if index is None:
+            self.lbl_index.setText('')
+        elif index.failed_pages():
+            self.lbl_index.setText(
+                _('Index incomplete: %d pages could not be read') % index.failed_pages())
+        elif index.completed_at:
+            self.lbl_index.setText(_('Index: %d books') % index.book_count())
+        elif index.crawl_pending:
+            self.lbl_index.setText(_('Indexing paused'))
+        else:
+            self.lbl_index.setText('')
 
     # ------------------------------------------------------------------
     # Pagination
@@ -334,6 +721,7 @@ class OPDSDialog(QDialog):
         self._next_url = next_url
         self.btn_next.setEnabled(bool(next_url))
         self.btn_prev.setEnabled(bool(self._prev_urls))
+        self.btn_load_all.setEnabled(bool(next_url))
         if next_url or self._prev_urls:
             self.lbl_page.setText('%d' % (len(self._prev_urls) + 1))
         else:
@@ -345,6 +733,69 @@ class OPDSDialog(QDialog):
         self._prev_urls.append(self._current_url)
         self._fetch_url(self._next_url)
 
+    # ------------------------------------------------------------------
+    # Load all pages
+    # ------------------------------------------------------------------
+
+    def _on_load_all(self):
+        server = self._current_server()
+        if not server or not self._next_url:
+            return
+        # 병합한 목록을 지우지 않도록 현재 페이지의 백그라운드 갱신도 멈춘다
+        self._cancel_fetch()
+        self._cancel_prefetch()
+        self._cancel_load_all()
+        # 지금 보이는 페이지도 상한에 포함한다
+        max_pages = max(1, int(prefs['load_all_max_pages']) - 1)
+        thread = LoadAllThread(urljoin(self._current_url, self._next_url),
+                               server, max_pages, self.gui)
+        thread.page_ready.connect(self._on_load_all_page)
+        thread.error.connect(self._on_load_all_error)
+        thread.finished.connect(lambda t=thread: self._on_thread_finished(t))
+        thread.finished.connect(thread.deleteLater)
+        self._load_all_thread = thread
+        self._load_all_pages = 1
+        self._load_all_more = False
+        self.book_model.start_merge()
+        self.btn_next.setEnabled(False)
+        self.btn_prev.setEnabled(False)
+        self.btn_load_all.setEnabled(False)
+        self._update_load_all_label()
+        thread.start()
+
+    def _cancel_load_all(self):
+        thread, self._load_all_thread = self._load_all_thread, None
+        if thread is not None:
+            thread.page_ready.disconnect()
+            thread.error.disconnect()
+            thread.requestInterruption()
+
+    def _on_load_all_page(self, entries, has_more):
+        self._load_all_pages += 1
+        self._load_all_more = has_more
+        self.book_model.merge_entries(entries)
+        self._update_load_all_label()
+
+    def _on_load_all_error(self, msg: str):
+        error_dialog(self, _('Connection Error'), msg, show=True)
+
+    def _on_load_all_done(self):
+        # 불러오는 동안 덧붙은 행까지 현재 정렬 기준으로 다시 정렬
+        header = self.book_table.horizontalHeader()
+        if header.sortIndicatorSection() >= 0:
+            self.book_model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+        self._next_url = None
+        self._update_load_all_label()
+
+    def _update_load_all_label(self):
+        text = _('All pages: %(books)d books from %(pages)d pages') % {
+            'books': self.book_model.rowCount(), 'pages': self._load_all_pages}
+        if self._load_all_thread is not None:
+            text += ' \u2026'
+        elif self._load_all_more:
+            text += ' ' + _('(page limit reached)')
+        self.lbl_page.setText(text)
+
     # ------------------------------------------------------------------
     # Back navigation
     # ------------------------------------------------------------------
@@ -372,7 +823,23 @@ class OPDSDialog(QDialog):
         if not selected_rows:
             return
 
-        entries = [self.book_model.entry(idx.row()) for idx in selected_rows]
+        rows = [idx.row() for idx in selected_rows]
+        owned = [r for r in rows if self.book_model.is_owned(r)]
+        if owned:
+            answer = QMessageBox.question(
+                self, _('Download'),
+                _('%(owned)d of the %(total)d selected books are already in your library.\n'
+                  'Download them anyway?') % {'owned': len(owned), 'total': len(rows)},
+                QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel, QMessageBox.No)
+            if answer == QMessageBox.Cancel:
+                return
+            if answer == QMessageBox.No:
+                owned = set(owned)
+                rows = [r for r in rows if r not in owned]
+                if not rows:
+                    return
+
+        entries = [self.book_model.entry(r) for r in rows]
         server = self._current_server()
 
         for entry in entries:
@@ -383,6 +850,7 @@ class OPDSDialog(QDialog):
                 )
                 continue
             self._download_entry(entry, server)
+        self._show_queue()
 
     def _pick_format(self, entry):
         if len(entry.formats) == 1:
@@ -390,7 +858,7 @@ class OPDSDialog(QDialog):
 
         from PyQt5.QtWidgets import QInputDialog
         labels = [
-            '%s  (%s)' % (f['type'].upper(), self._fmt_size_str(f.get('size', 0)))
+            '%s  (%s)' % (f.type.upper(), self._fmt_size_str(f.size))
             for f in entry.formats
         ]
         item, ok = QInputDialog.getItem(
@@ -417,30 +885,36 @@ class OPDSDialog(QDialog):
         if fmt is None:
             return
 
-        url = fmt['url']
+        url = fmt.url
         if not url.startswith('http'):
             url = urljoin(self._current_url, url)
 
-        ext = fmt['type'].lower()
-        prefix = entry.title.replace('/', '_')[:60] + '_'
-        tmp_fd, tmp_path = tempfile.mkstemp(suffix='.' + ext, prefix=prefix)
-        os.close(tmp_fd)
+        self.downloads.enqueue(entry, fmt, url, server)
 
-        self.setEnabled(False)
-        self._download_thread = DownloadThread(url, tmp_path, server, self)
-        self._download_thread.finished.connect(
-            lambda p: self._on_download_done(p, entry))
-        self._download_thread.error.connect(self._on_download_error)
-        self._download_thread.start()
+    def _show_queue(self):
+        if self._queue_dialog is None:
+            self._queue_dialog = DownloadQueueDialog(self.downloads, self)
+        self._queue_dialog.show()
+        self._queue_dialog.raise_()
+        self._queue_dialog.activateWindow()
 
-    def _on_download_done(self, path: str, entry):
-        self.setEnabled(True)
-        if self.do_add_books:
-            self.do_add_books([path], entry)
-        else:
-            info_dialog(self, _('Download Complete'),
-                        _('"%s" downloaded to:\n%s') % (entry.title, path), show=True)
+    def _on_job_added(self, job):
+        self._update_download_progress()
 
-    def _on_download_error(self, msg: str):
-        self.setEnabled(True)
-        error_dialog(self, _('Download Error'), msg, show=True)
+    def _on_job_changed(self, job):
+        if job.status == FAILED:
+            self._show_queue()
+        self._update_download_progress()
+
+    def _update_download_progress(self):
+        jobs = [j for j in self.downloads.jobs if j.status != CANCELLED]
+        pending = self.downloads.pending_count()
+        if not pending:
+            self.progress_bar.setVisible(False)
+            return
+        finished = len(jobs) - pending
+        self.progress_bar.setRange(0, len(jobs))
+        self.progress_bar.setValue(finished)
+        self.progress_bar.setFormat(
+            _('Downloading: %(done)d of %(total)d') % {'done': finished, 'total': len(jobs)})
+        self.progress_bar.setVisible(True)
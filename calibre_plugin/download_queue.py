@@ -0,0 +1,311 @@
+import hashlib
+import itertools
+import json
+import os
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from .config import prefs, data_dir, load_servers
+from .network import DownloadThread, remove_partial
+from .opds_parser import BookEntry, Format
+
+load_translations()
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+_QUEUE_FILE = 'queue.json'
+
+_job_ids = itertools.count(1)
+
+
+@dataclass
+class DownloadJob:
+    entry: object
+    fmt: Format
+    url: str
+    server: dict
+    id: int = field(default_factory=lambda: next(_job_ids))
+    status: str = QUEUED
+    save_path: str = ''
+    done: int = 0
+    total: int = 0
+    error: str = ''
+
+    @property
+    def host(self) -> str:
+        return urlsplit(self.url).netloc
+
+    def to_dict(self) -> dict:
+        # 비밀번호는 큐 파일에 남기지 않고, 복원 시 서버 설정에서 다시 채운다
+        server = {k: v for k, v in self.server.items() if k != 'password'}
+        return {
+            'entry': self.entry.to_dict(),
+            'fmt': self.fmt._asdict(),
+            'url': self.url,
+            'server': server,
+            'status': self.status,
+            'save_path': self.save_path,
+            'error': self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict, servers) -> 'DownloadJob':
+        server = d['server']
+        for s in servers:
+            if s.get('name') == server.get('name') and s.get('url') == server.get('url'):
+                server = s
+                break
+        status = d.get('status', QUEUED)
+        if status == RUNNING:
+            status = QUEUED
+        return cls(
+            entry=BookEntry.from_dict(d['entry']),
+            fmt=Format.coerce(d['fmt']),
+            url=d['url'],
+            server=dict(server),
+            status=status,
+            save_path=d.get('save_path', ''),
+            error=d.get('error', ''),
+        )
+
+
+def _job_path(job) -> str:
+    """URL에서 결정되는 저장 경로 — 재시작 후에도 같은 .part 파일을 찾는다."""
+    digest = hashlib.sha1(job.url.encode('utf-8')).hexdigest()[:16]
+    prefix = job.entry.title.replace('/', '_').replace('\\', '_')[:60]
+    name = '%s_%s.%s' % (prefix, digest, job.fmt.type.lower())
+    return os.path.join(data_dir('downloads'), name)
+
+
+# ---------------------------------------------------------------------------
+# Download manager
+# ---------------------------------------------------------------------------
+
+class DownloadManager(QObject):
+    """
+    (entry, format) 작업 큐. 최대 download_workers 개의 DownloadThread를
+    동시에 돌리고, 호스트별로는 max_downloads_per_host 개까지만 허용한다.
+
+    미완료 작업은 data_dir('downloads')/queue.json에 기록되어, 다음에
+    매니저를 만들고 resume()을 호출하면 .part 파일부터 이어받는다.
+    """
+
+    job_added = pyqtSignal(object)
+    job_changed = pyqtSignal(object)
+    batch_ready = pyqtSignal(object)     # [(path, entry), ...]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.jobs = []
+        self._threads = {}      # job.id -> DownloadThread
+        # 취소한 스레드 (끝난 QThread는 isInterruptionRequested()가 False라 따로 기억한다)
+        self._interrupted = set()
+        self._batch = []
+        # 완료된 책은 import_batch_size 권이 모이거나, 첫 책이 끝난 지
+        # import_batch_delay 초가 지나거나, 큐가 비면 한 번에 라이브러리로 넘긴다
+        self._batch_timer = QTimer(self)
+        self._batch_timer.setSingleShot(True)
+        self._batch_timer.timeout.connect(self._flush_batch)
+        self._load_queue()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def enqueue(self, entry, fmt, url, server) -> DownloadJob:
+        # 같은 URL의 작업은 .part 파일을 공유하므로 하나만 둔다
+        for job in self.jobs:
+            if job.url == url and job.status in (QUEUED, RUNNING, FAILED):
+                self.retry(job)
+                return job
+        job = DownloadJob(entry=entry, fmt=fmt, url=url, server=dict(server))
+        self.jobs.append(job)
+        self.job_added.emit(job)
+        self._schedule()
+        return job
+
+    def resume(self):
+        """저장된 큐에서 복원한 작업을 시작."""
+        self._schedule()
+
+    def cancel(self, job):
+        if job.status == QUEUED:
+            self._remove_temp(job)
+            self._set_status(job, CANCELLED)
+        elif job.status == RUNNING:
+            thread = self._threads.get(job.id)
+            if thread is not None:
+                thread.requestInterruption()
+                self._interrupted.add(thread)
+            self._set_status(job, CANCELLED)
+
+    def retry(self, job):
+        if job.status in (FAILED, CANCELLED):
+            job.done = job.total = 0
+            job.error = ''
+            self._set_status(job, QUEUED)
+            # 취소한 스레드가 아직 돌고 있으면 그 스레드가 끝난 뒤에 시작된다
+            self._schedule()
+
+    def clear_finished(self):
+        for job in self.jobs:
+            if job.status in (FAILED, CANCELLED):
+                self._remove_temp(job)
+        self.jobs = [j for j in self.jobs
+                     if j.status in (QUEUED, RUNNING)]
+        self._save_queue()
+
+    def pending_count(self) -> int:
+        return sum(1 for j in self.jobs if j.status in (QUEUED, RUNNING))
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def _schedule(self):
+        workers = max(1, int(prefs['download_workers']))
+        per_host = max(1, int(prefs['max_downloads_per_host']))
+
+        # 취소됐지만 아직 끝나지 않은 스레드도 연결을 쓰고 있으므로 센다
+        running = [j for j in self.jobs if j.id in self._threads]
+        for job in self.jobs:
+            if len(running) >= workers:
+                break
+            if job.status != QUEUED or job.id in self._threads:
+                continue
+            if sum(1 for j in running if j.host == job.host) >= per_host:
+                continue
+            self._start(job)
+            running.append(job)
+
+        if not running:
+            self._flush_batch()
+
+    def _start(self, job):
+        if not job.save_path:
+            job.save_path = _job_path(job)
+
+        thread = DownloadThread(job.url, job.save_path, job.server, self)
+        thread.progress.connect(
+            lambda d, t, job=job, thread=thread: self._on_progress(job, thread, d, t))
+        thread.finished.connect(lambda p, job=job, thread=thread: self._on_finished(job, thread))
+        thread.error.connect(lambda msg, job=job, thread=thread: self._on_error(job, thread, msg))
+        self._threads[job.id] = thread
+        self._set_status(job, RUNNING)
+        thread.start()
+
+    def _release(self, job, thread) -> bool:
+        """끝난 thread를 정리한다. job의 현재 스레드가 아니면(이미 정리됨) False."""
+        if self._threads.get(job.id) is not thread:
+            return False
+        del self._threads[job.id]
+        thread.wait()
+        thread.deleteLater()
+        return True
+
+    def _was_cancelled(self, thread) -> bool:
+        if thread in self._interrupted:
+            self._interrupted.discard(thread)
+            return True
+        return False
+
+    def _remove_temp(self, job):
+        if job.save_path:
+            try:
+                os.remove(job.save_path)
+            except OSError:
+                pass
+            remove_partial(job.save_path)
+            job.save_path = ''
+
+    # ------------------------------------------------------------------
+    # Thread callbacks
+    # ------------------------------------------------------------------
+
+    def _on_progress(self, job, thread, done, total):
+        if self._threads.get(job.id) is not thread or thread in self._interrupted:
+            return
+        job.done, job.total = done, total
+        self.job_changed.emit(job)
+
+    def _on_cancelled(self, job):
+        # 그 사이 다시 시도한 작업(QUEUED)은 .part 파일부터 이어받는다
+        if job.status == CANCELLED:
+            self._remove_temp(job)
+
+    def _on_finished(self, job, thread):
+        if not self._release(job, thread):
+            return
+        if self._was_cancelled(thread):
+            self._on_cancelled(job)
+        else:
+            self._set_status(job, DONE)
+            self._batch.append((job.save_path, job.entry))
+            if len(self._batch) >= max(1, int(prefs['import_batch_size'])):
+                self._flush_batch()
+            elif not self._batch_timer.isActive():
+                self._batch_timer.start(int(float(prefs['import_batch_delay']) * 1000))
+        self._schedule()
+
+    def _on_error(self, job, thread, msg):
+        if not self._release(job, thread):
+            return
+        if self._was_cancelled(thread):
+            self._on_cancelled(job)
+        else:
+            # .part 파일은 남겨 두어 재시도 때 이어받는다
+            job.error = msg
+            self._set_status(job, FAILED)
+        self._schedule()
+
+    def _set_status(self, job, status):
+        job.status = status
+        self.job_changed.emit(job)
+        self._save_queue()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _queue_path(self):
+        return os.path.join(data_dir('downloads'), _QUEUE_FILE)
+
+    def _load_queue(self):
+        try:
+            with open(self._queue_path(), 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        servers = load_servers()
+        for d in saved:
+            try:
+                self.jobs.append(DownloadJob.from_dict(d, servers))
+            except (KeyError, TypeError):
+                continue
+
+    def _save_queue(self):
+        pending = [j.to_dict() for j in self.jobs
+                   if j.status in (QUEUED, RUNNING, FAILED)]
+        path = self._queue_path()
+        try:
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(pending, f)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            pass
+
+    def _flush_batch(self):
+        self._batch_timer.stop()
+        if self._batch:
+            batch, self._batch = self._batch, []
+            self.batch_ready.emit(batch)
@@ -0,0 +1,270 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from .config import prefs, data_dir
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+_INDEX_FILE = 'index.json'
+
+# 파싱된 피드 객체의 메모리 사용량 추정치 = 원본 XML 크기 × 이 값
+# (압축 BookEntry 기준 약 0.9배 — benchmarks/bench_memory.py)
+_PARSED_SIZE_FACTOR = 1
+
+
+@dataclass
+class CachedFeed:
+    body: bytes
+    etag: str = ''
+    last_modified: str = ''
+    stored_at: float = 0.0
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+
+def cache_key(url: str, server: dict) -> str:
+    """URL + 인증 주체(auth 방식, 사용자명)로 캐시 키를 만든다."""
+    auth = server.get('auth', 'none')
+    user = server.get('username', '') if auth == 'basic' else ''
+    raw = '\0'.join((url, auth, user))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Disk cache
+# ---------------------------------------------------------------------------
+
+class FeedCache:
+    """
+    피드 응답 본문을 디스크에 보관하는 크기 제한 LRU 캐시.
+    메타데이터(ETag, Last-Modified, 저장/접근 시각, 크기)는 index.json 한 파일에 둔다.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, key: str):
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                return None
+            try:
+                with open(self._body_path(key), 'rb') as f:
+                    body = f.read()
+            except OSError:
+                del self._index[key]
+                self._save_index()
+                return None
+            # 접근 시각은 메모리에만 갱신하고 다음 put/touch 때 함께 기록한다
+            meta['last_access'] = time.time()
+            return CachedFeed(body, meta.get('etag', ''),
+                              meta.get('last_modified', ''),
+                              meta.get('stored_at', 0.0))
+
+    def put(self, key: str, url: str, body: bytes,
+            etag: str = '', last_modified: str = ''):
+        with self._lock:
+            path = self._body_path(key)
+            try:
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(body)
+                os.replace(path + '.tmp', path)
+            except OSError:
+                return
+            now = time.time()
+            self._index[key] = {
+                'url': url,
+                'size': len(body),
+                'etag': etag or '',
+                'last_modified': last_modified or '',
+                'stored_at': now,
+                'last_access': now,
+            }
+            self._evict()
+            self._save_index()
+
+    def touch(self, key: str):
+        """304 응답으로 재검증된 항목을 다시 신선한 상태로 표시."""
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is not None:
+                meta['stored_at'] = meta['last_access'] = time.time()
+                self._save_index()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+            self._save_index()
+
+    # ------------------------------------------------------------------
+    # 내부
+    # ------------------------------------------------------------------
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.root, key + '.xml')
+
+    def _load_index(self) -> dict:
+        try:
+            with open(os.path.join(self.root, _INDEX_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        path = os.path.join(self.root, _INDEX_FILE)
+        try:
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(self._index, f)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            pass
+
+    def _remove(self, key: str):
+        self._index.pop(key, None)
+        try:
+            os.remove(self._body_path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        total = sum(m.get('size', 0) for m in self._index.values())
+        if total <= self.max_bytes:
+            return
+        by_age = sorted(self._index.items(), key=lambda kv: kv[1].get('last_access', 0))
+        for key, meta in by_age:
+            if total <= self.max_bytes:
+                break
+            total -= meta.get('size', 0)
+            self._remove(key)
+
+
+_cache = None
+
+
+def get_feed_cache() -> FeedCache:
+    global _cache
+    max_bytes = int(prefs['feed_cache_max_mb']) * 1024 * 1024
+    if _cache is None:
+        _cache = FeedCache(data_dir('feed_cache'), max_bytes)
+    else:
+        _cache.max_bytes = max_bytes
+    return _cache
+
+
+# ---------------------------------------------------------------------------
+# In-memory parsed feed cache
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ParsedFeed:
+    feed: object
+    digest: bytes
+    cost: int
+    prefetched_by: str = ''     # 미리 받아 둔 페이지면 서버 이름, 한 번 쓰이면 비운다
+
+
+class ParsedFeedCache:
+    """
+    파싱이 끝난 NavigationFeed / AcquisitionFeed를 보관하는 프로세스 내 LRU.
+    Back 이동 시 네트워크와 parse_feed를 모두 건너뛰기 위한 것으로,
+    digest(원본 바이트의 SHA-1)로 백그라운드 갱신 결과가 바뀌었는지 판단한다.
+
+    PrefetchThread가 넣은 항목은 서버별로 받아 둔 수와 실제로 쓰인 수를 센다.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._prefetch = {}     # server name -> [prefetched, used]
+
+    @staticmethod
+    def digest(body: bytes) -> bytes:
+        return hashlib.sha1(body).digest()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            if item.prefetched_by:
+                self._prefetch_counts(item.prefetched_by)[1] += 1
+                item.prefetched_by = ''
+            return item
+
+    def peek(self, key: str):
+        """통계와 LRU 순서를 건드리지 않고 조회."""
+        with self._lock:
+            return self._items.get(key)
+
+    def put(self, key: str, feed, body: bytes, prefetched_by: str = ''):
+        cost = len(body) * _PARSED_SIZE_FACTOR
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._total -= old.cost
+            if cost > self.max_bytes:
+                return
+            if prefetched_by:
+                self._prefetch_counts(prefetched_by)[0] += 1
+            self._items[key] = ParsedFeed(feed, self.digest(body), cost, prefetched_by)
+            self._total += cost
+            while self._total > self.max_bytes:
+                _key, item = self._items.popitem(last=False)
+                self._total -= item.cost
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._total = 0
+
+    def prefetch_stats(self) -> dict:
+        """{server name: {'prefetched', 'used', 'hit_rate'}}"""
+        with self._lock:
+            return {
+                name: {
+                    'prefetched': fetched,
+                    'used':       used,
+                    'hit_rate':   used / fetched if fetched else 0.0,
+                }
+                for name, (fetched, used) in self._prefetch.items()
+            }
+
+    def _prefetch_counts(self, name):
+        return self._prefetch.setdefault(name, [0, 0])
+
+
+_parsed_cache = None
+
+
+def get_parsed_cache() -> ParsedFeedCache:
+    global _parsed_cache
+    max_bytes = int(prefs['parsed_cache_max_mb']) * 1024 * 1024
+    if _parsed_cache is None:
+        _parsed_cache = ParsedFeedCache(max_bytes)
+    else:
+        _parsed_cache.max_bytes = max_bytes
+    return _parsed_cache
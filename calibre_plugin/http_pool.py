@@ -0,0 +1,526 @@
+import base64
+import http.client
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from urllib.parse import urlsplit, urljoin, unquote
+
+load_translations()
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+_DEFAULT_MAX_PER_HOST = 4
+_DEFAULT_IDLE_TIMEOUT = 30
+_MAX_REDIRECTS = 5
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+# 압축된 본문을 이 크기씩 읽어 바로 풀어낸다 (압축본 전체를 메모리에 두지 않는다)
+_DECODE_CHUNK_SIZE = 64 * 1024
+
+# 재사용한 keep-alive 소켓이 서버 쪽에서 이미 닫혀 있을 때 나는 예외들
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+_ssl_context = None
+
+
+def _get_ssl_context():
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+# ---------------------------------------------------------------------------
+# Connection pool
+# ---------------------------------------------------------------------------
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) 연결 풀.
+
+    idle 연결은 (scheme, host, port, proxy, auth) 키별로 보관하고,
+    연결 수 상한은 (scheme, host, port) 단위로 적용한다.
+    여러 스레드(FetchThread, DownloadThread)에서 동시에 사용해도 안전하다.
+    """
+
+    def __init__(self, max_per_host=_DEFAULT_MAX_PER_HOST,
+                 idle_timeout=_DEFAULT_IDLE_TIMEOUT):
+        self.max_per_host = max(1, int(max_per_host))
+        self.idle_timeout = idle_timeout
+        self._cond = threading.Condition()
+        self._idle = {}     # key -> [(conn, released_at), ...]
+        self._open = {}     # host key -> 열린 연결 수 (사용 중 + idle)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.waits = 0
+
+    def configure(self, max_per_host=None, idle_timeout=None):
+        with self._cond:
+            if max_per_host is not None:
+                self.max_per_host = max(1, int(max_per_host))
+            if idle_timeout is not None:
+                self.idle_timeout = idle_timeout
+            self._cond.notify_all()
+
+    @staticmethod
+    def _host_key(key):
+        return key[:3]
+
+    def acquire(self, key, factory, timeout=None):
+        """
+        (conn, reused) 반환. idle 연결이 없고 호스트 상한에 도달했으면
+        다른 auth 키의 idle 연결을 닫아 자리를 만들거나, 반납될 때까지 대기한다.
+        timeout(초)이 지나도 자리가 나지 않으면 socket.timeout을 올린다
+        (새지 않은 응답이나 긴 내려받기가 상한을 다 차지해도 피드 요청이 멈추지 않게).
+        """
+        host = self._host_key(key)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._evict_expired()
+                idle = self._idle.get(key)
+                if idle:
+                    conn, _released_at = idle.pop()
+                    self.hits += 1
+                    return conn, True
+                if self._open.get(host, 0) < self.max_per_host:
+                    break
+                if self._close_one_idle(host):
+                    continue
+                self.waits += 1
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise socket.timeout(
+                        _('Timed out waiting for a free connection to %s') % host[1])
+                self._cond.wait(remaining)
+            self._open[host] = self._open.get(host, 0) + 1
+            self.misses += 1
+
+        try:
+            return factory(), False
+        except BaseException:
+            self._forget(host)
+            raise
+
+    def release(self, key, conn, reusable=True):
+        if not reusable or conn.sock is None:
+            conn.close()
+            self._forget(self._host_key(key))
+            return
+        with self._cond:
+            self._idle.setdefault(key, []).append((conn, time.monotonic()))
+            self._evict_expired()
+            self._cond.notify()
+
+    def discard(self, key, conn):
+        self.release(key, conn, reusable=False)
+
+    def close_all(self):
+        with self._cond:
+            for key, idle in self._idle.items():
+                host = self._host_key(key)
+                for conn, _ in idle:
+                    conn.close()
+                    self._open[host] -= 1
+            self._idle.clear()
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'hits':      self.hits,
+                'misses':    self.misses,
+                'evictions': self.evictions,
+                'waits':     self.waits,
+                'open':      sum(self._open.values()),
+                'idle':      sum(len(v) for v in self._idle.values()),
+            }
+
+    def _forget(self, host):
+        with self._cond:
+            self._open[host] = max(0, self._open.get(host, 0) - 1)
+            self._cond.notify()
+
+    # -- 내부 (self._cond 보유 상태에서 호출) --------------------------------
+
+    def _evict_expired(self):
+        deadline = time.monotonic() - self.idle_timeout
+        for key in list(self._idle):
+            idle = self._idle[key]
+            keep = []
+            for conn, released_at in idle:
+                if released_at < deadline:
+                    conn.close()
+                    self._open[self._host_key(key)] -= 1
+                    self.evictions += 1
+                else:
+                    keep.append((conn, released_at))
+            if keep:
+                self._idle[key] = keep
+            else:
+                del self._idle[key]
+
+    def _close_one_idle(self, host) -> bool:
+        for key, idle in self._idle.items():
+            if self._host_key(key) == host and idle:
+                conn, _ = idle.pop(0)
+                conn.close()
+                self._open[host] -= 1
+                self.evictions += 1
+                if not idle:
+                    del self._idle[key]
+                return True
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Content-Encoding
+# ---------------------------------------------------------------------------
+
+_brotli = None
+
+
+def _get_brotli():
+    """brotli 모듈 또는 None. Calibre 빌드에 따라 없을 수 있다."""
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+        except ImportError:
+            brotli = False
+        _brotli = brotli
+    return _brotli or None
+
+
+def accept_encoding() -> str:
+    """피드 요청에 보낼 Accept-Encoding 값."""
+    if _get_brotli() is not None:
+        return 'gzip, deflate, br'
+    return 'gzip, deflate'
+
+
+class _Decoder:
+    """
+    Content-Encoding 하나를 조각 단위로 푸는 디코더.
+    deflate는 규격대로 zlib 래퍼를 기대하되, 래퍼 없이 raw deflate를 보내는
+    서버가 흔해 첫 조각이 실패하면 raw로 다시 시작한다.
+    """
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self._started = False
+        if encoding in ('gzip', 'x-gzip'):
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            self._obj = zlib.decompressobj()
+        elif encoding == 'br' and _get_brotli() is not None:
+            self._obj = _get_brotli().Decompressor()
+        else:
+            raise urllib.error.URLError(
+                _('Unsupported Content-Encoding: %s') % encoding)
+
+    def decompress(self, data: bytes) -> bytes:
+        try:
+            if self.encoding == 'br':
+                out = self._obj.process(data)
+            else:
+                out = self._obj.decompress(data)
+        except zlib.error as e:
+            if self.encoding != 'deflate' or self._started:
+                raise urllib.error.URLError(e)
+            self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+            out = self._obj.decompress(data)
+        except Exception as e:
+            # brotli.error
+            raise urllib.error.URLError(e)
+        self._started = True
+        return out
+
+    def flush(self) -> bytes:
+        if self.encoding == 'br':
+            return b''
+        return self._obj.flush()
+
+
+def _make_decoder(resp):
+    """응답의 Content-Encoding에 맞는 _Decoder, 인코딩이 없으면 None."""
+    encoding = (resp.headers.get('Content-Encoding') or '').strip().lower()
+    if encoding in ('', 'identity'):
+        return None
+    if ',' in encoding:
+        raise urllib.error.URLError(
+            _('Unsupported Content-Encoding: %s') % encoding)
+    return _Decoder(encoding)
+
+
+# ---------------------------------------------------------------------------
+# Response
+# ---------------------------------------------------------------------------
+
+class PooledResponse:
+    """
+    http.client.HTTPResponse 래퍼. 본문을 끝까지 읽은 뒤 close() 하면
+    연결을 풀에 반납하고, 중간에 닫으면 연결을 버린다.
+
+    read()는 받은 바이트를 그대로, read_decoded()는 Content-Encoding을 푼 본문을
+    돌려준다. wire_bytes / body_bytes는 지금까지 읽은 압축 전후 크기.
+
+    timings는 이 요청의 구간별 소요 시간(초): 새 연결이면 dns / connect / tls,
+    요청을 보낸 뒤 헤더를 받기까지 ttfb, close() 뒤에는 본문을 읽은 transfer.
+    """
+
+    def __init__(self, pool, key, conn, resp, url, timings=None, reused=False):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._resp = resp
+        self._decoder = None
+        self._opened_at = time.perf_counter()
+        self.url = url
+        self.status = resp.status
+        self.reason = resp.reason
+        self.headers = resp.headers
+        self.wire_bytes = 0
+        self.body_bytes = 0
+        self.timings = timings if timings is not None else {}
+        self.reused = reused
+        # close() 뒤에 on_close(self)를 부른다 (요청 기록용)
+        self.on_close = None
+
+    @property
+    def content_encoding(self) -> str:
+        return self._decoder.encoding if self._decoder is not None else ''
+
+    def read(self, amt=None) -> bytes:
+        data = self._resp.read(amt)
+        self.wire_bytes += len(data)
+        self.body_bytes += len(data)
+        return data
+
+    def read_decoded(self, limit=None) -> bytes:
+        """
+        Content-Encoding(gzip / deflate / br)을 풀어 본문을 반환.
+        받은 조각을 곧바로 풀어 하나의 버퍼에 이어 붙이므로 압축본 전체를 따로 들고
+        있지 않는다. limit을 주면 풀린 본문이 그만큼 모였을 때 멈춘다 (미리보기용).
+        """
+        if self._decoder is None:
+            self._decoder = _make_decoder(self)
+        if self._decoder is None:
+            return self.read(limit)
+        out = bytearray()
+        while limit is None or len(out) < limit:
+            chunk = self._resp.read(_DECODE_CHUNK_SIZE)
+            if not chunk:
+                out += self._decoder.flush()
+                break
+            self.wire_bytes += len(chunk)
+            out += self._decoder.decompress(chunk)
+        if limit is not None:
+            del out[limit:]
+        self.body_bytes += len(out)
+        return bytes(out)
+
+    def close(self):
+        if self._conn is None:
+            return
+        self.timings['transfer'] = time.perf_counter() - self._opened_at
+        done = self._resp.isclosed()
+        reusable = done and not self._resp.will_close
+        if not done:
+            self._resp.close()
+        self._pool.release(self._key, self._conn, reusable)
+        self._conn = None
+        if self.on_close is not None:
+            self.on_close(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+# Request
+# ---------------------------------------------------------------------------
+
+def _proxy_for(scheme, host):
+    proxy = urllib.request.getproxies().get(scheme)
+    if not proxy or urllib.request.proxy_bypass(host):
+        return None
+    if '://' not in proxy:
+        proxy = 'http://' + proxy
+    return urlsplit(proxy)
+
+
+def _basic_auth_header(username, password) -> str:
+    token = ('%s:%s' % (username, password)).encode('utf-8')
+    return 'Basic ' + base64.b64encode(token).decode('ascii')
+
+
+def _connect(scheme, host, port, proxy, timeout):
+    if proxy is not None:
+        if scheme == 'https':
+            tunnel_headers = {}
+            if proxy.username:
+                tunnel_headers['Proxy-Authorization'] = _basic_auth_header(
+                    unquote(proxy.username), unquote(proxy.password or ''))
+            conn = http.client.HTTPSConnection(
+                proxy.hostname, proxy.port or 80, timeout=timeout,
+                context=_get_ssl_context())
+            conn.set_tunnel(host, port, headers=tunnel_headers)
+            return conn
+        return http.client.HTTPConnection(
+            proxy.hostname, proxy.port or 80, timeout=timeout)
+    if scheme == 'https':
+        return http.client.HTTPSConnection(
+            host, port, timeout=timeout, context=_get_ssl_context())
+    return http.client.HTTPConnection(host, port, timeout=timeout)
+
+
+def _timed_connect(conn, timings):
+    """
+    conn.connect()를 부르면서 DNS 조회, TCP 접속, 그 뒤(TLS 핸드셰이크와 프록시
+    터널)를 나눠 timings에 적는다. 주소마다 접속을 시도하는 것은
+    socket.create_connection과 같다.
+    """
+    def create_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+                          source_address=None):
+        host, port = address
+        started = time.perf_counter()
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+        timings['dns'] = resolved - started
+        error = None
+        for family, socktype, proto, _name, addr in infos:
+            sock = socket.socket(family, socktype, proto)
+            try:
+                if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                    sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(addr)
+            except OSError as e:
+                sock.close()
+                error = e
+                continue
+            timings['connect'] = time.perf_counter() - resolved
+            return sock
+        raise error or OSError('getaddrinfo returns an empty list')
+
+    conn._create_connection = create_connection
+    started = time.perf_counter()
+    conn.connect()
+    rest = time.perf_counter() - started - timings.get('dns', 0) - timings.get('connect', 0)
+    if isinstance(conn, http.client.HTTPSConnection) or conn._tunnel_host:
+        timings['tls'] = max(0.0, rest)
+
+
+def _split_timeout(timeout):
+    if isinstance(timeout, tuple):
+        return timeout
+    return timeout, timeout
+
+
+def _send(pool, url, headers, auth, timeout):
+    connect_timeout, read_timeout = _split_timeout(timeout)
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ('http', 'https'):
+        raise urllib.error.URLError(_('Unsupported URL scheme: %s') % url)
+    host = parts.hostname or ''
+    port = parts.port or (443 if scheme == 'https' else 80)
+    proxy = _proxy_for(scheme, host)
+
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    req_headers = dict(headers)
+    if proxy is not None and scheme == 'http':
+        # 평문 프록시에는 절대 URL로 요청한다
+        path = '%s://%s:%d%s' % (scheme, host, port, path)
+        if proxy.username:
+            req_headers['Proxy-Authorization'] = _basic_auth_header(
+                unquote(proxy.username), unquote(proxy.password or ''))
+    if auth is not None:
+        req_headers['Authorization'] = _basic_auth_header(*auth)
+
+    proxy_id = proxy.netloc if proxy is not None else ''
+    key = (scheme, host, port, proxy_id, auth[0] if auth else '')
+
+    while True:
+        conn, reused = pool.acquire(
+            key, lambda: _connect(scheme, host, port, proxy, connect_timeout),
+            timeout=connect_timeout)
+        # 새 연결은 request() 안에서 connect_timeout으로 접속하고,
+        # 응답 대기와 본문 읽기에는 read_timeout을 쓴다
+        conn.timeout = connect_timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(read_timeout)
+        timings = {}
+        try:
+            if conn.sock is None:
+                _timed_connect(conn, timings)
+                conn.sock.settimeout(read_timeout)
+            sent_at = time.perf_counter()
+            conn.request('GET', path, headers=req_headers)
+            resp = conn.getresponse()
+            timings['ttfb'] = time.perf_counter() - sent_at
+        except _STALE_ERRORS as e:
+            pool.discard(key, conn)
+            if reused:
+                continue
+            raise urllib.error.URLError(e)
+        except (socket.timeout, TimeoutError):
+            pool.discard(key, conn)
+            raise
+        except OSError as e:
+            pool.discard(key, conn)
+            raise urllib.error.URLError(e)
+        except BaseException:
+            pool.discard(key, conn)
+            raise
+        return PooledResponse(pool, key, conn, resp, url, timings, reused)
+
+
+def open_url(pool, url, headers=None, auth=None, timeout=60) -> PooledResponse:
+    """
+    풀을 통해 GET 요청을 보내고 PooledResponse를 반환.
+    리다이렉트를 따라가며, 4xx/5xx 응답은 urllib.error.HTTPError로 올린다.
+    auth=(username, password) 이면 최초 요청 호스트에만 Basic 인증 헤더를 보낸다.
+    timeout은 초 하나 또는 (connect, read) 튜플.
+    """
+    headers = dict(headers or {})
+    origin = urlsplit(url).netloc
+    for _ in range(_MAX_REDIRECTS + 1):
+        same_origin = urlsplit(url).netloc == origin
+        resp = _send(pool, url, headers, auth if same_origin else None, timeout)
+
+        if resp.status in _REDIRECT_CODES and resp.headers.get('Location'):
+            location = resp.headers['Location']
+            resp.read()
+            resp.close()
+            url = urljoin(url, location)
+            continue
+
+        if resp.status >= 400:
+            hdrs = resp.headers
+            resp.read()
+            resp.close()
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, hdrs, None)
+
+        return resp
+
+    raise urllib.error.URLError(_('Too many redirects: %s') % url)
@@ -0,0 +1,56 @@
+import os
+
+load_translations()
+
+
+def entry_metadata(entry):
+    """
+    BookEntry → calibre Metadata.
+    피드에 있던 식별자, 시리즈, 태그, 언어, 출판일, 소개까지 옮겨 두어
+    추가한 뒤에 온라인 메타데이터 내려받기를 돌릴 필요가 없게 한다.
+    """
+    from calibre.ebooks.metadata.book.base import Metadata
+    from calibre.utils.date import parse_only_date
+    from calibre.utils.localization import canonicalize_lang
+
+    mi = Metadata(entry.title, list(entry.authors) or [_('Unknown')])
+    if entry.publisher:
+        mi.publisher = entry.publisher
+    if entry.identifiers:
+        mi.set_identifiers(dict(entry.identifiers))
+    if entry.series:
+        mi.series = entry.series
+        mi.series_index = entry.series_index or 1.0
+    if entry.tags:
+        mi.tags = list(entry.tags)
+    languages = [canonicalize_lang(lang) for lang in entry.languages]
+    languages = [lang for lang in languages if lang]
+    if languages:
+        mi.languages = languages
+    if entry.pubdate:
+        try:
+            mi.pubdate = parse_only_date(entry.pubdate, assume_utc=True)
+        except (ValueError, OverflowError):
+            pass
+    if entry.summary:
+        mi.comments = entry.summary
+    return mi
+
+
+def add_entries(db, items) -> list:
+    """
+    items: [(path, BookEntry), ...] 를 db(new_api)에 한 번의 add_books() 호출로 넣는다.
+    트랜잭션이 하나라 배치 크기만큼 커밋이 줄어든다. 넣은 뒤 임시 파일을 지우고
+    새 book_id 목록을 반환한다. GUI 갱신은 호출 측 몫.
+    """
+    books = []
+    for path, entry in items:
+        fmt = os.path.splitext(path)[1][1:].upper()
+        books.append((entry_metadata(entry), {fmt: path}))
+    ids, _duplicates = db.add_books(books)
+    for path, _entry in items:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return ids
@@ -0,0 +1,251 @@
+import re
+import threading
+import unicodedata
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# 색인을 다시 읽게 만드는 필드 (metadata_changed 이벤트)
+_INDEXED_FIELDS = frozenset(('title', 'authors', 'identifiers'))
+
+_LEADING_ARTICLE_RE = re.compile(r'^(the|a|an) ')
+_BRACKETS_RE = re.compile(r'[(\[][^)\]]*[)\]]')
+_NON_WORD_RE = re.compile(r'[\W_]+', re.UNICODE)
+_ISBN_CHARS_RE = re.compile(r'[^0-9X]')
+
+
+# ---------------------------------------------------------------------------
+# Normalisation
+# ---------------------------------------------------------------------------
+
+def _fold(text: str) -> str:
+    """악센트 제거 + casefold + 구두점을 공백 하나로."""
+    text = text or ''
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD_RE.sub(' ', text.casefold()).strip()
+
+
+def normalize_title(title: str) -> str:
+    """괄호 안 부가 설명과 앞의 관사를 떼어낸 비교용 제목."""
+    title = _fold(_BRACKETS_RE.sub(' ', title or ''))
+    return _LEADING_ARTICLE_RE.sub('', title)
+
+
+def normalize_author(name: str) -> str:
+    """'Austen, Jane'과 'Jane Austen'이 같아지도록 단어를 정렬한 비교용 저자명."""
+    return ' '.join(sorted(_fold(name).split()))
+
+
+def normalize_isbn(value: str) -> str:
+    """숫자만 남기고 ISBN-10은 ISBN-13으로 바꾼다. ISBN이 아니면 ''."""
+    isbn = _ISBN_CHARS_RE.sub('', (value or '').upper())
+    if len(isbn) == 10:
+        core = '978' + isbn[:9]
+        check = (10 - sum(int(c) * (3 if i % 2 else 1)
+                          for i, c in enumerate(core)) % 10) % 10
+        return core + str(check)
+    if len(isbn) == 13 and isbn.isdigit():
+        return isbn
+    return ''
+
+
+def identifier_keys(identifiers: dict) -> list:
+    """{type: value} → 비교용 (type, value) 목록."""
+    keys = []
+    for kind, value in (identifiers or {}).items():
+        kind = kind.lower()
+        if kind == 'isbn':
+            value = normalize_isbn(value)
+        else:
+            value = (value or '').strip().lower()
+        if value:
+            keys.append((kind, value))
+    return keys
+
+
+def title_author_keys(title: str, authors) -> list:
+    """저자마다 하나씩 (제목, 저자) 키. 저자가 없으면 제목만."""
+    title = normalize_title(title)
+    if not title:
+        return []
+    names = [normalize_author(a) for a in authors or ()]
+    names = [n for n in names if n] or ['']
+    return ['%s\x1f%s' % (title, n) for n in names]
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class LibraryIndex(QObject):
+    """
+    현재 Calibre 라이브러리의 중복 판단용 메모리 색인.
+
+    (정규화한 제목, 저자) 키와 식별자(ISBN, uuid 등)를 book_id에 매핑한 dict 두 개라
+    find()는 라이브러리 크기와 상관없이 O(1)이다. build()로 한 번 채운 뒤에는
+    Calibre DB 이벤트 리스너로 등록되어 책 추가/삭제/메타데이터 변경을 따라간다.
+    이벤트는 DB 디스패처 스레드에서 오므로 내부 dict는 잠금으로 보호하고,
+    바뀔 때마다 changed 시그널을 보낸다 (GUI 스레드로 큐잉된다).
+    """
+
+    changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.library_id = None
+        self.ready = False
+        self._db = None
+        self._lock = threading.Lock()
+        self._by_key = {}       # title/author 키 -> {book_id, ...}
+        self._by_ident = {}     # (type, value) -> {book_id, ...}
+        self._book_keys = {}    # book_id -> (키 목록, 식별자 목록) — 삭제/갱신용
+
+    def __len__(self):
+        return len(self._book_keys)
+
+    # ------------------------------------------------------------------
+    # Build / attach
+    # ------------------------------------------------------------------
+
+    def build(self, db):
+        """db(new_api Cache)의 모든 책으로 색인을 채운다. 작업 스레드에서 불러도 된다."""
+        book_ids = list(db.all_book_ids())
+        titles = db.all_field_for('title', book_ids)
+        authors = db.all_field_for('authors', book_ids)
+        identifiers = db.all_field_for('identifiers', book_ids)
+        with self._lock:
+            if db is not self._db:
+                return      # 그 사이 다른 라이브러리로 바뀌었다
+            self._by_key.clear()
+            self._by_ident.clear()
+            self._book_keys.clear()
+            for book_id in book_ids:
+                self._put(book_id, titles.get(book_id), authors.get(book_id),
+                          identifiers.get(book_id))
+            self.ready = True
+
+    def attach(self, db, library_id):
+        """이 라이브러리의 DB 이벤트를 받기 시작한다 (이전 라이브러리는 해제)."""
+        self.detach()
+        self._db = db
+        self.library_id = library_id
+        self.ready = False
+        add_listener = getattr(db, 'add_listener', None)
+        if add_listener is not None:
+            # Calibre는 리스너를 약한 참조로 들고 있으므로 self를 그대로 넘긴다
+            add_listener(self)
+
+    def detach(self):
+        if self._db is not None:
+            remove_listener = getattr(self._db, 'remove_listener', None)
+            if remove_listener is not None:
+                remove_listener(self)
+        self._db = None
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def find(self, entry):
+        """entry(BookEntry)와 같은 책의 book_id, 없으면 None. 식별자를 먼저 본다."""
+        if not self.ready:
+            return None
+        with self._lock:
+            for key in identifier_keys(entry.identifiers):
+                ids = self._by_ident.get(key)
+                if ids:
+                    return next(iter(ids))
+            for key in title_author_keys(entry.title, entry.authors):
+                ids = self._by_key.get(key)
+                if ids:
+                    return next(iter(ids))
+        return None
+
+    def contains(self, entry) -> bool:
+        return self.find(entry) is not None
+
+    # ------------------------------------------------------------------
+    # Calibre DB events
+    # ------------------------------------------------------------------
+
+    def __call__(self, event_type, library_id, event_data):
+        # Calibre 디스패처는 listener(event_type, library_id, event_data)로 부르고
+        # 이벤트 인자는 event_data 튜플 하나로 넘긴다
+        if library_id != self.library_id or self._db is None:
+            return
+        event = getattr(event_type, 'name', event_type)
+        if event == 'book_created':
+            self._refresh_books(event_data[:1])
+        elif event == 'books_removed':
+            self._drop_books(event_data[0])
+        elif event == 'metadata_changed':
+            field, book_ids = event_data[0], event_data[1]
+            fields = {field} if isinstance(field, str) else set(field)
+            if not _INDEXED_FIELDS.intersection(fields):
+                return
+            self._refresh_books(book_ids)
+        else:
+            return
+        self.changed.emit()
+
+    def _refresh_books(self, book_ids):
+        db = self._db
+        if db is None:
+            return
+        rows = [(book_id, db.field_for('title', book_id), db.field_for('authors', book_id),
+                 db.field_for('identifiers', book_id)) for book_id in book_ids]
+        with self._lock:
+            for book_id, title, authors, identifiers in rows:
+                self._remove(book_id)
+                self._put(book_id, title, authors, identifiers)
+
+    def _drop_books(self, book_ids):
+        with self._lock:
+            for book_id in book_ids:
+                self._remove(book_id)
+
+    # -- 내부 (self._lock 보유 상태에서 호출) ------------------------------------
+
+    def _put(self, book_id, title, authors, identifiers):
+        keys = title_author_keys(title, authors)
+        idents = identifier_keys(identifiers)
+        for key in keys:
+            self._by_key.setdefault(key, set()).add(book_id)
+        for key in idents:
+            self._by_ident.setdefault(key, set()).add(book_id)
+        self._book_keys[book_id] = (keys, idents)
+
+    def _remove(self, book_id):
+        keys, idents = self._book_keys.pop(book_id, ((), ()))
+        for table, table_keys in ((self._by_key, keys), (self._by_ident, idents)):
+            for key in table_keys:
+                ids = table.get(key)
+                if ids is not None:
+                    ids.discard(book_id)
+                    if not ids:
+                        del table[key]
+
+
+class LibraryIndexThread(QThread):
+    """LibraryIndex.build()를 GUI 밖에서 돌린다. 끝나면 completed를 보낸다."""
+
+    completed = pyqtSignal()
+    error = pyqtSignal(str)
+
+    def __init__(self, index, db, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.db = db
+
+    def run(self):
+        try:
+            self.index.build(self.db)
+        except Exception as e:
+            self.error.emit(str(e))
+            return
+        self.completed.emit()
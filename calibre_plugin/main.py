@@ -2,7 +2,9 @@ import os
 
 from calibre.gui2.actions import InterfaceAction
 
-from .dialog import OPDSDialog
+# 이 모듈은 Calibre를 켤 때마다 액션 등록을 위해 읽힌다. 대화상자, 네트워크, 파서,
+# 모델 모듈과 그 위젯들은 show_dialog()가 처음 불릴 때 가져온다.
+# (benchmarks/bench_import.py가 지키는지 확인한다)
 
 
 class OPDSClientAction(InterfaceAction):
@@ -17,28 +19,74 @@ class OPDSClientAction(InterfaceAction):
         icon = get_icons('image/opds_client_icon.png')
         self.qaction.setIcon(icon)
         self.qaction.triggered.connect(self.show_dialog)
+        self._downloads = None
+        self._library = None
+        self._library_thread = None
 
     def show_dialog(self):
-        d = OPDSDialog(self.gui, self.qaction.icon(), self._add_books)
+        from .dialog import OPDSDialog
+        from .download_queue import DownloadManager
+
+        # 다운로드 큐는 대화상자를 닫아도 계속 진행되도록 액션이 소유한다
+        if self._downloads is None:
+            self._downloads = DownloadManager(self.gui)
+            self._downloads.batch_ready.connect(self._add_books)
+            self._downloads.resume()
+        self._update_library_index()
+        d = OPDSDialog(self.gui, self.qaction.icon(), self._downloads, self._library)
         d.exec_()
+        d.deleteLater()
+
+    def _update_library_index(self):
+        """
+        중복 판단용 라이브러리 색인. 라이브러리마다 한 번만 작업 스레드에서 만들고,
+        그 뒤로는 DB 이벤트로 갱신된다. 라이브러리를 바꾸면 다시 만든다.
+        """
+        from .library_index import LibraryIndex, LibraryIndexThread
+
+        db = self.gui.current_db.new_api
+        if self._library is None:
+            self._library = LibraryIndex(self.gui)
+        if self._library.library_id == db.library_id:
+            return
+        if self._library_thread is not None:
+            self._library_thread.completed.disconnect()
+        self._library.attach(db, db.library_id)
+        thread = LibraryIndexThread(self._library, db, self.gui)
+        thread.completed.connect(self._library.changed)
+        thread.finished.connect(thread.deleteLater)
+        thread.finished.connect(lambda t=thread: self._on_library_thread_finished(t))
+        self._library_thread = thread
+        thread.start()
+
+    def _on_library_thread_finished(self, thread):
+        if thread is self._library_thread:
+            self._library_thread = None
+
+    def _add_books(self, items):
+        """
+        items: [(path, entry), ...] — DownloadManager가 모아 보낸 한 배치.
+        entry가 있는 책은 new_api.add_books() 한 번(트랜잭션 하나)으로 넣고 GUI도 한 번만
+        갱신한다. entry가 None이면 Calibre Adder로 추가.
+        """
+        from .importer import add_entries
 
-    def _add_books(self, paths, entry=None):
-        from calibre.ebooks.metadata.book.base import Metadata
         db = self.gui.current_db
         add_action = self.gui.iactions['Add Books']
 
-        if entry is not None:
-            mi = Metadata(entry.title, entry.authors or [_('Unknown')])
-            if entry.publisher:
-                mi.publisher = entry.publisher
-            db.import_book(mi, paths)
-            add_action.refresh_gui(len(paths), set_current_row=0)
-            for p in paths:
-                try:
-                    os.remove(p)
-                except OSError:
-                    pass
-        else:
+        known = [(p, e) for p, e in items if e is not None]
+        paths = [p for p, e in items if e is None]
+
+        if known:
+            ids = add_entries(db.new_api, known)
+            if ids:
+                # new_api.add_books()는 레거시 층을 거치지 않으므로 뷰 맵과 추가 알림을
+                # 직접 갱신한다. 그러지 않으면 refresh_gui()가 엉뚱한 행을 보여준다
+                db.data.books_added(ids)
+                db.notify('add', ids)
+                add_action.refresh_gui(len(ids), set_current_row=0)
+
+        if paths:
             from functools import partial
             from calibre.gui2.add import Adder
             Adder(
@@ -0,0 +1,315 @@
+"""
+헤드리스 미러: 서버 하나의 카탈로그를 훑어 라이브러리에 없는 책을 내려받고 추가한다.
+
+    calibre-debug -r "OPDS Client" -- SERVER [--library PATH] [--format epub,pdf] ...
+
+Qt 위젯 없이 parse_feed / _fetch_feed / _download / add_books만 쓰므로 cron에서
+디스플레이 없는 노드로 돌릴 수 있다. 실패가 하나라도 있으면 종료 코드 1.
+"""
+import argparse
+import hashlib
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+from .config import prefs, data_dir, load_servers
+from .importer import add_entries
+from .library_index import LibraryIndex, title_author_keys
+from .network import DownloadCancelled, _download, _fetch_feed
+from .opds_parser import NavigationFeed, parse_feed
+
+load_translations()
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+_DEFAULT_MAX_PAGES = 20000
+# 진행 상황을 이 간격(초)마다 한 줄 출력
+_REPORT_INTERVAL = 10
+
+
+class MirrorStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.pages = 0
+        self.feed_bytes = 0
+        self.books = 0
+        self.owned = 0
+        self.downloaded = 0
+        self.download_bytes = 0
+        self.imported = 0
+        self.failures = []      # (url, 오류 메시지)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def summary(self) -> str:
+        elapsed = max(self.elapsed, 1e-6)
+        return '\n'.join((
+            _('Pages fetched:   %(pages)d (%(mb).1f MB)') % {
+                'pages': self.pages, 'mb': self.feed_bytes / 1e6},
+            _('Books found:     %d') % self.books,
+            _('Already present: %d') % self.owned,
+            _('Downloaded:      %(count)d (%(mb).1f MB, %(rate).2f MB/s)') % {
+                'count': self.downloaded, 'mb': self.download_bytes / 1e6,
+                'rate': self.download_bytes / 1e6 / elapsed},
+            _('Imported:        %d') % self.imported,
+            _('Failed:          %d') % len(self.failures),
+            _('Elapsed:         %(seconds).1f s (%(rate).2f books/s)') % {
+                'seconds': elapsed, 'rate': self.imported / elapsed},
+        ))
+
+
+# ---------------------------------------------------------------------------
+# Crawl
+# ---------------------------------------------------------------------------
+
+def iter_books(server, root_url, stats, max_pages=_DEFAULT_MAX_PAGES, should_stop=None):
+    """
+    root_url부터 navigation 트리와 acquisition 페이지(next 링크)를 넓이 우선으로 훑으며
+    (BookEntry, 페이지 URL)을 내놓는다. 같은 호스트의 링크만 따라간다.
+    받지 못한 페이지는 stats.failures에 남기고 건너뛴다.
+    """
+    host = urlsplit(root_url).netloc
+    pending = deque([root_url])
+    seen = {root_url}
+    while pending and stats.pages < max_pages:
+        if should_stop is not None and should_stop():
+            return
+        url = pending.popleft()
+        try:
+            data = _fetch_feed(url, server)
+            feed = parse_feed(data)
+        except Exception as e:
+            stats.failures.append((url, str(e)))
+            continue
+        stats.pages += 1
+        stats.feed_bytes += len(data)
+
+        if isinstance(feed, NavigationFeed):
+            children = [urljoin(url, e.url) for e in feed.entries if e.url]
+        else:
+            children = [urljoin(url, feed.next_url)] if feed.next_url else []
+            for entry in feed.entries:
+                yield entry, url
+        for child in children:
+            if child not in seen and urlsplit(child).netloc == host:
+                seen.add(child)
+                pending.append(child)
+
+
+def pick_format(entry, preferred):
+    """preferred 순서(['epub', 'pdf'])로 형식을 고른다. 없으면 첫 형식, 형식이 없으면 None."""
+    by_type = {f.type.lower(): f for f in entry.formats}
+    for kind in preferred:
+        if kind in by_type:
+            return by_type[kind]
+    return entry.formats[0] if entry.formats else None
+
+
+def _save_path(url, fmt) -> str:
+    # URL에서 결정되는 이름이라 다음 실행에서 .part 파일을 이어받는다
+    digest = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(data_dir('mirror'), '%s.%s' % (digest, fmt.type.lower()))
+
+
+# ---------------------------------------------------------------------------
+# Mirror
+# ---------------------------------------------------------------------------
+
+def mirror(server, db, root_url=None, preferred=('epub',), workers=None,
+           batch_size=None, max_pages=_DEFAULT_MAX_PAGES, limit=0,
+           include_owned=False, dry_run=False, log=print, stop_event=None):
+    """
+    server의 카탈로그를 db(new_api)로 미러링하고 MirrorStats를 반환.
+
+    크롤은 이 스레드에서, 내려받기는 workers개 스레드 풀에서 한다. 진행 중인 작업 수를
+    workers * 2로 묶어 크롤이 내려받기보다 너무 앞서가지 않게 하고, 끝난 책은
+    batch_size권씩 add_entries()로 넣는다. DB는 이 스레드에서만 건드린다.
+    """
+    stats = MirrorStats()
+    stop_event = stop_event or threading.Event()
+    workers = max(1, int(workers or prefs['max_downloads_per_host']))
+    batch_size = max(1, int(batch_size or prefs['import_batch_size']))
+    root_url = root_url or server['url']
+
+    library = LibraryIndex()
+    library.attach(db, db.library_id)
+    library.build(db)
+    log(_('Library: %d books') % len(library))
+
+    slots = threading.Semaphore(workers * 2)
+    finished = queue.Queue()    # (path, entry, size) / (url, None, 오류 메시지) / None(취소)
+    in_flight = 0
+    batch = []
+    seen_urls = set()
+    seen_keys = set()
+    last_report = time.monotonic()
+
+    def download(url, fmt, entry):
+        path = _save_path(url, fmt)
+        try:
+            size = _download(url, server, path, is_cancelled=stop_event.is_set)
+            finished.put((path, entry, size))
+        except DownloadCancelled:
+            finished.put(None)
+        except Exception as e:
+            finished.put((url, None, str(e)))
+        finally:
+            slots.release()
+
+    def drain(block=False):
+        nonlocal in_flight
+        while in_flight:
+            try:
+                item = finished.get(block=block, timeout=0.5 if block else None)
+            except queue.Empty:
+                return
+            in_flight -= 1
+            if item is None:
+                continue
+            first, entry, value = item
+            if entry is None:
+                stats.failures.append((first, value))
+                log(_('Failed: %(url)s: %(error)s') % {'url': first, 'error': value})
+            else:
+                stats.downloaded += 1
+                stats.download_bytes += value
+                batch.append((first, entry))
+                if len(batch) >= batch_size:
+                    flush()
+
+    def flush():
+        if not batch:
+            return
+        items = list(batch)
+        del batch[:]
+        try:
+            stats.imported += len(add_entries(db, items))
+        except Exception as e:
+            for path, _entry in items:
+                stats.failures.append((path, str(e)))
+            log(_('Import failed: %s') % e)
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for entry, page in iter_books(server, root_url, stats, max_pages, stop_event.is_set):
+            stats.books += 1
+            fmt = pick_format(entry, preferred)
+            if fmt is None:
+                continue
+            url = urljoin(page, fmt.url)
+            keys = title_author_keys(entry.title, entry.authors)
+            if url in seen_urls or seen_keys.intersection(keys):
+                continue
+            seen_urls.add(url)
+            seen_keys.update(keys)
+            if not include_owned and library.contains(entry):
+                stats.owned += 1
+                continue
+            if dry_run:
+                log(_('Would download: %s') % entry.title)
+            else:
+                while not slots.acquire(timeout=0.5):
+                    drain()
+                in_flight += 1
+                pool.submit(download, url, fmt, entry)
+            drain()
+            if time.monotonic() - last_report >= _REPORT_INTERVAL:
+                last_report = time.monotonic()
+                log(_('%(pages)d pages, %(books)d books, %(downloaded)d downloaded, '
+                      '%(imported)d imported') % {
+                        'pages': stats.pages, 'books': stats.books,
+                        'downloaded': stats.downloaded, 'imported': stats.imported})
+            if limit and stats.downloaded + in_flight >= limit:
+                break
+        while in_flight:
+            drain(block=True)
+    except BaseException:
+        # Ctrl+C 등: 진행 중인 내려받기를 청크 사이에서 멈춘다 (.part는 다음 실행에서 이어받는다)
+        stop_event.set()
+        raise
+    finally:
+        pool.shutdown(wait=True)
+        library.detach()
+    flush()
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+def _find_server(name):
+    servers = load_servers()
+    for server in servers:
+        if server.get('name') == name:
+            return server
+    if name.isdigit() and int(name) < len(servers):
+        return servers[int(name)]
+    return None
+
+
+def _open_db(library_path):
+    from calibre.library import db as open_library
+    if not library_path:
+        from calibre.utils.config import prefs as calibre_prefs
+        library_path = calibre_prefs['library_path']
+    return open_library(os.path.expanduser(library_path)).new_api
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='calibre-debug -r "OPDS Client" --',
+        description=_('Mirror an OPDS catalog into a Calibre library without the GUI. '
+                      'Do not run it against a library that is open in Calibre.'))
+    parser.add_argument('server', help=_('Server name (or position) as configured in the plugin'))
+    parser.add_argument('--library', help=_('Library folder (default: the current Calibre library)'))
+    parser.add_argument('--root', help=_('Feed URL to start from (default: the server URL)'))
+    parser.add_argument('--format', default='epub',
+                        help=_('Preferred formats, comma separated (default: %(default)s)'))
+    parser.add_argument('--workers', type=int, default=0,
+                        help=_('Parallel downloads (default: max_downloads_per_host)'))
+    parser.add_argument('--batch-size', type=int, default=0,
+                        help=_('Books per library transaction (default: import_batch_size)'))
+    parser.add_argument('--max-pages', type=int, default=_DEFAULT_MAX_PAGES,
+                        help=_('Stop crawling after this many feed pages'))
+    parser.add_argument('--limit', type=int, default=0,
+                        help=_('Stop after downloading this many books (0 = no limit)'))
+    parser.add_argument('--include-owned', action='store_true',
+                        help=_('Also download books that are already in the library'))
+    parser.add_argument('--dry-run', action='store_true',
+                        help=_('Only list the books that would be downloaded'))
+    return parser
+
+
+def main(argv) -> int:
+    opts = build_parser().parse_args(argv)
+    server = _find_server(opts.server)
+    if server is None:
+        print(_('Unknown server: %s') % opts.server, file=sys.stderr)
+        return 2
+    db = _open_db(opts.library)
+    preferred = [f.strip().lower() for f in opts.format.split(',') if f.strip()]
+    stop_event = threading.Event()
+    try:
+        stats = mirror(server, db, root_url=opts.root, preferred=preferred,
+                       workers=opts.workers, batch_size=opts.batch_size,
+                       max_pages=opts.max_pages, limit=opts.limit,
+                       include_owned=opts.include_owned, dry_run=opts.dry_run,
+                       stop_event=stop_event)
+    except KeyboardInterrupt:
+        stop_event.set()
+        print(_('Interrupted.'), file=sys.stderr)
+        return 130
+    print(stats.summary())
+    for url, error in stats.failures:
+        print('%s: %s' % (url, error), file=sys.stderr)
+    return 1 if stats.failures else 0
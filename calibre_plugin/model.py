@@ -1,9 +1,13 @@
 from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QBrush, QColor
 
 load_translations()
 
 COLUMNS = [_('Title'), _('Author'), _('Format'), _('Size')]
 
+# 이미 라이브러리에 있는 책의 글자색
+_OWNED_BRUSH = QBrush(QColor(128, 128, 128))
+
 
 def _fmt_size(total_bytes: int) -> str:
     if total_bytes <= 0:
@@ -15,19 +19,144 @@ def _fmt_size(total_bytes: int) -> str:
     return '%dB' % total_bytes
 
 
+def _display_row(entry) -> tuple:
+    """행의 표시 문자열을 한 번만 만들어 둔다 (data()는 스크롤마다 불린다)."""
+    formats = entry.formats
+    return (
+        entry.title,
+        ', '.join(entry.authors) if entry.authors else '',
+        ', '.join(f.type.upper() for f in formats),
+        _fmt_size(sum(f.size for f in formats)),
+    )
+
+
+def _entry_key(entry):
+    """중복 판단 키: 첫 acquisition URL (없으면 제목 + 저자)."""
+    if entry.formats:
+        return entry.formats[0].url
+    return (entry.title, entry.authors)
+
+
+def _size_of(entry) -> int:
+    return sum(f.size for f in entry.formats)
+
+
 class BookTableModel(QAbstractTableModel):
     def __init__(self, parent=None):
         super().__init__(parent)
         self._entries = []
+        self._display = []
+        self._owned = []        # 행별 '라이브러리에 있음' 여부
+        self._keys = None       # 병합 모드에서만 쓰는 중복 판단용 키 집합
+        self._covers = None
+        self._library = None
+
+    def set_cover_loader(self, loader):
+        """CoverLoader를 주면 제목 열에 표지 썸네일을 그린다 (None이면 끔)."""
+        if self._covers is not None:
+            self._covers.cover_ready.disconnect(self._on_cover_ready)
+        self._covers = loader
+        if loader is not None:
+            loader.cover_ready.connect(self._on_cover_ready)
+        self._on_cover_ready()
+
+    def _on_cover_ready(self, url=None):
+        # 뷰는 범위 변경을 보이는 영역 다시 그리기로 처리하므로 행을 찾지 않는다
+        if self._entries:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self._entries) - 1, 0),
+                                  [Qt.DecorationRole])
+
+    def set_library_index(self, library):
+        """LibraryIndex를 주면 라이브러리에 이미 있는 책을 흐리게 표시한다."""
+        if self._library is not None:
+            self._library.changed.disconnect(self.refresh_owned)
+        self._library = library
+        if library is not None:
+            library.changed.connect(self.refresh_owned)
+        self.refresh_owned()
+
+    def _is_owned(self, entry) -> bool:
+        return self._library is not None and self._library.contains(entry)
+
+    def refresh_owned(self):
+        """라이브러리 색인이 준비되거나 바뀌면 모든 행의 표시를 다시 계산한다."""
+        owned = [self._is_owned(e) for e in self._entries]
+        if owned != self._owned:
+            self._owned = owned
+            self.dataChanged.emit(self.index(0, 0),
+                                  self.index(len(owned) - 1, len(COLUMNS) - 1),
+                                  [Qt.ForegroundRole, Qt.ToolTipRole])
+
+    def is_owned(self, row) -> bool:
+        return self._owned[row]
 
     def set_entries(self, entries):
+        """
+        entries로 교체. 앞부분이 이미 보여주고 있는 행과 같은 객체면
+        (스트리밍으로 먼저 받은 묶음) 모델을 리셋하지 않고 나머지만 덧붙인다.
+        """
+        shown = len(self._entries)
+        if 0 < shown <= len(entries) and all(
+                a is b for a, b in zip(self._entries, entries)):
+            self.append_entries(entries[shown:])
+            return
         self.beginResetModel()
-        self._entries = entries
+        self._entries = list(entries)
+        self._display = [_display_row(e) for e in entries]
+        self._owned = [self._is_owned(e) for e in entries]
+        self._keys = None
         self.endResetModel()
 
+    def start_merge(self):
+        """지금 행들을 기준으로 이후 merge_entries()가 중복을 거르게 한다."""
+        self._keys = {_entry_key(e) for e in self._entries}
+
+    def merge_entries(self, entries) -> int:
+        """이미 있는 acquisition URL은 건너뛰고 덧붙인다. 추가된 행 수를 반환."""
+        if self._keys is None:
+            self.start_merge()
+        fresh = []
+        for e in entries:
+            key = _entry_key(e)
+            if key not in self._keys:
+                self._keys.add(key)
+                fresh.append(e)
+        self.append_entries(fresh)
+        return len(fresh)
+
+    def append_entries(self, entries):
+        if not entries:
+            return
+        first = len(self._entries)
+        self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+        self._entries.extend(entries)
+        self._display.extend(_display_row(e) for e in entries)
+        self._owned.extend(self._is_owned(e) for e in entries)
+        self.endInsertRows()
+
     def entry(self, row):
         return self._entries[row]
 
+    def sort(self, column, order=Qt.AscendingOrder):
+        if not 0 <= column < len(COLUMNS) or not self._entries:
+            return
+        if column == 3:
+            keys = [_size_of(e) for e in self._entries]
+        else:
+            keys = [row[column].casefold() for row in self._display]
+        rows = sorted(range(len(keys)), key=keys.__getitem__,
+                      reverse=order != Qt.AscendingOrder)
+        self.layoutAboutToBeChanged.emit()
+        self._entries = [self._entries[i] for i in rows]
+        self._display = [self._display[i] for i in rows]
+        self._owned = [self._owned[i] for i in rows]
+        # 선택 상태가 같은 책을 따라가도록 persistent index를 옮긴다
+        new_row = {old: new for new, old in enumerate(rows)}
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(persistent, [
+            self.index(new_row[i.row()], i.column()) for i in persistent])
+        self.layoutChanged.emit()
+
     def rowCount(self, parent=QModelIndex()):
         return len(self._entries)
 
@@ -42,21 +171,25 @@ class BookTableModel(QAbstractTableModel):
     def data(self, index, role=Qt.DisplayRole):
         if not index.isValid():
             return None
-        entry = self._entries[index.row()]
-        col = index.column()
 
         if role == Qt.DisplayRole:
-            if col == 0:
-                return entry.title
-            if col == 1:
-                return ', '.join(entry.authors) if entry.authors else ''
-            if col == 2:
-                return ', '.join(f['type'].upper() for f in entry.formats) if entry.formats else ''
-            if col == 3:
-                total = sum(f.get('size', 0) for f in entry.formats)
-                return _fmt_size(total)
+            return self._display[index.row()][index.column()]
+
+        if role == Qt.DecorationRole:
+            if index.column() == 0 and self._covers is not None:
+                url = self._entries[index.row()].cover_url
+                return self._covers.pixmap(url) if url else None
+            return None
+
+        if role == Qt.ForegroundRole:
+            return _OWNED_BRUSH if self._owned[index.row()] else None
+
+        if role == Qt.ToolTipRole:
+            if self._owned[index.row()]:
+                return _('Already in your Calibre library')
+            return None
 
         if role == Qt.UserRole:
-            return entry
+            return self._entries[index.row()]
 
         return None
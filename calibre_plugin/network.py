@@ -1,8 +1,25 @@
+import http.client
+import json
+import os
+import threading
 import time
-import urllib.request
 import urllib.error
+from urllib.parse import urljoin, urlsplit
 
-from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QThread, Qt, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from .catalog_index import CatalogIndex, SyncIncomplete
+from .config import prefs
+from .feed_cache import cache_key, get_feed_cache, get_parsed_cache
+from .http_pool import ConnectionPool, accept_encoding, open_url
+from .opds_parser import parse_feed
+from .opensearch import get_opensearch_cache, parse_description
+from .retry import RetryPolicy, call_with_retry
+from .telemetry import (
+    CACHE_HIT, CACHE_MISS, CACHE_REVALIDATED, CACHE_UPDATED, COVER, DOWNLOAD, FEED,
+    get_telemetry,
+)
 
 load_translations()
 
@@ -10,72 +27,695 @@ load_translations()
 # Constants
 # ---------------------------------------------------------------------------
 
-_FETCH_TIMEOUT = 60
-_FETCH_RETRIES = 3
-_FETCH_RETRY_DELAY = 5
+_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# 책 파일은 받은 바이트 그대로 저장한다 (Range 오프셋도 원본 기준이어야 한다)
+_DOWNLOAD_HEADERS = {'Accept': '*/*', 'Accept-Encoding': 'identity'}
+_PROGRESS_INTERVAL = 0.1
+
+_DEFAULT_HEADERS = {
+    'User-Agent': 'CalibreOPDSClient/1.0',
+    'Accept': 'application/atom+xml, application/xml, text/xml, */*',
+}
+
+# FetchThread / DownloadThread가 공유하는 keep-alive 연결 풀
+_pool = ConnectionPool()
+
+# 최근 피드 요청별 (url, encoding, wire_bytes, body_bytes) 기록 수
+_TRANSFER_LOG_SIZE = 100
 
 
 # ---------------------------------------------------------------------------
 # HTTP fetch
 # ---------------------------------------------------------------------------
 
+class DownloadCancelled(Exception):
+    pass
+
+
+def _server_auth(server: dict):
+    if server.get('auth', 'none') == 'basic':
+        return (server.get('username', ''), server.get('password', ''))
+    return None
+
+
+def _open(url: str, server: dict, headers=None, policy=None, span=None):
+    """span(telemetry.Span)을 주면 이 요청을 한 번의 시도로 세고, 응답을 닫을 때 기록한다."""
+    _pool.configure(
+        max_per_host=prefs['max_connections_per_host'],
+        idle_timeout=prefs['idle_connection_timeout'],
+    )
+    if policy is None:
+        policy = RetryPolicy.for_server(server)
+    req_headers = dict(_DEFAULT_HEADERS)
+    if headers:
+        req_headers.update(headers)
+    if span is not None:
+        span.attempts += 1
+    resp = open_url(_pool, url, headers=req_headers,
+                    auth=_server_auth(server), timeout=policy.timeout)
+    if span is not None:
+        resp.on_close = span.add_response
+    return resp
+
+
+def _traced(span, attempt, url, policy, **kwargs):
+    """call_with_retry(attempt, ...)를 부르고 결과(또는 오류)로 span을 끝낸다."""
+    telemetry = get_telemetry()
+    try:
+        result = call_with_retry(attempt, url, policy, **kwargs)
+    except BaseException as e:
+        telemetry.finish(span, e)
+        raise
+    telemetry.finish(span)
+    return result
+
+
+def pool_stats() -> dict:
+    """연결 풀 hit/miss/eviction 카운터."""
+    return _pool.stats()
+
+
+class TransferStats:
+    """
+    피드 응답의 압축 전후 바이트 수. 호스트별 합계와 최근 요청별 기록을 둔다.
+    여러 FetchThread에서 동시에 기록한다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}    # host -> {'requests', 'compressed', 'wire_bytes', 'body_bytes'}
+        self._recent = []
+
+    def record(self, resp):
+        host = urlsplit(resp.url).netloc
+        with self._lock:
+            totals = self._hosts.setdefault(host, {
+                'requests': 0, 'compressed': 0, 'wire_bytes': 0, 'body_bytes': 0})
+            totals['requests'] += 1
+            totals['compressed'] += bool(resp.content_encoding)
+            totals['wire_bytes'] += resp.wire_bytes
+            totals['body_bytes'] += resp.body_bytes
+            self._recent.append(
+                (resp.url, resp.content_encoding, resp.wire_bytes, resp.body_bytes))
+            del self._recent[:-_TRANSFER_LOG_SIZE]
+
+    def host(self, host) -> dict:
+        """호스트 합계 (+ ratio = 본문 / 전송 바이트). 기록이 없으면 None."""
+        with self._lock:
+            totals = self._hosts.get(host)
+            if totals is None:
+                return None
+            totals = dict(totals)
+        totals['ratio'] = totals['body_bytes'] / max(1, totals['wire_bytes'])
+        return totals
+
+    def recent(self) -> list:
+        with self._lock:
+            return list(self._recent)
+
+
+_transfer_stats = TransferStats()
+
+
+def transfer_stats() -> TransferStats:
+    """피드 요청의 압축 전후 바이트 카운터."""
+    return _transfer_stats
+
+
+def _read_feed_body(resp) -> bytes:
+    """Content-Encoding을 풀어 본문을 읽고 전송량을 기록."""
+    data = resp.read_decoded()
+    _transfer_stats.record(resp)
+    return data
+
+
+def _raise_if_html(resp):
+    """
+    Content-Type 헤더만 보고 HTML 응답(로그인 페이지 등)을 거른다.
+    본문은 미리보기용 앞부분만 읽는다.
+    """
+    content_type = resp.headers.get('Content-Type', '')
+    if 'text/html' in content_type:
+        preview = resp.read_decoded(200).decode('utf-8', errors='replace').strip()
+        raise ValueError(
+            _('Server returned HTML instead of XML (Content-Type: %s).\n'
+              'Please check the URL and authentication settings.\n\n'
+              'Response preview:\n%s') % (content_type, preview)
+        )
+
+
 def _fetch(url: str, server: dict) -> bytes:
-    auth = server.get('auth', 'none')
-    if auth == 'basic':
-        username = server.get('username', '')
-        password = server.get('password', '')
-        password_mgr = urllib.request.HTTPPasswordMgrWithDefaultRealm()
-        password_mgr.add_password(None, url, username, password)
-        auth_handler = urllib.request.HTTPBasicAuthHandler(password_mgr)
-        opener = urllib.request.build_opener(auth_handler)
+    policy = RetryPolicy.for_server(server)
+    headers = {'Accept-Encoding': accept_encoding()}
+    span = get_telemetry().begin(FEED, url)
+
+    def attempt():
+        with _open(url, server, headers, policy, span) as resp:
+            _raise_if_html(resp)
+            return _read_feed_body(resp)
+
+    return _traced(span, attempt, url, policy)
+
+
+def _fetch_feed(url: str, server: dict, force=False, on_stale=None, span=None) -> bytes:
+    """
+    디스크 캐시를 거치는 피드 요청.
+
+    - 서버의 cache_ttl(초) 안에 저장된 사본은 요청 없이 바로 반환 (force면 무시)
+    - 그 외에는 If-None-Match / If-Modified-Since 조건부 GET, 304면 캐시 사본 반환
+    - stale_while_revalidate가 켜진 서버는 재검증 전에 on_stale(body)로 캐시 사본을 먼저 넘긴다.
+      이때 304면 None을 반환한다 (이미 넘긴 사본이 최신).
+    - gzip / deflate(/ br)로 받아 풀면서 읽고, 캐시에는 풀린 본문을 둔다.
+    - 요청은 span(없으면 새로 만든다)에 구간별 시간과 캐시 상태로 기록된다.
+    """
+    telemetry = get_telemetry()
+    if span is None:
+        span = telemetry.begin(FEED, url)
+    cache = get_feed_cache()
+    key = cache_key(url, server)
+    cached = cache.get(key)
+
+    if cached is not None and not force:
+        ttl = server.get('cache_ttl', 0) or 0
+        if cached.age < ttl:
+            span.cache = CACHE_HIT
+            span.body_bytes = len(cached.body)
+            telemetry.finish(span)
+            return cached.body
+        if on_stale is not None and server.get('stale_while_revalidate'):
+            on_stale(cached.body)
+        else:
+            on_stale = None
     else:
-        opener = urllib.request.build_opener()
+        on_stale = None
 
-    opener.addheaders = [
-        ('User-Agent', 'CalibreOPDSClient/1.0'),
-        ('Accept', 'application/atom+xml, application/xml, text/xml, */*'),
-    ]
+    headers = {'Accept-Encoding': accept_encoding()}
+    if cached is not None:
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
 
-    last_error = None
-    for attempt in range(_FETCH_RETRIES):
-        try:
-            with opener.open(url, timeout=_FETCH_TIMEOUT) as resp:
-                content_type = resp.headers.get('Content-Type', '')
-                data = resp.read()
-            if 'text/html' in content_type:
-                preview = data[:200].decode('utf-8', errors='replace').strip()
-                raise ValueError(
-                    _('Server returned HTML instead of XML (Content-Type: %s).\n'
-                      'Please check the URL and authentication settings.\n\n'
-                      'Response preview:\n%s') % (content_type, preview)
-                )
+    policy = RetryPolicy.for_server(server)
+
+    def attempt():
+        with _open(url, server, headers, policy, span) as resp:
+            if resp.status == 304 and cached is not None:
+                resp.read()
+                cache.touch(key)
+                span.cache = CACHE_REVALIDATED
+                return None if on_stale is not None else cached.body
+            _raise_if_html(resp)
+            data = _read_feed_body(resp)
+            cache.put(key, url, data,
+                      resp.headers.get('ETag', ''),
+                      resp.headers.get('Last-Modified', ''))
+            span.cache = CACHE_MISS if cached is None else CACHE_UPDATED
             return data
-        except (urllib.error.URLError, TimeoutError) as e:
-            last_error = e
-            if attempt < _FETCH_RETRIES - 1:
-                time.sleep(_FETCH_RETRY_DELAY)
 
-    raise last_error
+    return _traced(span, attempt, url, policy)
+
+
+def _fetch_if_changed(url: str, server: dict, etag='', last_modified=''):
+    """
+    CatalogIndex.sync()가 쓰는 조건부 피드 요청. 디스크 캐시 대신 색인에 저장된
+    ETag / Last-Modified를 보낸다. 304면 None, 아니면 (본문, ETag, Last-Modified).
+    """
+    policy = RetryPolicy.for_server(server)
+    headers = {'Accept-Encoding': accept_encoding()}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    span = get_telemetry().begin(FEED, url)
+
+    def attempt():
+        with _open(url, server, headers, policy, span) as resp:
+            if resp.status == 304:
+                resp.read()
+                span.cache = CACHE_REVALIDATED
+                return None
+            _raise_if_html(resp)
+            data = _read_feed_body(resp)
+            span.cache = CACHE_UPDATED if (etag or last_modified) else CACHE_MISS
+            return data, resp.headers.get('ETag', ''), resp.headers.get('Last-Modified', '')
+
+    return _traced(span, attempt, url, policy)
+
+
+def part_paths(save_path: str):
+    """save_path에 대응하는 (.part 파일, 재개 상태 JSON) 경로."""
+    part_path = save_path + '.part'
+    return part_path, part_path + '.json'
+
+
+def remove_partial(save_path: str):
+    for p in part_paths(save_path):
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+
+def _load_part_state(url: str, save_path: str):
+    """이어받을 수 있으면 (offset, state) 반환, 아니면 (0, None)."""
+    part_path, state_path = part_paths(save_path)
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        offset = os.path.getsize(part_path)
+    except (OSError, ValueError):
+        return 0, None
+    if state.get('url') != url or not state.get('accept_ranges'):
+        return 0, None
+    # 약한 ETag(W/)는 If-Range에 쓸 수 없다
+    validator = state.get('etag') or ''
+    if not validator or validator.startswith('W/'):
+        validator = state.get('last_modified') or ''
+    if not validator:
+        return 0, None
+    state['validator'] = validator
+    return offset, state
+
+
+def _save_part_state(url: str, save_path: str, resp, total: int):
+    _part_path, state_path = part_paths(save_path)
+    state = {
+        'url': url,
+        'etag': resp.headers.get('ETag', ''),
+        'last_modified': resp.headers.get('Last-Modified', ''),
+        'accept_ranges': 'bytes' in resp.headers.get('Accept-Ranges', '').lower(),
+        'total': total,
+    }
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+
+
+def _content_range(resp):
+    """Content-Range: bytes START-END/TOTAL → (start, total). 실패 시 (None, 0)."""
+    value = resp.headers.get('Content-Range', '')
+    try:
+        unit, rng = value.split(' ', 1)
+        span, total = rng.split('/', 1)
+        start = int(span.split('-', 1)[0])
+        return start, (0 if total.strip() == '*' else int(total))
+    except ValueError:
+        return None, 0
+
+
+def _download_once(url, server, save_path, progress, is_cancelled, span=None) -> int:
+    part_path, _state_path = part_paths(save_path)
+    offset, state = _load_part_state(url, save_path)
+
+    headers = dict(_DOWNLOAD_HEADERS)
+    if offset and state:
+        headers['Range'] = 'bytes=%d-' % offset
+        headers['If-Range'] = state['validator']
+
+    try:
+        resp = _open(url, server, headers, span=span)
+    except urllib.error.HTTPError as e:
+        if e.code != 416:
+            raise
+        # 보관 중인 .part가 서버 파일과 맞지 않음 → 처음부터 다시
+        remove_partial(save_path)
+        offset = 0
+        resp = _open(url, server, _DOWNLOAD_HEADERS, span=span)
+
+    with resp:
+        _raise_if_html(resp)
+        if resp.status == 206 and offset:
+            start, total = _content_range(resp)
+            if start != offset:
+                raise urllib.error.URLError(
+                    _('Server resumed at an unexpected offset.'))
+            mode = 'ab'
+        else:
+            # 서버가 Range를 거부(200)했거나 새 다운로드
+            offset = 0
+            mode = 'wb'
+            try:
+                total = int(resp.headers.get('Content-Length') or 0)
+            except ValueError:
+                total = 0
+        if mode == 'wb' or not state:
+            _save_part_state(url, save_path, resp, total)
+
+        done = offset
+        last_report = 0.0
+        with open(part_path, mode) as f:
+            while True:
+                chunk = resp.read(_DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if is_cancelled and is_cancelled():
+                    raise DownloadCancelled()
+                f.write(chunk)
+                done += len(chunk)
+                now = time.monotonic()
+                if progress and now - last_report >= _PROGRESS_INTERVAL:
+                    last_report = now
+                    progress(done, total)
+        if progress:
+            progress(done, total)
+        # read(amt)는 연결이 도중에 끊겨도 빈 바이트를 돌려줄 뿐이다
+        if total and done < total:
+            raise http.client.IncompleteRead(b'', total - done)
+
+    os.replace(part_path, save_path)
+    remove_partial(save_path)
+    return done
+
+
+def _download(url: str, server: dict, save_path: str,
+              progress=None, is_cancelled=None) -> int:
+    """
+    본문을 _DOWNLOAD_CHUNK_SIZE 단위로 save_path + '.part'에 기록하고,
+    완료되면 save_path로 이름을 바꾼다. 메모리 사용량은 파일 크기와 무관하게
+    청크 하나 분량으로 고정된다.
+
+    연결이 끊기면 .part 파일과 ETag/Last-Modified를 보관해 두었다가
+    Range + If-Range 요청으로 이어받는다. 서버가 Accept-Ranges를 알리지 않았거나
+    Range 요청에 200으로 응답하면 처음부터 다시 받는다.
+
+    progress(bytes_done, total)은 Content-Length가 없으면 total=0으로 호출된다.
+    is_cancelled()가 True를 반환하면 청크 사이에서 DownloadCancelled를 올린다.
+    파일 전체 크기(바이트)를 반환.
+    """
+    # 재시도마다 .part 파일에서 이어받으므로 끊긴 연결(IncompleteRead 등)도 일시적 오류로 본다
+    span = get_telemetry().begin(DOWNLOAD, url)
+    return _traced(
+        span, lambda: _download_once(url, server, save_path, progress, is_cancelled, span),
+        url, RetryPolicy.for_server(server), should_stop=is_cancelled)
 
 
 # ---------------------------------------------------------------------------
 # Background fetch thread
 # ---------------------------------------------------------------------------
 
+class _Superseded(Exception):
+    pass
+
+
 class FetchThread(QThread):
-    finished = pyqtSignal(bytes)
+    """
+    피드 요청과 파싱을 한 스레드에서 처리하고 완성된 피드 객체를 넘긴다.
+
+    - entries_ready(entries, first): acquisition 피드의 BookEntry 묶음 (파싱 도중).
+      first가 True면 새 피드의 첫 묶음이다.
+    - feed_ready(feed, digest): 파싱이 끝난 피드와 원본 바이트의 digest.
+      stale-while-revalidate 서버는 캐시 사본과 갱신본으로 두 번 올 수 있다.
+    - 원본 digest가 known_digest와 같으면(이미 화면에 있는 피드) 파싱하지 않는다.
+    - span은 이 요청의 telemetry.Span. 파싱 시간은 여기서, 화면에 그린 시간은
+      받는 쪽에서 채운다.
+
+    더는 필요 없는 요청은 requestInterruption()으로 버린다. 진행 중인 네트워크
+    요청은 끝까지 가지만 그 뒤의 파싱과 시그널은 생략된다.
+    """
+
+    entries_ready = pyqtSignal(object, bool)
+    feed_ready = pyqtSignal(object, object)
     error = pyqtSignal(str)
+    parse_error = pyqtSignal(str)
 
-    def __init__(self, url, server, parent=None):
+    def __init__(self, url, server, parent=None, force=False, known_digest=None):
         super().__init__(parent)
         self.url = url
         self.server = server
+        self.force = force
+        self.known_digest = known_digest
+        self.span = get_telemetry().begin(FEED, url)
+        self._first_batch = True
 
     def run(self):
         try:
-            self.finished.emit(_fetch(self.url, self.server))
+            data = _fetch_feed(self.url, self.server, force=self.force,
+                               on_stale=self._publish, span=self.span)
+            if data is not None:
+                self._publish(data)
+        except _Superseded:
+            pass
+        except Exception as e:
+            if not self.isInterruptionRequested():
+                self.error.emit(str(e))
+
+    def _check(self):
+        if self.isInterruptionRequested():
+            raise _Superseded()
+
+    def _publish(self, data: bytes):
+        self._check()
+        parsed_cache = get_parsed_cache()
+        digest = parsed_cache.digest(data)
+        if digest == self.known_digest:
+            return
+        self._first_batch = True
+        started = time.perf_counter()
+        try:
+            feed = parse_feed(data, on_entries=self._on_entries)
+        except _Superseded:
+            raise
+        except Exception as e:
+            self._check()
+            self.parse_error.emit(str(e))
+            return
+        self.span.parse = time.perf_counter() - started
+        get_telemetry().touch()
+        self._check()
+        parsed_cache.put(cache_key(self.url, self.server), feed, data)
+        self.known_digest = digest
+        self.feed_ready.emit(feed, digest)
+
+    def _on_entries(self, entries):
+        self._check()
+        self.entries_ready.emit(entries, self._first_batch)
+        self._first_batch = False
+
+
+def _follow_next(url, server, limit, should_stop, on_fetched=None):
+    """
+    url부터 rel="next"를 따라가며 최대 limit 페이지의 피드를 차례로 돌려준다.
+    파싱 캐시에 있는 페이지는 그대로 쓰고, 새로 받은 페이지는 on_fetched(key, feed, data)로 알린다.
+    next 링크는 페이지를 파싱해야 알 수 있으므로 순서대로 하나씩 받는다.
+    """
+    parsed_cache = get_parsed_cache()
+    for _ in range(limit):
+        if not url or should_stop():
+            return
+        key = cache_key(url, server)
+        cached = parsed_cache.peek(key)
+        if cached is not None:
+            feed = cached.feed
+        else:
+            data = _fetch_feed(url, server)
+            if should_stop():
+                return
+            feed = parse_feed(data)
+            if on_fetched is not None:
+                on_fetched(key, feed, data)
+        yield feed
+        next_url = getattr(feed, 'next_url', None)
+        url = urljoin(url, next_url) if next_url else None
+
+
+class PrefetchThread(QThread):
+    """
+    화면에 있는 acquisition 페이지 뒤의 rel="next" 페이지를 최대 pages 개까지
+    미리 받아 파싱해 두는 스레드. 결과는 파싱 캐시에만 넣고 시그널은 없다.
+    이미 캐시에 있는 페이지는 받지 않고 그 next_url만 따라간다.
+    LowPriority로 시작하고, 사용자가 다른 곳으로 이동하면 requestInterruption()으로 멈춘다.
+    """
+
+    def __init__(self, next_url, server, pages, parent=None):
+        super().__init__(parent)
+        self.next_url = next_url
+        self.server = server
+        self.pages = pages
+
+    def run(self):
+        parsed_cache = get_parsed_cache()
+        name = self.server.get('name', '')
+
+        def store(key, feed, data):
+            parsed_cache.put(key, feed, data, prefetched_by=name)
+
+        try:
+            for _feed in _follow_next(self.next_url, self.server, self.pages,
+                                      self.isInterruptionRequested, store):
+                pass
+        except Exception:
+            pass    # 미리 받기 실패는 조용히 넘기고, 실제로 열 때 오류를 보인다
+
+
+class LoadAllThread(QThread):
+    """
+    "모든 페이지 불러오기": next_url부터 rel="next"를 최대 max_pages 페이지까지 따라가며
+    페이지마다 page_ready(entries, has_more)를 보낸다. has_more는 상한에 걸려
+    멈췄는데 뒤에 페이지가 더 남았는지를 나타낸다 (마지막 페이지에서만 의미 있음).
+    """
+
+    page_ready = pyqtSignal(object, bool)
+    error = pyqtSignal(str)
+
+    def __init__(self, next_url, server, max_pages, parent=None):
+        super().__init__(parent)
+        self.next_url = next_url
+        self.server = server
+        self.max_pages = max_pages
+
+    def run(self):
+        try:
+            pages = _follow_next(self.next_url, self.server, self.max_pages,
+                                 self.isInterruptionRequested)
+            for n, feed in enumerate(pages, 1):
+                if self.isInterruptionRequested():
+                    return
+                has_more = n == self.max_pages and bool(getattr(feed, 'next_url', None))
+                self.page_ready.emit(list(getattr(feed, 'entries', [])), has_more)
+        except Exception as e:
+            if not self.isInterruptionRequested():
+                self.error.emit(str(e))
+
+
+class IndexThread(QThread):
+    """
+    서버 카탈로그를 로컬 색인(CatalogIndex)에 동기화하는 스레드.
+    바뀐 하위 트리만 내려가므로 처음 한 번 뒤로는 조건부 요청 몇 번으로 끝난다.
+    requestInterruption()으로 멈추면 다음 실행 때 남은 페이지부터 이어간다.
+    처음 보는 페이지를 받지 못하면 완료로 치지 않고 error를 보낸다 (다음 실행이 다시 시도).
+    """
+
+    progress = pyqtSignal(int, int)     # (pages_done, books)
+    completed = pyqtSignal(bool)        # 끝까지 마쳤으면 True, 중단되면 False
+    synced = pyqtSignal(object)         # 끝까지 마쳤을 때 SyncDiff (completed 다음)
+    error = pyqtSignal(str)
+
+    def __init__(self, server, parent=None):
+        super().__init__(parent)
+        self.server = server
+
+    def run(self):
+        try:
+            index = CatalogIndex.for_server(self.server)
+            try:
+                diff = index.sync(
+                    self.server['url'],
+                    lambda url, etag, modified: _fetch_if_changed(url, self.server, etag, modified),
+                    self.isInterruptionRequested,
+                    self.progress.emit)
+            finally:
+                index.close()
+        except SyncIncomplete as e:
+            url, reason = e.failed[0]
+            self.error.emit(_(
+                'Could not read %(count)d catalog pages, so the index is incomplete. '
+                'Build it again to retry them.\n\n%(url)s: %(error)s') % {
+                    'count': len(e.failed), 'url': url, 'error': reason})
+            return
         except Exception as e:
             self.error.emit(str(e))
+            return
+        self.completed.emit(diff is not None)
+        if diff is not None:
+            self.synced.emit(diff)
+
+
+class OpenSearchThread(QThread):
+    """
+    OpenSearch 설명 문서를 받아 검색 템플릿을 고르고 서버별 캐시에 저장한다.
+    resolved(template)는 저장 뒤에 보낸다.
+    """
+
+    resolved = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+    def __init__(self, description_url, server, parent=None):
+        super().__init__(parent)
+        self.description_url = description_url
+        self.server = server
+
+    def run(self):
+        try:
+            data = _fetch(self.description_url, self.server)
+            template = parse_description(data, self.description_url)
+        except Exception as e:
+            self.error.emit(str(e))
+            return
+        get_opensearch_cache().put(self.server, template, self.description_url)
+        self.resolved.emit(template)
+
+
+# ---------------------------------------------------------------------------
+# Cover thread
+# ---------------------------------------------------------------------------
+
+def _encode_thumbnail(image) -> bytes:
+    buf = QByteArray()
+    dev = QBuffer(buf)
+    dev.open(QIODevice.WriteOnly)
+    if not image.save(dev, 'JPEG', 85):
+        dev.close()
+        buf.clear()
+        dev.open(QIODevice.WriteOnly)
+        image.save(dev, 'PNG')
+    dev.close()
+    return bytes(buf)
+
+
+class CoverThread(QThread):
+    """
+    CoverLoader의 작업자. 대기열에서 (url, server)를 꺼내 디스크 캐시나 서버에서
+    표지를 가져오고, QImage로 디코딩해 size 안으로 줄인 뒤 loaded(url, QImage)를 보낸다.
+    서버에서 받은 표지는 줄인 크기로 디스크 캐시에 저장한다.
+    대기열이 닫히면(queue.take()가 None) 끝난다.
+    """
+
+    loaded = pyqtSignal(str, object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, queue, disk_cache, size, parent=None):
+        super().__init__(parent)
+        self.queue = queue
+        self.disk_cache = disk_cache
+        self.size = size
+
+    def run(self):
+        while not self.isInterruptionRequested():
+            job = self.queue.take()
+            if job is None:
+                return
+            url, server = job
+            try:
+                image = self._load(url, server)
+            except Exception:
+                image = None
+            if image is None:
+                self.failed.emit(url)
+            else:
+                self.loaded.emit(url, image)
+
+    def _load(self, url, server):
+        data = self.disk_cache.get(url)
+        if data is not None:
+            image = QImage()
+            if image.loadFromData(data):
+                return image
+        # 표지는 재시도하지 않는다 (실패하면 자리표시 없이 둔다)
+        span = get_telemetry().begin(COVER, url)
+
+        def attempt():
+            with _open(url, server, span=span) as resp:
+                _raise_if_html(resp)
+                return resp.read()
+
+        data = _traced(span, attempt, url, RetryPolicy.for_server(server), attempts=1)
+        image = QImage()
+        if not image.loadFromData(data):
+            return None
+        if image.width() > self.size.width() or image.height() > self.size.height():
+            image = image.scaled(self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.disk_cache.put(url, _encode_thumbnail(image))
+        return image
 
 
 # ---------------------------------------------------------------------------
@@ -84,6 +724,7 @@ class FetchThread(QThread):
 
 class DownloadThread(QThread):
     finished = pyqtSignal(str)
+    progress = pyqtSignal(object, object)    # (bytes_done, total) — 2GB 초과 대비 object
     error = pyqtSignal(str)
 
     def __init__(self, url, save_path, server, parent=None):
@@ -94,9 +735,9 @@ class DownloadThread(QThread):
 
     def run(self):
         try:
-            data = _fetch(self.url, self.server)
-            with open(self.save_path, 'wb') as f:
-                f.write(data)
+            _download(self.url, self.server, self.save_path,
+                      progress=self.progress.emit,
+                      is_cancelled=self.isInterruptionRequested)
             self.finished.emit(self.save_path)
         except Exception as e:
             self.error.emit(str(e))
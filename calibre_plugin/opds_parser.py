@@ -1,36 +1,159 @@
+import re
+import sys
 import xml.etree.ElementTree as ET
+import zlib
+from collections import namedtuple
 from dataclasses import dataclass, field
-from typing import List, Optional
-
-from calibre.web.feeds.feedparser import parse as feedparser_parse
+from typing import List, NamedTuple, Optional
+from urllib.parse import urljoin
 
 load_translations()
 
-# ET fallback — publisher 추출 전용
 _ATOM_NS = 'http://www.w3.org/2005/Atom'
+_DC_NS = 'http://purl.org/dc/elements/1.1/'
+_DCTERMS_NS = 'http://purl.org/dc/terms/'
+_OPENSEARCH_NS = 'http://a9.com/-/spec/opensearch/1.1/'
+_SCHEMA_NS = 'http://schema.org/'
+_XML_BASE = '{http://www.w3.org/XML/1998/namespace}base'
+
+# 네임스페이스 없는 Atom도 받아들인다
+_ATOM_NAMESPACES = (_ATOM_NS, '')
+_DC_NAMESPACES = (_DC_NS, _DCTERMS_NS)
+
+_FEED_CHUNK_SIZE = 64 * 1024
+# on_entries 콜백에 한 번에 넘기는 BookEntry 수
+_ENTRY_BATCH = 200
+# 이 길이 이상의 소개글은 zlib으로 줄여 두고 읽을 때 푼다
+_PACK_SUMMARY_MIN = 256
 
 
-@dataclass
 class NavEntry:
-    title: str
+    __slots__ = ('title', 'url', 'content', 'id', 'updated')
+
+    def __init__(self, title: str, url: str, content: str = '', id: str = '',
+                 updated: str = ''):
+        self.title = title
+        self.url = url
+        self.content = content
+        self.id = id
+        self.updated = updated      # Atom <updated>: 링크한 하위 피드가 마지막으로 바뀐 시각
+
+    def __eq__(self, other):
+        if not isinstance(other, NavEntry):
+            return NotImplemented
+        return (self.title, self.url, self.content) == (other.title, other.url, other.content)
+
+    def __repr__(self):
+        return 'NavEntry(title=%r, url=%r)' % (self.title, self.url)
+
+
+class Format(NamedTuple):
+    """acquisition 링크 하나. 책마다 dict를 두지 않도록 튜플로 둔다."""
+    type: str           # 확장자 ('epub')
+    mime: str
     url: str
-    content: str = ''
+    size: int = 0
+
+    @classmethod
+    def coerce(cls, value) -> 'Format':
+        """저장된 큐/색인의 dict 또는 list 표현도 받아들인다."""
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, dict):
+            return cls(sys.intern(value.get('type', '')), sys.intern(value.get('mime', '')),
+                       value.get('url', ''), _int(value.get('size')))
+        return cls(*value)
 
 
-@dataclass
 class BookEntry:
-    title: str
-    authors: List[str] = field(default_factory=list)
-    formats: List[dict] = field(default_factory=list)   # [{'type': 'epub', 'url': '...', 'size': 0}]
-    summary: str = ''
-    cover_url: str = ''
-    publisher: str = ''
+    """
+    acquisition 피드의 책 한 권. 큰 카탈로그에서는 수만 개가 메모리에 남으므로
+    __slots__를 쓰고, 목록 필드는 튜플, 형식은 Format 튜플, 식별자는 (type, value) 튜플로 둔다.
+    저자/출판사/태그/언어처럼 책끼리 겹치는 짧은 문자열은 intern하고,
+    긴 소개글은 압축해 두었다가 summary를 읽을 때 푼다.
+    id / updated는 Atom <id> / <updated> 그대로다 (증분 동기화에서 책을 알아보는 데 쓴다).
+    """
+
+    __slots__ = ('title', 'authors', 'formats', '_summary', 'cover_url', 'publisher',
+                 '_identifiers', 'series', 'series_index', 'tags', 'languages', 'pubdate',
+                 'id', 'updated')
+
+    _FIELDS = ('title', 'authors', 'formats', 'summary', 'cover_url', 'publisher',
+               'identifiers', 'series', 'series_index', 'tags', 'languages', 'pubdate',
+               'id', 'updated')
+
+    def __init__(self, title: str, authors=(), formats=(), summary: str = '',
+                 cover_url: str = '', publisher: str = '', identifiers=None,
+                 series: str = '', series_index: float = 0.0, tags=(), languages=(),
+                 pubdate: str = '', id: str = '', updated: str = ''):
+        intern = sys.intern
+        self.title = title
+        self.authors = tuple(map(intern, authors))
+        self.formats = tuple(Format.coerce(f) for f in formats)
+        self.summary = summary
+        self.cover_url = cover_url
+        self.publisher = intern(publisher)
+        self.identifiers = identifiers
+        self.series = intern(series)
+        self.series_index = series_index
+        self.tags = tuple(map(intern, tags))
+        self.languages = tuple(map(intern, languages))
+        self.pubdate = intern(pubdate)
+        self.id = id
+        # 한 피드의 책들은 같은 시각을 싣는 일이 많다
+        self.updated = intern(updated)
+
+    @property
+    def summary(self) -> str:
+        value = self._summary
+        if isinstance(value, bytes):
+            return zlib.decompress(value).decode('utf-8')
+        return value
+
+    @summary.setter
+    def summary(self, text):
+        text = text or ''
+        if len(text) >= _PACK_SUMMARY_MIN:
+            packed = zlib.compress(text.encode('utf-8'), 1)
+            if len(packed) < len(text):
+                self._summary = packed
+                return
+        self._summary = text
+
+    @property
+    def identifiers(self) -> dict:
+        return dict(self._identifiers)
+
+    @identifiers.setter
+    def identifiers(self, value):
+        self._identifiers = tuple(dict(value).items()) if value else ()
+
+    def to_dict(self) -> dict:
+        """JSON으로 저장할 수 있는 표현 (from_dict()로 되돌린다)."""
+        d = {name: getattr(self, name) for name in self._FIELDS}
+        d['formats'] = [f._asdict() for f in self.formats]
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'BookEntry':
+        return cls(**{k: v for k, v in d.items() if k in cls._FIELDS})
+
+    def __eq__(self, other):
+        if not isinstance(other, BookEntry):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._FIELDS)
+
+    def __repr__(self):
+        return 'BookEntry(title=%r, authors=%r)' % (self.title, self.authors)
 
 
 @dataclass
 class NavigationFeed:
     title: str
     entries: List[NavEntry] = field(default_factory=list)
+    search_url: Optional[str] = None    # rel="search" (OpenSearch 설명 문서 또는 템플릿)
+    search_type: str = ''
+    updated: str = ''                   # feed <updated>
 
 
 @dataclass
@@ -39,16 +162,15 @@ class AcquisitionFeed:
     entries: List[BookEntry] = field(default_factory=list)
     next_url: Optional[str] = None
     total_results: int = 0
+    search_url: Optional[str] = None
+    search_type: str = ''
+    updated: str = ''
 
 
 # ---------------------------------------------------------------------------
 # 내부 헬퍼
 # ---------------------------------------------------------------------------
 
-def _is_navigation_link_type(mime: str) -> bool:
-    return 'application/atom+xml' in mime
-
-
 def _is_acquisition_link_type(mime: str) -> bool:
     download_types = (
         'application/epub+zip',
@@ -80,191 +202,495 @@ def _ext_from_mime(mime: str) -> str:
     return mime.split('/')[-1]
 
 
-def _detect_feed_type(result) -> str:
-    """
-    우선순위:
-    1. entry에 acquisition rel 링크 → acquisition
-    2. feed self 링크 type → acquisition / navigation
-    3. entry link mime → navigation
-    """
-    for entry in result.entries:
-        for link in entry.get('links', []):
-            rel = link.get('rel', '')
-            mime = link.get('type', '')
-            if rel.startswith('http://opds-spec.org/acquisition') or (
-                not rel and _is_acquisition_link_type(mime)
-            ):
-                return 'acquisition'
+_Link = namedtuple('_Link', 'rel type href length')
 
-    for link in result.feed.get('links', []):
-        if link.get('rel') == 'self':
-            t = link.get('type', '')
-            if 'kind=acquisition' in t:
-                return 'acquisition'
-            if 'kind=navigation' in t:
-                return 'navigation'
+# 피드 유형이 정해지기 전 entry의 중간 표현
+_RawEntry = namedtuple('_RawEntry', 'title authors summary publisher links identifiers '
+                                    'series series_index tags languages pubdate id updated')
 
-    for entry in result.entries:
-        for link in entry.get('links', []):
-            if _is_navigation_link_type(link.get('type', '')):
-                return 'navigation'
+# urn:isbn:…, isbn:…, urn:uuid:… 처럼 스킴이 붙은 dc:identifier
+_IDENTIFIER_RE = re.compile(r'^(?:urn:)?([a-z][a-z0-9_-]*):(.+)$', re.IGNORECASE)
+_BARE_ISBN_RE = re.compile(r'^(?:97[89])?[0-9][0-9 -]{7,15}[0-9xX]$')
+# Calibre 콘텐츠 서버는 시리즈를 content 본문에 'SERIES: 이름 [2]'로만 싣는다
+_CONTENT_SERIES_RE = re.compile(r'SERIES:\s*(.+?)\s*\[([0-9.]+)\]')
 
-    return 'navigation'
 
+def _split_tag(tag):
+    """'{ns}local' → (ns, local). 주석/PI 노드는 (None, None)."""
+    if not isinstance(tag, str):
+        return None, None
+    if tag.startswith('{'):
+        ns, _sep, local = tag[1:].partition('}')
+        return ns, local
+    return '', tag
 
-def _atom_publishers(xml_bytes: bytes) -> List[str]:
-    """
-    feedparser가 처리 못하는 <publisher><name>...</name></publisher>
-    (Calibre-Web 방식) 을 ET로 보완. entry 순서대로 반환.
-    """
+
+def _text(elem) -> str:
+    if elem.get('type') == 'xhtml':
+        return ''.join(elem.itertext()).strip()
+    return (elem.text or '').strip()
+
+
+def _int(value) -> int:
     try:
-        root = ET.fromstring(xml_bytes)
-        result = []
-        for entry in root.findall('{%s}entry' % _ATOM_NS):
-            pub_el = entry.find('{%s}publisher' % _ATOM_NS)
-            if pub_el is not None:
-                name_el = pub_el.find('{%s}name' % _ATOM_NS)
-                result.append(
-                    (name_el.text if name_el is not None else pub_el.text) or ''
-                )
-            else:
-                result.append('')
-        return result
-    except Exception:
-        return []
+        return int(value or 0)
+    except (ValueError, TypeError):
+        return 0
+
+
+def _parse_identifier(value: str):
+    """dc:identifier 값 → (type, value). 알아볼 수 없으면 None."""
+    value = (value or '').strip()
+    m = _IDENTIFIER_RE.match(value)
+    if m and m.group(1).lower() not in ('http', 'https'):
+        return m.group(1).lower(), m.group(2).strip()
+    if _BARE_ISBN_RE.match(value):
+        return 'isbn', value
+    return None
+
+
+def _float(value) -> float:
+    try:
+        return float(value or 0)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _attr(elem, name):
+    """네임스페이스가 붙었든 안 붙었든 속성 값."""
+    value = elem.get(name)
+    if value is None:
+        for key, v in elem.attrib.items():
+            if _split_tag(key)[1] == name:
+                return v
+    return value
+
+
+def _marks_acquisition(link) -> bool:
+    """피드 유형 판정용: acquisition rel이면 MIME과 상관없이 acquisition 피드로 본다."""
+    return (link.rel.startswith('http://opds-spec.org/acquisition')
+            or (not link.rel and _is_acquisition_link_type(link.type)))
+
+
+def _is_acquisition_link(link) -> bool:
+    """formats에 넣을 링크: acquisition 링크 중 내려받을 수 있는 책 MIME만."""
+    return _marks_acquisition(link) and _is_acquisition_link_type(link.type)
+
+
+def _read_link(elem, base):
+    href = elem.get('href', '')
+    if base and href:
+        href = urljoin(base, href)
+    return _Link(elem.get('rel', ''), elem.get('type', ''), href, elem.get('length'))
+
+
+def _read_entry(elem, base) -> _RawEntry:
+    if elem.get(_XML_BASE):
+        base = urljoin(base, elem.get(_XML_BASE))
+    title = None
+    summary = content = ''
+    authors = []
+    links = []
+    identifiers = {}
+    tags = []
+    languages = []
+    series = ''
+    series_index = 0.0
+    issued = dc_date = published = ''
+    entry_id = updated = ''
+    dc_publisher = atom_publisher = ''
+    for child in elem:
+        ns, name = _split_tag(child.tag)
+        if name == 'series':
+            # calibre:series / 네임스페이스 없는 <series index="2"> 등 확장 요소
+            series = _text(child)
+            series_index = _float(_attr(child, 'index') or _attr(child, 'position')) or series_index
+        elif name == 'series_index':
+            series_index = _float(child.text)
+        elif ns in _ATOM_NAMESPACES:
+            if name == 'title':
+                title = _text(child)
+            elif name == 'summary':
+                summary = _text(child)
+            elif name == 'content':
+                content = _text(child)
+            elif name == 'author':
+                for sub in child:
+                    if _split_tag(sub.tag)[1] == 'name' and sub.text and sub.text.strip():
+                        authors.append(sub.text.strip())
+            elif name == 'link':
+                links.append(_read_link(child, base))
+            elif name == 'publisher':
+                # Calibre-Web: <publisher><name>...</name></publisher>
+                name_el = None
+                for sub in child:
+                    if _split_tag(sub.tag)[1] == 'name':
+                        name_el = sub
+                        break
+                atom_publisher = ((name_el.text if name_el is not None else child.text)
+                                  or '').strip()
+            elif name == 'category':
+                tag = (child.get('label') or child.get('term') or '').strip()
+                if tag and tag not in tags:
+                    tags.append(tag)
+            elif name == 'published':
+                published = _text(child)
+            elif name == 'id':
+                entry_id = _text(child)
+            elif name == 'updated':
+                updated = _text(child)
+        elif ns in _DC_NAMESPACES:
+            if name == 'publisher':
+                dc_publisher = _text(child)
+            elif name == 'creator' and child.text and child.text.strip():
+                authors.append(child.text.strip())
+            elif name == 'identifier':
+                ident = _parse_identifier(child.text)
+                if ident is not None:
+                    identifiers.setdefault(*ident)
+            elif name == 'language' and child.text and child.text.strip():
+                languages.append(child.text.strip())
+            elif name == 'subject' and child.text and child.text.strip():
+                if child.text.strip() not in tags:
+                    tags.append(child.text.strip())
+            elif name == 'issued':
+                issued = _text(child)
+            elif name == 'date':
+                dc_date = _text(child)
+        elif ns == _SCHEMA_NS and name == 'Series':
+            # <schema:Series schema:name="…" schema:position="2"/>
+            series = (_attr(child, 'name') or '').strip()
+            series_index = _float(_attr(child, 'position'))
+    if title is None:
+        title = _('(no title)')
+    if not series and (content or summary):
+        m = _CONTENT_SERIES_RE.search(content or summary)
+        if m:
+            series, series_index = m.group(1), _float(m.group(2))
+    return _RawEntry(title, authors, summary or content,
+                     dc_publisher or atom_publisher, links, identifiers,
+                     series, series_index, tags, languages,
+                     issued or dc_date or published, entry_id, updated)
+
+
+def _nav_entry(raw: _RawEntry) -> NavEntry:
+    url = ''
+    for link in raw.links:
+        if (link.rel or 'alternate') in ('alternate', 'subsection',
+                                         'http://opds-spec.org/subsection'):
+            url = link.href
+            break
+    if not url and raw.links:
+        url = raw.links[0].href
+    return NavEntry(title=raw.title, url=url, content=raw.summary,
+                    id=raw.id, updated=raw.updated)
+
+
+def _book_entry(raw: _RawEntry) -> BookEntry:
+    cover_url = ''
+    formats = []
+    for link in raw.links:
+        if link.rel in ('http://opds-spec.org/image',
+                        'http://opds-spec.org/cover'):
+            cover_url = link.href
+        elif link.rel == 'http://opds-spec.org/image/thumbnail':
+            if not cover_url:
+                cover_url = link.href
+        elif _is_acquisition_link(link):
+            # MIME과 확장자는 몇 종류뿐이라 intern해 모든 책이 같은 객체를 가리키게 한다
+            mime = sys.intern(link.type)
+            formats.append(Format(sys.intern(_ext_from_mime(mime)), mime,
+                                  link.href, _int(link.length)))
+    return BookEntry(
+        title=raw.title,
+        authors=raw.authors,
+        formats=formats,
+        summary=raw.summary,
+        cover_url=cover_url,
+        publisher=raw.publisher,
+        identifiers=raw.identifiers,
+        series=raw.series,
+        series_index=raw.series_index,
+        tags=raw.tags,
+        languages=raw.languages,
+        pubdate=raw.pubdate,
+        id=raw.id,
+        updated=raw.updated,
+    )
 
 
 # ---------------------------------------------------------------------------
-# 공개 API
+# Feed builder
 # ---------------------------------------------------------------------------
 
-def parse_feed(xml_bytes: bytes):
+class _FeedBuilder:
     """
-    XML 바이트를 파싱해 NavigationFeed 또는 AcquisitionFeed를 반환.
-    calibre.web.feeds.feedparser 사용 (불량 XML에 대한 복구 내장).
+    feed 하위 요소와 entry를 받아 NavigationFeed / AcquisitionFeed를 만든다.
+
+    피드 유형 판정 우선순위:
+    1. entry에 acquisition 링크 → acquisition
+    2. feed self 링크 type의 kind=acquisition / kind=navigation
+    3. 그 외 → navigation
+
+    1과 2의 acquisition 판정은 도중에 확정되므로, 그 시점부터는 on_entries로
+    BookEntry를 _ENTRY_BATCH 개씩 넘긴다. navigation 피드는 끝까지 모은 뒤 만든다.
     """
-    result = feedparser_parse(xml_bytes)
 
-    # feedparser가 파싱 실패하고 entry도 없으면 오류 전달
-    if result.get('bozo') and not result.entries:
-        exc = result.get('bozo_exception')
-        raise ValueError(
-            _('Failed to parse OPDS feed: %s') % str(exc)
+    def __init__(self, on_entries=None):
+        self.title = ''
+        self.updated = ''
+        self.base = ''
+        self.next_url = None
+        self.total_results = 0
+        self.search_url = None
+        self.search_type = ''
+        self.self_kind = ''
+        self.has_acquisition = False
+        self.raw_entries = []
+        self.books = []
+        self._on_entries = on_entries
+        self._emitted = 0
+
+    def is_acquisition(self) -> bool:
+        return self.has_acquisition or self.self_kind == 'acquisition'
+
+    def feed_start(self, elem):
+        self.base = elem.get(_XML_BASE, '')
+
+    def feed_child(self, elem):
+        ns, name = _split_tag(elem.tag)
+        if ns in _ATOM_NAMESPACES:
+            if name == 'title':
+                self.title = _text(elem)
+            elif name == 'updated':
+                self.updated = _text(elem)
+            elif name == 'link':
+                link = _read_link(elem, self.base)
+                if link.rel == 'next':
+                    self.next_url = link.href
+                elif link.rel == 'search':
+                    self.add_search_link(link.href, link.type)
+                elif link.rel == 'self':
+                    if 'kind=acquisition' in link.type:
+                        self.self_kind = 'acquisition'
+                    elif 'kind=navigation' in link.type:
+                        self.self_kind = 'navigation'
+        elif ns == _OPENSEARCH_NS and name == 'totalResults':
+            self.total_results = _int(elem.text)
+
+    def add_search_link(self, href, mime):
+        # 바로 쓸 수 있는 Atom 템플릿을 OpenSearch 설명 문서보다 우선한다
+        if href and (not self.search_url or 'opensearchdescription' in self.search_type):
+            self.search_url = href
+            self.search_type = mime or ''
+
+    def entry(self, elem):
+        self.add_raw(_read_entry(elem, self.base))
+
+    def add_raw(self, raw: _RawEntry):
+        if not self.has_acquisition:
+            self.has_acquisition = any(_marks_acquisition(l) for l in raw.links)
+        self.raw_entries.append(raw)
+        if self._on_entries is not None and self.is_acquisition():
+            self._convert()
+            if len(self.books) - self._emitted >= _ENTRY_BATCH:
+                self._flush()
+
+    def _convert(self):
+        self.books.extend(_book_entry(r) for r in self.raw_entries)
+        self.raw_entries = []
+
+    def _flush(self):
+        if self._on_entries is not None and len(self.books) > self._emitted:
+            batch = self.books[self._emitted:]
+            self._emitted = len(self.books)
+            self._on_entries(batch)
+
+    def result(self):
+        if self.is_acquisition():
+            self._convert()
+            self._flush()
+            return AcquisitionFeed(
+                title=self.title,
+                entries=self.books,
+                next_url=self.next_url,
+                total_results=self.total_results,
+                search_url=self.search_url,
+                search_type=self.search_type,
+                updated=self.updated,
+            )
+        return NavigationFeed(
+            title=self.title,
+            entries=[_nav_entry(r) for r in self.raw_entries],
+            search_url=self.search_url,
+            search_type=self.search_type,
+            updated=self.updated,
         )
 
-    feed_title = result.feed.get('title', '')
-    feed_type = _detect_feed_type(result)
-
-    if feed_type == 'navigation':
-        return _parse_navigation(result, feed_title)
-    else:
-        return _parse_acquisition(result, feed_title, xml_bytes)
 
+def _walk_tree(root, builder: _FeedBuilder):
+    """이미 만들어진 트리(lxml recover 결과)를 builder에 넘긴다."""
+    builder.feed_start(root)
+    for child in root:
+        ns, name = _split_tag(child.tag)
+        if name == 'entry' and ns in _ATOM_NAMESPACES:
+            builder.entry(child)
+        elif ns is not None:
+            builder.feed_child(child)
+    return builder.result()
 
-def _parse_navigation(result, feed_title: str) -> NavigationFeed:
-    entries = []
-    for entry in result.entries:
-        title = entry.get('title', _('(no title)'))
-        summary = entry.get('summary', '')
 
-        url = ''
-        for link in entry.get('links', []):
-            rel = link.get('rel', 'alternate')
-            if rel in ('alternate', 'subsection',
-                       'http://opds-spec.org/subsection'):
-                url = link.get('href', '')
-                break
-        if not url and entry.get('links'):
-            url = entry['links'][0].get('href', '')
+# ---------------------------------------------------------------------------
+# Streaming parser
+# ---------------------------------------------------------------------------
 
-        entries.append(NavEntry(title=title, url=url, content=summary))
+class OPDSStreamParser:
+    """
+    XMLPullParser 기반 단일 패스 OPDS 파서. feed()로 바이트를 나눠 넣으면
+    entry가 끝날 때마다 바로 NavEntry/BookEntry 재료로 변환하고 요소를 비운다.
+    문서 전체 트리를 메모리에 들고 있지 않는다.
+    on_entries(list)는 acquisition 피드로 확정된 뒤 BookEntry 묶음마다 호출된다.
+    """
 
-    return NavigationFeed(title=feed_title, entries=entries)
+    def __init__(self, on_entries=None):
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._builder = _FeedBuilder(on_entries)
+        self._root = None
+        self._depth = 0
+
+    @property
+    def emitted(self) -> int:
+        return self._builder._emitted
+
+    def feed(self, data: bytes):
+        self._parser.feed(data)
+        self._drain()
+
+    def close(self):
+        self._parser.close()
+        self._drain()
+        if self._root is None:
+            raise ET.ParseError('no root element')
+        return self._builder.result()
+
+    def _drain(self):
+        for event, elem in self._parser.read_events():
+            if event == 'start':
+                self._depth += 1
+                if self._depth == 1:
+                    self._root = elem
+                    self._builder.feed_start(elem)
+                continue
+
+            self._depth -= 1
+            if self._depth != 1:
+                continue
+            # feed 바로 아래 요소가 끝났을 때만 처리
+            ns, name = _split_tag(elem.tag)
+            if name == 'entry' and ns in _ATOM_NAMESPACES:
+                self._builder.entry(elem)
+            else:
+                self._builder.feed_child(elem)
+            elem.clear()
+            self._root.remove(elem)
 
 
-def _parse_acquisition(result, feed_title: str,
-                        xml_bytes: bytes) -> AcquisitionFeed:
-    # 페이지네이션
-    next_url = None
-    for link in result.feed.get('links', []):
-        if link.get('rel') == 'next':
-            next_url = link.get('href')
+# ---------------------------------------------------------------------------
+# Fallbacks (불량 XML)
+# ---------------------------------------------------------------------------
 
-    total_results = 0
+def _parse_recover(xml_bytes: bytes, on_entries=None):
+    """lxml recover 모드로 최대한 복구한 트리를 같은 규칙으로 해석."""
     try:
-        total_results = int(result.feed.get('os_totalresults', 0) or 0)
-    except (ValueError, TypeError):
-        pass
+        from lxml import etree
+    except ImportError:
+        return None
+    parser = etree.XMLParser(recover=True, resolve_entities=False, no_network=True)
+    try:
+        root = etree.fromstring(xml_bytes, parser=parser)
+    except etree.LxmlError:
+        return None
+    if root is None:
+        return None
+    return _walk_tree(root, _FeedBuilder(on_entries))
 
-    # ET fallback으로 Atom <publisher><name> 미리 수집
-    atom_pubs = _atom_publishers(xml_bytes)
 
-    entries = []
-    for i, entry in enumerate(result.entries):
-        title = entry.get('title', _('(no title)'))
+def _parse_feedparser(xml_bytes: bytes, on_entries=None):
+    """마지막 수단: calibre.web.feeds.feedparser 결과를 같은 규칙으로 해석."""
+    from calibre.web.feeds.feedparser import parse as feedparser_parse
 
-        authors = [
-            a['name'] for a in entry.get('authors', []) if a.get('name')
-        ]
+    result = feedparser_parse(xml_bytes)
+
+    # feedparser가 파싱 실패하고 entry도 없으면 오류 전달
+    if result.get('bozo') and not result.entries:
+        exc = result.get('bozo_exception')
+        raise ValueError(
+            _('Failed to parse OPDS feed: %s') % str(exc)
+        )
 
-        summary = entry.get('summary', '')
-
-        # 출판사: dcterms_publisher 우선, 없으면 ET 결과
-        publisher = entry.get('dcterms_publisher', '') or ''
-        if not publisher and i < len(atom_pubs):
-            publisher = atom_pubs[i]
-
-        cover_url = ''
-        formats = []
-        for link in entry.get('links', []):
-            rel  = link.get('rel', '')
-            mime = link.get('type', '')
-            href = link.get('href', '')
-
-            if rel in ('http://opds-spec.org/image',
-                       'http://opds-spec.org/cover'):
-                cover_url = href
-            elif rel == 'http://opds-spec.org/image/thumbnail':
-                if not cover_url:
-                    cover_url = href
-            elif (rel.startswith('http://opds-spec.org/acquisition')
-                  and _is_acquisition_link_type(mime)):
-                size = 0
-                try:
-                    size = int(link.get('length', 0) or 0)
-                except (ValueError, TypeError):
-                    pass
-                formats.append({
-                    'type': _ext_from_mime(mime),
-                    'mime': mime,
-                    'url':  href,
-                    'size': size,
-                })
-            elif not rel and _is_acquisition_link_type(mime):
-                size = 0
-                try:
-                    size = int(link.get('length', 0) or 0)
-                except (ValueError, TypeError):
-                    pass
-                formats.append({
-                    'type': _ext_from_mime(mime),
-                    'mime': mime,
-                    'url':  href,
-                    'size': size,
-                })
-
-        entries.append(BookEntry(
-            title=title,
-            authors=authors,
-            formats=formats,
-            summary=summary,
-            cover_url=cover_url,
-            publisher=publisher,
+    builder = _FeedBuilder(on_entries)
+    builder.title = result.feed.get('title', '')
+    builder.updated = result.feed.get('updated', '') or ''
+    builder.total_results = _int(result.feed.get('opensearch_totalresults'))
+    for link in result.feed.get('links', []):
+        if link.get('rel') == 'next':
+            builder.next_url = link.get('href')
+        elif link.get('rel') == 'search':
+            builder.add_search_link(link.get('href'), link.get('type', ''))
+        elif link.get('rel') == 'self':
+            t = link.get('type', '')
+            if 'kind=acquisition' in t:
+                builder.self_kind = 'acquisition'
+            elif 'kind=navigation' in t:
+                builder.self_kind = 'navigation'
+
+    for entry in result.entries:
+        links = [
+            _Link(l.get('rel', ''), l.get('type', ''), l.get('href', ''), l.get('length'))
+            for l in entry.get('links', [])
+        ]
+        builder.add_raw(_RawEntry(
+            entry.get('title', _('(no title)')),
+            [a['name'] for a in entry.get('authors', []) if a.get('name')],
+            entry.get('summary', ''),
+            entry.get('dcterms_publisher', '') or '',
+            links,
+            dict(filter(None, [_parse_identifier(entry.get('dc_identifier', ''))])),
+            '', 0.0,
+            [t['term'] for t in entry.get('tags', []) if t.get('term')],
+            [entry['language']] if entry.get('language') else [],
+            entry.get('dcterms_issued', '') or entry.get('published', '') or '',
+            entry.get('id', '') or '',
+            entry.get('updated', '') or '',
         ))
+    return builder.result()
 
-    return AcquisitionFeed(
-        title=feed_title,
-        entries=entries,
-        next_url=next_url,
-        total_results=total_results,
-    )
+
+# ---------------------------------------------------------------------------
+# 공개 API
+# ---------------------------------------------------------------------------
+
+def parse_feed(xml_bytes: bytes, on_entries=None):
+    """
+    XML 바이트를 파싱해 NavigationFeed 또는 AcquisitionFeed를 반환.
+    OPDSStreamParser로 한 번에 파싱하고, 불량 XML이면
+    lxml recover 모드 → calibre.web.feeds.feedparser 순으로 복구를 시도한다.
+
+    on_entries를 주면 acquisition 피드의 BookEntry를 파싱 도중에 묶음으로 넘긴다.
+    묶음을 넘긴 뒤에 불량 XML로 복구 경로를 타면 더는 넘기지 않으므로,
+    호출 측은 반환된 피드의 entries를 최종 결과로 써야 한다.
+    """
+    parser = OPDSStreamParser(on_entries)
+    try:
+        # 나눠 넣어야 entry를 읽는 즉시 비울 수 있다
+        for start in range(0, len(xml_bytes), _FEED_CHUNK_SIZE):
+            parser.feed(xml_bytes[start:start + _FEED_CHUNK_SIZE])
+        return parser.close()
+    except ET.ParseError:
+        if parser.emitted:
+            on_entries = None
+
+    feed = _parse_recover(xml_bytes, on_entries)
+    if feed is not None:
+        return feed
+    return _parse_feedparser(xml_bytes, on_entries)
@@ -0,0 +1,140 @@
+import json
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from urllib.parse import quote, urljoin
+
+from .config import data_dir
+from .feed_cache import cache_key
+
+load_translations()
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+_CACHE_FILE = 'opensearch.json'
+
+# 이 기간이 지난 템플릿은 다음 피드를 열 때 설명 문서를 다시 받아 갱신한다
+_TEMPLATE_MAX_AGE = 7 * 24 * 3600
+
+_OSD_NS = 'http://a9.com/-/spec/opensearch/1.1/'
+
+# 선호 순서: OPDS 카탈로그 > Atom > 그 외
+_URL_TYPE_RANK = (
+    'application/atom+xml;profile=opds-catalog',
+    'application/atom+xml',
+)
+
+_PARAM_RE = re.compile(r'\{([^}?]+)\??\}')
+
+
+def is_template(url: str) -> bool:
+    return '{searchTerms}' in (url or '')
+
+
+def parse_description(data: bytes, base_url: str) -> str:
+    """OpenSearch 설명 문서에서 가장 알맞은 <Url template>을 골라 절대 URL로 반환."""
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError as e:
+        raise ValueError(_('Invalid OpenSearch description: %s') % e)
+
+    best, best_rank = None, None
+    for url in root.iter('{%s}Url' % _OSD_NS):
+        template = url.get('template', '')
+        if not is_template(template):
+            continue
+        mime = (url.get('type') or '').replace(' ', '')
+        rank = len(_URL_TYPE_RANK)
+        for i, prefix in enumerate(_URL_TYPE_RANK):
+            if mime.startswith(prefix):
+                rank = i
+                break
+        if best_rank is None or rank < best_rank:
+            best, best_rank = template, rank
+    if best is None:
+        raise ValueError(_('The OpenSearch description has no usable search template.'))
+    return urljoin(base_url, best)
+
+
+def expand_template(template: str, terms: str, page: int = 1) -> str:
+    """
+    OpenSearch 1.1 템플릿 치환. {searchTerms}와 페이지 관련 값을 채우고,
+    그 밖의 인자({atom:author?} 등)는 선택/필수 구분 없이 비운다.
+    """
+    values = {
+        'searchTerms': quote(terms, safe=''),
+        'startPage':   str(page),
+        'count':       '',
+        'startIndex':  '',
+        'language':    '*',
+        'inputEncoding':  'UTF-8',
+        'outputEncoding': 'UTF-8',
+    }
+    return _PARAM_RE.sub(lambda m: values.get(m.group(1), ''), template)
+
+
+# ---------------------------------------------------------------------------
+# Template cache
+# ---------------------------------------------------------------------------
+
+class OpenSearchCache:
+    """
+    서버별 검색 템플릿을 data_dir()/opensearch.json에 보관한다.
+    다음 세션에서도 설명 문서를 다시 받지 않고 검색 한 번에 결과를 얻기 위한 것.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._items = self._load()
+
+    def get(self, server: dict):
+        """(template, fresh) 또는 None."""
+        with self._lock:
+            item = self._items.get(self._key(server))
+        if item is None:
+            return None
+        fresh = time.time() - item.get('stored_at', 0) < _TEMPLATE_MAX_AGE
+        return item['template'], fresh
+
+    def put(self, server: dict, template: str, source: str = ''):
+        with self._lock:
+            self._items[self._key(server)] = {
+                'template': template,
+                'source': source,
+                'stored_at': time.time(),
+            }
+            self._save()
+
+    @staticmethod
+    def _key(server):
+        return cache_key(server.get('url', ''), server)
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        try:
+            with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(self._items, f)
+            os.replace(self.path + '.tmp', self.path)
+        except OSError:
+            pass
+
+
+_cache = None
+
+
+def get_opensearch_cache() -> OpenSearchCache:
+    global _cache
+    if _cache is None:
+        _cache = OpenSearchCache(os.path.join(data_dir(), _CACHE_FILE))
+    return _cache
@@ -0,0 +1,131 @@
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget,
+    QTableWidgetItem, QProgressBar, QAbstractItemView, QHeaderView,
+)
+
+from .download_queue import QUEUED, RUNNING, DONE, FAILED, CANCELLED
+
+load_translations()
+
+_STATUS_LABELS = {
+    QUEUED:    _('Queued'),
+    RUNNING:   _('Downloading'),
+    DONE:      _('Done'),
+    FAILED:    _('Failed'),
+    CANCELLED: _('Cancelled'),
+}
+
+
+class DownloadQueueDialog(QDialog):
+    """Non-modal view of a DownloadManager queue."""
+
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.setWindowTitle(_('Downloads'))
+        self.setMinimumWidth(560)
+        self.setMinimumHeight(300)
+        self.setModal(False)
+        self._rows = {}     # job.id -> row
+        self._build_ui()
+        self._reload()
+
+        manager.job_added.connect(self._on_job_added)
+        manager.job_changed.connect(self._on_job_changed)
+
+    def _build_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(
+            [_('Title'), _('Format'), _('Status'), _('Progress')])
+        try:
+            self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+            self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+            _stretch = QHeaderView.Stretch
+        except AttributeError:
+            self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+            self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+            _stretch = QHeaderView.ResizeMode.Stretch
+        self.table.horizontalHeader().setSectionResizeMode(0, _stretch)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table, 1)
+
+        btn_layout = QHBoxLayout()
+        self.btn_cancel = QPushButton(_('Cancel Selected'))
+        self.btn_retry = QPushButton(_('Retry Selected'))
+        self.btn_clear = QPushButton(_('Clear Finished'))
+        btn_close = QPushButton(_('Close'))
+        btn_layout.addWidget(self.btn_cancel)
+        btn_layout.addWidget(self.btn_retry)
+        btn_layout.addWidget(self.btn_clear)
+        btn_layout.addStretch()
+        btn_layout.addWidget(btn_close)
+        layout.addLayout(btn_layout)
+
+        self.btn_cancel.clicked.connect(self._on_cancel)
+        self.btn_retry.clicked.connect(self._on_retry)
+        self.btn_clear.clicked.connect(self._on_clear)
+        btn_close.clicked.connect(self.close)
+
+    # ------------------------------------------------------------------
+    # Rows
+    # ------------------------------------------------------------------
+
+    def _reload(self):
+        self.table.setRowCount(0)
+        self._rows.clear()
+        for job in self.manager.jobs:
+            self._on_job_added(job)
+
+    def _on_job_added(self, job):
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        self._rows[job.id] = row
+        self.table.setItem(row, 0, QTableWidgetItem(job.entry.title))
+        self.table.setItem(row, 1, QTableWidgetItem(job.fmt.type.upper()))
+        self.table.setItem(row, 2, QTableWidgetItem(''))
+        self.table.setCellWidget(row, 3, QProgressBar())
+        self._on_job_changed(job)
+
+    def _on_job_changed(self, job):
+        row = self._rows.get(job.id)
+        if row is None:
+            return
+        status = _STATUS_LABELS.get(job.status, job.status)
+        item = self.table.item(row, 2)
+        item.setText(status)
+        item.setToolTip(job.error)
+
+        bar = self.table.cellWidget(row, 3)
+        if job.status == DONE:
+            bar.setRange(0, 1)
+            bar.setValue(1)
+        elif job.status == RUNNING and job.total <= 0:
+            bar.setRange(0, 0)
+        elif job.total > 0:
+            bar.setRange(0, 1000)
+            bar.setValue(int(job.done * 1000 / job.total))
+        else:
+            bar.setRange(0, 1)
+            bar.setValue(0)
+
+    def _selected_jobs(self):
+        rows = {idx.row() for idx in self.table.selectionModel().selectedRows()}
+        return [job for job in self.manager.jobs if self._rows.get(job.id) in rows]
+
+    # ------------------------------------------------------------------
+    # Actions
+    # ------------------------------------------------------------------
+
+    def _on_cancel(self):
+        for job in self._selected_jobs():
+            self.manager.cancel(job)
+
+    def _on_retry(self):
+        for job in self._selected_jobs():
+            self.manager.retry(job)
+
+    def _on_clear(self):
+        self.manager.clear_finished()
+        self._reload()
@@ -0,0 +1,226 @@
+import email.utils
+import http.client
+import random
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+from dataclasses import dataclass, fields, replace
+from urllib.parse import urlsplit
+
+from .config import prefs
+
+load_translations()
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# 서버가 잠시 처리하지 못한다는 뜻의 HTTP 상태 — 이것만 재시도한다
+_TRANSIENT_STATUS = (408, 425, 429, 500, 502, 503, 504)
+
+# 백오프 중 should_stop()을 확인하는 간격(초)
+_SLEEP_STEP = 0.25
+
+
+@dataclass
+class RetryPolicy:
+    attempts: int = 3               # 첫 시도 포함
+    base_delay: float = 1.0         # 지수 백오프 시작 값(초)
+    max_delay: float = 30.0
+    jitter: float = 0.5             # 지연의 이 비율만큼을 무작위로 줄인다
+    max_retry_after: float = 120.0  # Retry-After가 이보다 길면 기다리지 않고 실패
+    connect_timeout: float = 10.0
+    read_timeout: float = 60.0
+    breaker_threshold: int = 5      # 연속 실패가 이만큼이면 회로를 연다
+    breaker_cooldown: float = 60.0  # 열린 회로가 다시 시험 요청을 허용하기까지
+
+    @classmethod
+    def for_server(cls, server: dict) -> 'RetryPolicy':
+        """기본값 ← prefs['retry_policy'] ← server['retry'] 순으로 덮어쓴 정책."""
+        policy = cls()
+        for overrides in (prefs['retry_policy'], (server or {}).get('retry') or {}):
+            policy = policy._merged(overrides)
+        return policy
+
+    def _merged(self, overrides: dict) -> 'RetryPolicy':
+        known = {f.name for f in fields(self)}
+        values = {}
+        for name, value in overrides.items():
+            if name in known:
+                try:
+                    values[name] = type(getattr(self, name))(value)
+                except (TypeError, ValueError):
+                    continue
+        return replace(self, **values)
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def delay(self, attempt: int, retry_after=None) -> float:
+        """attempt(0부터) 번째 실패 뒤 기다릴 시간."""
+        if retry_after is not None:
+            return retry_after
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return cap * (1.0 - self.jitter * random.random())
+
+
+# ---------------------------------------------------------------------------
+# Error classification
+# ---------------------------------------------------------------------------
+
+class CircuitOpenError(urllib.error.URLError):
+    """호스트의 회로가 열려 있어 요청을 보내지 않고 실패."""
+
+
+def parse_retry_after(value):
+    """Retry-After 헤더(초 또는 HTTP 날짜)를 초로. 해석할 수 없으면 None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def classify(exc):
+    """
+    (transient, retry_after) 반환.
+    transient가 False면 다시 시도해도 같은 결과가 나올 오류 (4xx, DNS 실패, 인증서 오류,
+    HTML 응답 등)이므로 곧바로 올린다.
+    """
+    if isinstance(exc, CircuitOpenError):
+        return False, None
+    if isinstance(exc, urllib.error.HTTPError):
+        if exc.code in _TRANSIENT_STATUS:
+            headers = exc.headers or {}
+            return True, parse_retry_after(headers.get('Retry-After'))
+        return False, None
+    if isinstance(exc, urllib.error.URLError):
+        # http_pool은 소켓 오류를 URLError로 감싸 올린다
+        reason = exc.reason
+        if isinstance(reason, (socket.gaierror, ssl.SSLCertVerificationError)):
+            return False, None
+        return isinstance(reason, OSError), None
+    if isinstance(exc, (socket.timeout, TimeoutError, ConnectionError,
+                        http.client.HTTPException)):
+        return True, None
+    return False, None
+
+
+def _is_server_failure(exc) -> bool:
+    """서버가 응답하지 못한 실패인가 (breaker가 세는 것)."""
+    if isinstance(exc, urllib.error.HTTPError):
+        return exc.code >= 500 or exc.code == 429
+    transient, _retry_after = classify(exc)
+    return transient
+
+
+# ---------------------------------------------------------------------------
+# Circuit breaker
+# ---------------------------------------------------------------------------
+
+class CircuitBreaker:
+    """
+    호스트별 회로 차단기. 연속 실패가 threshold에 이르면 cooldown 동안 요청을
+    보내지 않고 CircuitOpenError로 바로 실패한다. cooldown이 지나면 요청 하나만
+    시험으로 보내고, 성공하면 닫고 실패하면 다시 연다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._failures = {}     # host -> 연속 실패 수
+        self._opened_at = {}    # host -> 회로를 연 시각
+        self._probing = set()
+
+    def before(self, host, policy):
+        with self._lock:
+            opened = self._opened_at.get(host)
+            if opened is None:
+                return
+            remaining = opened + policy.breaker_cooldown - time.monotonic()
+            if remaining <= 0 and host not in self._probing:
+                self._probing.add(host)
+                return
+        raise CircuitOpenError(
+            _('%(host)s is not responding; requests are paused for %(seconds)d seconds.') % {
+                'host': host, 'seconds': max(1, int(remaining))})
+
+    def success(self, host):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+            self._probing.discard(host)
+
+    def failure(self, host, policy):
+        with self._lock:
+            count = self._failures.get(host, 0) + 1
+            self._failures[host] = count
+            if host in self._probing or count >= policy.breaker_threshold:
+                self._opened_at[host] = time.monotonic()
+            self._probing.discard(host)
+
+    def is_open(self, host) -> bool:
+        with self._lock:
+            return host in self._opened_at
+
+    def states(self) -> dict:
+        """{host: 연속 실패 수} — 열린 회로만이 아니라 실패가 쌓인 호스트 전부."""
+        with self._lock:
+            return dict(self._failures)
+
+
+breaker = CircuitBreaker()
+
+
+# ---------------------------------------------------------------------------
+# Retry loop
+# ---------------------------------------------------------------------------
+
+def _sleep(seconds, should_stop):
+    deadline = time.monotonic() + seconds
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return True
+        if should_stop is not None and should_stop():
+            return False
+        time.sleep(min(_SLEEP_STEP, remaining))
+
+
+def call_with_retry(fn, url, policy, should_stop=None, attempts=None):
+    """
+    fn()을 정책에 따라 호출한다.
+    일시적인 오류만 지수 백오프(+지터, Retry-After 우선)로 다시 시도하고,
+    그 밖의 오류와 마지막 실패는 그대로 올린다. should_stop()이 True가 되면
+    기다리던 중이라도 마지막 오류를 올린다.
+    """
+    host = urlsplit(url).netloc
+    attempts = max(1, attempts or policy.attempts)
+    for attempt in range(attempts):
+        breaker.before(host, policy)
+        try:
+            result = fn()
+        except Exception as e:
+            if _is_server_failure(e):
+                breaker.failure(host, policy)
+            else:
+                breaker.success(host)
+            transient, retry_after = classify(e)
+            if not transient or attempt == attempts - 1 or breaker.is_open(host):
+                raise
+            if retry_after is not None and retry_after > policy.max_retry_after:
+                raise
+            if not _sleep(policy.delay(attempt, retry_after), should_stop):
+                raise
+            continue
+        breaker.success(host)
+        return result
@@ -1,11 +1,16 @@
+from urllib.parse import urlsplit
+
 from PyQt5.QtWidgets import (
     QDialog, QFormLayout, QLineEdit, QRadioButton,
     QButtonGroup, QWidget, QHBoxLayout, QVBoxLayout,
     QPushButton, QLabel, QMessageBox, QListWidget,
+    QSpinBox, QCheckBox,
 )
 from PyQt5.QtCore import Qt
 
 from .config import load_servers, save_servers
+from .feed_cache import get_parsed_cache
+from .network import transfer_stats
 
 load_translations()
 
@@ -17,6 +22,8 @@ class ServerDialog(QDialog):
         super().__init__(parent)
         self.setWindowTitle(_('Edit Server') if server else _('Add Server'))
         self.setMinimumWidth(380)
+        # 폼에 없는 키(retry 등)는 저장할 때 그대로 남긴다
+        self._server = dict(server or {})
         self._build_ui()
         if server:
             self._load(server)
@@ -51,6 +58,27 @@ class ServerDialog(QDialog):
         self.password_edit.setEchoMode(QLineEdit.Password)
         form.addRow(_('Username:'), self.username_edit)
         form.addRow(_('Password:'), self.password_edit)
+
+        # Feed cache
+        self.cache_ttl_spin = QSpinBox()
+        self.cache_ttl_spin.setRange(0, 86400)
+        self.cache_ttl_spin.setToolTip(
+            _('Cached feeds younger than this are shown without contacting the server.'))
+        form.addRow(_('Cache TTL (seconds):'), self.cache_ttl_spin)
+        self.swr_check = QCheckBox(_('Show cached feed while revalidating'))
+        form.addRow('', self.swr_check)
+
+        # Prefetch
+        self.prefetch_spin = QSpinBox()
+        self.prefetch_spin.setRange(0, 10)
+        self.prefetch_spin.setToolTip(
+            _('Number of following pages to fetch in the background while '
+              'a catalog page is shown. 0 turns prefetching off.'))
+        form.addRow(_('Prefetch next pages:'), self.prefetch_spin)
+        self.prefetch_stats_label = QLabel('')
+        form.addRow('', self.prefetch_stats_label)
+        self.transfer_stats_label = QLabel('')
+        form.addRow('', self.transfer_stats_label)
         layout.addLayout(form)
 
         # Buttons
@@ -84,6 +112,23 @@ class ServerDialog(QDialog):
             self.rb_none.setChecked(True)
         self.username_edit.setText(server.get('username', ''))
         self.password_edit.setText(server.get('password', ''))
+        self.cache_ttl_spin.setValue(int(server.get('cache_ttl', 0) or 0))
+        self.swr_check.setChecked(bool(server.get('stale_while_revalidate', False)))
+        self.prefetch_spin.setValue(int(server.get('prefetch_pages', 0) or 0))
+        stats = get_parsed_cache().prefetch_stats().get(server.get('name', ''))
+        if stats and stats['prefetched']:
+            self.prefetch_stats_label.setText(
+                _('This session: %(used)d of %(prefetched)d prefetched pages used (%(rate)d%%)') % {
+                    'used': stats['used'], 'prefetched': stats['prefetched'],
+                    'rate': int(stats['hit_rate'] * 100)})
+        transfer = transfer_stats().host(urlsplit(server.get('url', '')).netloc)
+        if transfer and transfer['compressed']:
+            self.transfer_stats_label.setText(
+                _('This session: %(wire).1f MB received for %(body).1f MB of feeds '
+                  '(compressed %(ratio).1f×)') % {
+                    'wire': transfer['wire_bytes'] / 1048576.0,
+                    'body': transfer['body_bytes'] / 1048576.0,
+                    'ratio': transfer['ratio']})
         self._on_auth_toggled()
 
     def _on_save(self):
@@ -104,14 +149,21 @@ class ServerDialog(QDialog):
 
     def get_server(self) -> dict:
         auth = 'basic' if self.rb_basic.isChecked() else 'none'
-        result = {
+        result = dict(self._server)
+        result.update({
             'name': self.name_edit.text().strip(),
             'url': self.url_edit.text().strip(),
             'auth': auth,
-        }
+            'cache_ttl': self.cache_ttl_spin.value(),
+            'stale_while_revalidate': self.swr_check.isChecked(),
+            'prefetch_pages': self.prefetch_spin.value(),
+        })
         if auth == 'basic':
             result['username'] = self.username_edit.text()
             result['password'] = self.password_edit.text()
+        else:
+            result.pop('username', None)
+            result.pop('password', None)
         return result
 
 
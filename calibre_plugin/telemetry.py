@@ -0,0 +1,209 @@
+import csv
+import json
+import math
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+from .config import prefs
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# 요청 하나를 나눈 구간 (초). 해당하지 않는 구간은 None
+PHASES = ('dns', 'connect', 'tls', 'ttfb', 'transfer', 'parse', 'render')
+
+# 내보내기 열 순서
+FIELDS = ('started', 'kind', 'host', 'url', 'status', 'cache', 'attempts', 'reused',
+          'encoding', 'wire_bytes', 'body_bytes') + PHASES + ('total', 'error')
+
+# 요청 종류
+FEED = 'feed'
+DOWNLOAD = 'download'
+COVER = 'cover'
+
+# 피드 캐시 상태 (Span.cache)
+CACHE_HIT = 'hit'                   # TTL 안이라 요청하지 않음
+CACHE_REVALIDATED = 'revalidated'   # 조건부 요청에 304
+CACHE_UPDATED = 'updated'           # 캐시 사본이 있었지만 200으로 새 본문
+CACHE_MISS = 'miss'
+
+
+# ---------------------------------------------------------------------------
+# Span
+# ---------------------------------------------------------------------------
+
+class Span:
+    """
+    요청 하나(재시도 포함)의 구간별 소요 시간과 전송량.
+
+    네트워크 구간(dns/connect/tls/ttfb/transfer)은 마지막 시도의 값이고, 새 연결을
+    맺지 않았으면(reused) dns/connect/tls는 None이다. wire_bytes / body_bytes는 모든
+    시도의 합. total은 첫 시도부터 finish()까지(백오프 대기 포함), 진행 중이면 None.
+    parse / render는 피드를 받은 쪽이 나중에 채운다.
+    """
+
+    __slots__ = ('kind', 'url', 'host', 'started', 'status', 'cache', 'attempts',
+                 'reused', 'encoding', 'wire_bytes', 'body_bytes', 'error', 'total',
+                 '_t0') + PHASES
+
+    def __init__(self, kind, url):
+        self.kind = kind
+        self.url = url
+        self.host = urlsplit(url).netloc
+        self.started = time.time()
+        self.status = 0
+        self.cache = ''
+        self.attempts = 0
+        self.reused = None
+        self.encoding = ''
+        self.wire_bytes = 0
+        self.body_bytes = 0
+        self.error = ''
+        self.total = None
+        self._t0 = time.perf_counter()
+        for phase in PHASES:
+            setattr(self, phase, None)
+
+    @property
+    def finished(self) -> bool:
+        return self.total is not None
+
+    def add_response(self, resp):
+        """PooledResponse를 다 읽고 닫은 뒤 그 시도의 구간과 바이트를 옮긴다."""
+        timings = resp.timings
+        for phase in ('dns', 'connect', 'tls', 'ttfb', 'transfer'):
+            setattr(self, phase, timings.get(phase))
+        self.status = resp.status
+        self.reused = resp.reused
+        self.encoding = resp.content_encoding
+        self.wire_bytes += resp.wire_bytes
+        self.body_bytes += resp.body_bytes
+
+    def finish(self, error=None):
+        if error is not None:
+            self.error = str(error) or type(error).__name__
+            self.status = getattr(error, 'code', None) or self.status
+        self.total = time.perf_counter() - self._t0
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in FIELDS}
+
+
+# ---------------------------------------------------------------------------
+# Ring buffer
+# ---------------------------------------------------------------------------
+
+def _percentile(values, fraction):
+    """정렬된 values의 nearest-rank 백분위수."""
+    if not values:
+        return None
+    rank = max(0, math.ceil(fraction * len(values)) - 1)
+    return values[rank]
+
+
+class Telemetry:
+    """
+    최근 요청 Span을 담는 크기 제한 링 버퍼. 여러 스레드에서 기록한다.
+    진행 중인 Span도 begin() 때 넣어 두므로 화면에서 느린 요청이 끝나기 전에 보인다.
+    generation은 Span이 추가되거나 끝날 때마다 늘어난다 (화면 갱신 판단용).
+    """
+
+    def __init__(self, max_spans: int):
+        self._lock = threading.Lock()
+        self._spans = deque(maxlen=max(1, int(max_spans)))
+        self.generation = 0
+
+    @property
+    def max_spans(self) -> int:
+        return self._spans.maxlen
+
+    @max_spans.setter
+    def max_spans(self, value):
+        value = max(1, int(value))
+        if value != self._spans.maxlen:
+            with self._lock:
+                self._spans = deque(self._spans, maxlen=value)
+
+    def begin(self, kind, url) -> Span:
+        span = Span(kind, url)
+        with self._lock:
+            self._spans.append(span)
+            self.generation += 1
+        return span
+
+    def finish(self, span, error=None):
+        span.finish(error)
+        self.touch()
+
+    def touch(self):
+        """기록된 Span의 값을 바꿨다고 알린다 (parse / render 등)."""
+        with self._lock:
+            self.generation += 1
+
+    def spans(self) -> list:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self.generation += 1
+
+    def percentiles(self, metric='total', kind=None) -> dict:
+        """
+        {host: {'count', 'errors', 'p50', 'p95', 'p99'}} (초).
+        끝난 Span 중 metric 값이 있는 것만 센다. 오류는 값과 상관없이 errors에 센다.
+        """
+        values = {}
+        errors = {}
+        for span in self.spans():
+            if not span.finished or (kind is not None and span.kind != kind):
+                continue
+            if span.error:
+                errors[span.host] = errors.get(span.host, 0) + 1
+            value = getattr(span, metric)
+            if value is not None and not span.error:
+                values.setdefault(span.host, []).append(value)
+        result = {}
+        for host in set(values) | set(errors):
+            host_values = sorted(values.get(host, ()))
+            result[host] = {
+                'count':  len(host_values),
+                'errors': errors.get(host, 0),
+                'p50':    _percentile(host_values, 0.50),
+                'p95':    _percentile(host_values, 0.95),
+                'p99':    _percentile(host_values, 0.99),
+            }
+        return result
+
+
+_telemetry = None
+
+
+def get_telemetry() -> Telemetry:
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = Telemetry(prefs['telemetry_max_spans'])
+    else:
+        _telemetry.max_spans = prefs['telemetry_max_spans']
+    return _telemetry
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def export_json(spans, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([span.as_dict() for span in spans], f, indent=1)
+
+
+def export_csv(spans, path):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for span in spans:
+            writer.writerow(span.as_dict())